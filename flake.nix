@@ -21,6 +21,8 @@
                 pyqt5
                 xlib
                 keyboard
+                numpy
+                qasync
               ]
             ))
             wmctrl
@@ -1,10 +1,34 @@
+import os
 import sys
+import logging
 from PyQt5.QtWidgets import QApplication
 from ui.main_window import MainWindow
 from utils.config import load_config
 from utils.hotkeys import HotkeyManager  # Import HotkeyManager
 from utils.window_manager import WindowManager
 from utils.x11_interface import X11Interface
+from utils.capture_backends import BackendUnavailable
+from utils.displays import DisplaySet
+from utils.tracing import tracer
+from utils.log_setup import setup_logging
+from utils import async_loop
+
+def create_display_interface(config):
+    """
+    X11 (also XWayland) by default, over several X displays if extra ones are
+    configured; the native Wayland interface when asked for or when there is no X.
+    """
+    choice = config["settings"].get("display_backend", "auto")
+    if choice == "wayland" or (choice == "auto" and os.environ.get("WAYLAND_DISPLAY") and not os.environ.get("DISPLAY")):
+        from utils.wayland_interface import WaylandInterface
+        from utils.wayland_client import WaylandError
+        try:
+            return WaylandInterface(config)
+        except (BackendUnavailable, WaylandError, OSError) as e:
+            logging.error(f"Wayland interface unavailable, using X11: {e}")
+    if config["settings"].get("displays", {}).get("extra"):
+        return DisplaySet(config)
+    return X11Interface(config)
 
 def main():
     app = QApplication(sys.argv)
@@ -14,15 +38,26 @@ def main():
     app.setDesktopFileName("eve-l-preview")
 
     config = load_config()
-    x11_interface = X11Interface(config)
+    setup_logging(config)  # First, so everything after logs through the writer thread
+    tracer.configure(config)
+    async_loop.install(app, config)  # Before anything that schedules work on the loop
+    x11_interface = create_display_interface(config)
     window_manager = WindowManager(x11_interface, config)  # Remove None
+    app.aboutToQuit.connect(window_manager.thumbnail_cache.close)
+    app.aboutToQuit.connect(window_manager.stream_server.close)
+    app.aboutToQuit.connect(window_manager.frame_exporter.close)
+    app.aboutToQuit.connect(window_manager.recorder.stop)
+    if window_manager.capture_scheduler is not None:
+        app.aboutToQuit.connect(window_manager.capture_scheduler.close)
+    app.aboutToQuit.connect(x11_interface.close)
 
     main_window = MainWindow(config, window_manager, x11_interface)
 
     hotkey_manager = HotkeyManager(main_window, window_manager)
     window_manager.hotkey_manager = hotkey_manager  # Set hotkey_manager
+    app.aboutToQuit.connect(hotkey_manager.close)
 
-    sys.exit(app.exec_())
+    sys.exit(async_loop.run(app))
 
 if __name__ == "__main__":
     main()
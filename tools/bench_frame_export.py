@@ -0,0 +1,115 @@
+"""
+Benchmark the frame export with many concurrent readers.
+
+A writer publishes synthetic thumbnails for several characters at a fixed
+rate through FrameExporter (the same code path the capture threads use)
+while reader processes poll the segments with utils.frame_reader:
+
+    python -m tools.bench_frame_export --characters 10 --readers 16 --fps 10 --seconds 10
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from utils.frame_reader import FrameIndex, FrameReader, FrameRetired
+
+
+def reader_process(directory, seconds, copy, results):
+    index = FrameIndex(directory)
+    readers = {entry["name"]: FrameReader(entry["path"]) for entry in index.list()}
+    last_seq = {name: 0 for name in readers}
+    reads = new_frames = 0
+    latencies = []
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for name, reader in readers.items():
+            try:
+                frame = reader.read(copy=copy)
+            except FrameRetired:
+                continue
+            reads += 1
+            if frame.seq != last_seq[name]:
+                last_seq[name] = frame.seq
+                new_frames += 1
+                latencies.append(time.time() - frame.captured_at)
+            if not copy:
+                frame.pixels.release()
+        time.sleep(0.001)
+    retries = sum(reader.retries for reader in readers.values())
+    for reader in readers.values():
+        reader.close()
+    index.close()
+    results.put((reads, new_frames, retries, latencies))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--characters", type=int, default=10)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--fps", type=float, default=10.0, help="frames per second per character")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--size", default="192x108", help="thumbnail size")
+    parser.add_argument("--no-copy", action="store_true", help="read through memoryviews instead of copying")
+    args = parser.parse_args()
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtGui import QImage
+    from utils.frame_export import FrameExporter
+
+    width, height = (int(value) for value in args.size.split("x"))
+    directory = tempfile.mkdtemp(prefix="eve-l-bench-", dir="/dev/shm" if os.path.isdir("/dev/shm") else None)
+    exporter = FrameExporter({"settings": {"frame_export": {"enabled": True, "directory": directory}}})
+    names = [f"Pilot {number}" for number in range(args.characters)]
+    images = [QImage(width, height, QImage.Format_RGB32) for _ in range(2)]
+    images[0].fill(0xff203040)
+    images[1].fill(0xff405060)
+    for name in names:
+        exporter.publish(name, images[0], None)
+
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=reader_process,
+                                         args=(directory, args.seconds, not args.no_copy, results))
+                 for _ in range(args.readers)]
+    for process in processes:
+        process.start()
+
+    interval = 1.0 / args.fps
+    writes, write_time = 0, 0.0
+    deadline = time.monotonic() + args.seconds + 0.5
+    next_round = time.monotonic()
+    while time.monotonic() < deadline:
+        for name in names:
+            start = time.perf_counter()
+            exporter.publish(name, images[writes % 2], None)
+            write_time += time.perf_counter() - start
+            writes += 1
+        next_round += interval
+        time.sleep(max(0.0, next_round - time.monotonic()))
+
+    reads = new_frames = retries = 0
+    latencies = []
+    for _ in processes:
+        process_reads, process_new, process_retries, process_latencies = results.get()
+        reads += process_reads
+        new_frames += process_new
+        retries += process_retries
+        latencies.extend(process_latencies)
+    for process in processes:
+        process.join()
+    exporter.close()
+    os.rmdir(directory)
+
+    latencies.sort()
+    print(f"{args.characters} characters at {args.fps:g} fps, {args.readers} readers, {width}x{height}, "
+          f"{'memoryview' if args.no_copy else 'copy'} reads")
+    print(f"writer: {writes} frames, {write_time / max(writes, 1) * 1e6:.1f} µs per publish")
+    print(f"readers: {reads / args.seconds:.0f} reads/s in total, {new_frames} new frames seen, "
+          f"{retries} torn reads retried")
+    if latencies:
+        print(f"publish-to-read latency: median {latencies[len(latencies) // 2] * 1000:.2f} ms, "
+              f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
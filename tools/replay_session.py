@@ -0,0 +1,238 @@
+"""
+Replay a recorded session (tray → Profiling → Record session for replay)
+against Xvfb with synthetic client windows, and report latency and CPU.
+
+    python -m tools.replay_session ~/.config/EVE-L_Preview/recordings/session-....jsonl.gz --speed 4 --output new.json
+    python -m tools.replay_session session.jsonl.gz --compare old.json
+
+Windows open, close and change titles as recorded, focus changes go
+through the harness' window manager, bound key combos are dispatched from
+a separate thread like the keyboard hook does, client content changes
+where captured frames changed, and preview drags are replayed on the GUI
+thread. The app runs with the recording's hotkeys and capture settings.
+Span timings come from the tracer; compare two runs to spot regressions.
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+SETTLE = 2.0  # Seconds to let captures and focus changes finish after the last event
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def span_stats(events):
+    """name -> {count, p50_ms, p95_ms, max_ms} from tracer events."""
+    durations = {}
+    for name, _, _, duration, _, _ in events:
+        durations.setdefault(name, []).append(duration / 1e6)
+    return {name: {"count": len(values), "p50_ms": round(percentile(values, 0.5), 3),
+                   "p95_ms": round(percentile(values, 0.95), 3), "max_ms": round(max(values), 3)}
+            for name, values in sorted(durations.items())}
+
+
+def cpu_seconds():
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime, children.ru_utime + children.ru_stime
+
+
+def compare(result, baseline):
+    """Print p95/max of every span and CPU time next to a previous run."""
+    def row(label, old, new):
+        change = f"{(new - old) / old * 100:+.0f}%" if old else "new"
+        print(f"  {label:<44} {old:>10.2f} {new:>10.2f} {change:>7}")
+
+    print(f"\n  {'':<44} {'baseline':>10} {'this run':>10}")
+    row("CPU seconds (app)", baseline["cpu_seconds"], result["cpu_seconds"])
+    row("CPU seconds (helpers)", baseline["child_cpu_seconds"], result["child_cpu_seconds"])
+    for name, stats in result["spans"].items():
+        old = baseline["spans"].get(name)
+        if old is None:
+            continue
+        row(f"{name} p95 ms", old["p95_ms"], stats["p95_ms"])
+        row(f"{name} max ms", old["max_ms"], stats["max_ms"])
+
+
+def make_replayer(soak, clients, events, speed):
+    from PyQt5.QtCore import QObject, QPoint, pyqtSignal
+    from PyQt5.QtWidgets import QApplication
+
+    class Replayer(QObject):
+        """Feeds the recorded events in on a worker thread; GUI-side steps go through gui_call."""
+        gui_call = pyqtSignal(object)
+
+        def __init__(self):
+            super().__init__()
+            self.gui_call.connect(lambda function: function())
+            self.windows = {}  # recorded window id -> fake window
+            self.characters = {}  # character name -> recorded window id
+            self.replayed = self.skipped = 0
+            self.lag = 0.0  # Worst delay behind the schedule, seconds
+
+        def start(self):
+            threading.Thread(target=self.run, name="replay", daemon=True).start()
+
+        def wait_until(self, due):
+            while True:
+                clients.handle_events()  # The harness is the window manager; keep granting requests
+                remaining = due - time.monotonic()
+                if remaining <= 0:
+                    self.lag = max(self.lag, -remaining)
+                    return
+                time.sleep(min(remaining, 0.01))
+
+        def run(self):
+            started = time.monotonic()
+            for event in events:
+                self.wait_until(started + event["t"] / speed)
+                handler = getattr(self, f"on_{event['type']}", None)
+                if handler is None or handler(event) is False:
+                    self.skipped += 1
+                else:
+                    self.replayed += 1
+            self.wait_until(time.monotonic() + SETTLE)
+            self.gui_call.emit(QApplication.quit)
+
+        def on_window_opened(self, event):
+            self.windows[event["id"]] = clients.create(event["title"])
+            self.track_title(event["id"], event["title"])
+
+        def on_title(self, event):
+            window = self.windows.get(event["id"])
+            if window is None:
+                return False
+            clients.retitle(window, event["title"])
+            self.track_title(event["id"], event["title"])
+
+        def on_window_closed(self, event):
+            window = self.windows.pop(event["id"], None)
+            if window is None:
+                return False
+            clients.destroy(window)
+
+        def track_title(self, window_id, title):
+            if title.startswith("EVE - "):
+                self.characters[title[len("EVE - "):]] = window_id
+
+        def on_focus(self, event):
+            if event.get("hotkey"):
+                return  # The recorded key combo before it already switched; activating again would double it
+            window = self.windows.get(event["id"])
+            if window is None:
+                return False
+            clients.activate(window)
+
+        def on_key(self, event):
+            # Stands in for the keyboard thread; the event time gives the dispatch latency
+            soak.hotkey_manager.dispatch_combo(event["combo"], SimpleNamespace(time=time.time()))
+
+        def on_frame(self, event):
+            window = self.windows.get(self.characters.get(event["character"]))
+            if window is None:
+                return False
+            clients.paint_window(window, min(1.0, event["area"] / max(1, event["w"] * event["h"])))
+
+        def on_drag(self, event):
+            layout = soak.window_manager.layout
+            if event["phase"] == "begin":
+                preview = soak.window_manager.previews_by_character.get(event["character"])
+                if preview is None:
+                    return False
+                self.gui_call.emit(lambda: layout.begin_drag(preview, QPoint(event["x"], event["y"])))
+            elif event["phase"] == "move":
+                self.gui_call.emit(lambda: layout.drag_to(QPoint(event["x"], event["y"])))
+            else:
+                self.gui_call.emit(layout.end_drag)
+
+    return Replayer()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording")
+    parser.add_argument("--speed", type=float, default=1.0, help="time compression (4 = four times faster)")
+    parser.add_argument("--display", help="use this X display instead of starting Xvfb")
+    parser.add_argument("--output", help="write the result as JSON here")
+    parser.add_argument("--compare", help="result JSON of an earlier run to compare with")
+    args = parser.parse_args()
+
+    from tools.xvfb_harness import Xvfb, FakeClients
+    server = None if args.display else Xvfb().start()
+    display_name = args.display or server.display
+    os.environ["DISPLAY"] = display_name
+    os.environ.pop("WAYLAND_DISPLAY", None)
+    recording = os.path.abspath(os.path.expanduser(args.recording))
+    os.environ["HOME"] = tempfile.mkdtemp(prefix="eve-l-replay-")  # Before utils.config is imported
+
+    from PyQt5.QtCore import QTimer
+    from PyQt5.QtWidgets import QApplication
+    from tools.soak_test import SoakApp
+    from utils.session_recorder import read_recording
+    from utils.tracing import tracer
+
+    header, events = read_recording(recording)
+    app = QApplication(sys.argv[:1])
+    app.setQuitOnLastWindowClosed(False)
+    settings = {key: value for key, value in header.get("settings", {}).items() if value is not None}
+    settings["tracing"] = {"enabled": True, "buffer_events": 1000000}
+    soak = SoakApp(settings, {"hotkeys": header.get("hotkeys", {})})
+    clients = FakeClients(display_name)
+    replayer = make_replayer(soak, clients, events, args.speed)
+
+    cpu_before, child_cpu_before = cpu_seconds()
+    started = time.monotonic()
+    QTimer.singleShot(0, replayer.start)
+    try:
+        app.exec_()
+    finally:
+        wall = time.monotonic() - started
+        cpu_after, child_cpu_after = cpu_seconds()
+        dispatches, dispatch_avg, dispatch_max = soak.hotkey_manager.get_dispatch_stats()
+        result = {
+            "recording": recording,
+            "speed": args.speed,
+            "events": len(events),
+            "replayed": replayer.replayed,
+            "skipped": replayer.skipped,
+            "schedule_lag_ms": round(replayer.lag * 1000, 1),
+            "wall_seconds": round(wall, 1),
+            "cpu_seconds": round(cpu_after - cpu_before, 2),
+            "child_cpu_seconds": round(child_cpu_after - child_cpu_before, 2),
+            "dispatch": {"count": dispatches, "avg_ms": round(dispatch_avg, 2), "max_ms": round(dispatch_max, 2)},
+            "calls": {operation: {"count": calls, "avg_ms": round(average, 2)}
+                      for operation, (calls, average) in soak.x11_interface.get_call_stats().items()},
+            "spans": span_stats(list(tracer.events)),
+        }
+        soak.close()
+        clients.close_all()
+        if server:
+            server.stop()
+
+    print(f"Replayed {result['replayed']} of {result['events']} events in {result['wall_seconds']} s "
+          f"(x{args.speed:g}, worst lag {result['schedule_lag_ms']} ms); CPU {result['cpu_seconds']} s app, "
+          f"{result['child_cpu_seconds']} s helpers")
+    print(f"Hotkey dispatch: {dispatches} presses, {dispatch_avg:.1f} ms avg, {dispatch_max:.1f} ms max")
+    for name, stats in result["spans"].items():
+        print(f"  {name:<40} n={stats['count']:<7} p50 {stats['p50_ms']:8.2f} ms  p95 {stats['p95_ms']:8.2f} ms  "
+              f"max {stats['max_ms']:8.2f} ms")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(result, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""
+Run the whole app for hours against Xvfb while fake clients open, close,
+relog and log out, and fail if memory, file descriptors, threads or live
+Qt objects keep growing.
+
+    python -m tools.soak_test --hours 4
+    python -m tools.soak_test --minutes 20 --churn 2 --report soak.jsonl
+
+The app runs with a throwaway HOME (its own config folder) and a short
+preview park TTL so the park, pool, reuse and dispose paths all get
+exercised. Baselines are taken after --warmup minutes; growth is measured
+from there to the median of the last three samples. Exit status 1 means a
+threshold was passed; the report lists the top tracemalloc allocators
+since the baseline either way.
+"""
+import argparse
+import gc
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+METRICS = ("rss_mb", "fds", "threads", "qobjects", "widgets", "python_mb")
+
+
+def count_children():
+    """Direct child processes (tool helpers, xdotool sessions, zombies included)."""
+    children = 0
+    for tid in os.listdir("/proc/self/task"):
+        try:
+            with open(f"/proc/self/task/{tid}/children") as f:
+                children += len(f.read().split())
+        except OSError:
+            pass
+    return children
+
+
+def sample(soak, started):
+    """One row of the report."""
+    from PyQt5.QtCore import QObject
+    from PyQt5.QtWidgets import QApplication
+    with open("/proc/self/statm") as f:
+        rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    qobjects = Counter(type(obj).__name__ for obj in gc.get_objects() if isinstance(obj, QObject))
+    current, _ = tracemalloc.get_traced_memory()
+    return {
+        "t": round(time.monotonic() - started, 1),
+        "rss_mb": round(rss / 2 ** 20, 1),
+        "fds": len(os.listdir("/proc/self/fd")),
+        "threads": len(os.listdir("/proc/self/task")),
+        "children": count_children(),
+        "qobjects": sum(qobjects.values()),
+        "widgets": len(QApplication.allWidgets()),
+        "python_mb": round(current / 2 ** 20, 1),
+        "previews": len(soak.window_manager.previews),
+        "parked": len(soak.window_manager.previews_by_character) - len(soak.window_manager.previews),
+        "pooled": len(soak.window_manager.preview_pool),
+        "top_qobjects": dict(qobjects.most_common(8)),
+    }
+
+
+class SoakApp:
+    """The same objects main() builds, on the soak display and config."""
+
+    def __init__(self, config_overrides, sections=None):
+        from main import create_display_interface
+        from ui.main_window import MainWindow
+        from utils.config import load_config
+        from utils.hotkeys import HotkeyManager
+        from utils.tracing import tracer
+        from utils.window_manager import WindowManager
+
+        self.config = load_config()
+        for key, value in config_overrides.items():
+            self.config["settings"][key] = value
+        self.config.update(sections or {})  # Whole top-level sections, e.g. "hotkeys"
+        tracer.configure(self.config)
+        self.x11_interface = create_display_interface(self.config)
+        self.window_manager = WindowManager(self.x11_interface, self.config)
+        self.main_window = MainWindow(self.config, self.window_manager, self.x11_interface)
+        self.hotkey_manager = HotkeyManager(self.main_window, self.window_manager)
+        self.window_manager.hotkey_manager = self.hotkey_manager
+
+    def close(self):
+        self.hotkey_manager.close()
+        self.window_manager.thumbnail_cache.close()
+        self.window_manager.stream_server.close()
+        self.window_manager.frame_exporter.close()
+        for preview in list(self.window_manager.previews_by_character.values()) + self.window_manager.preview_pool:
+            preview.dispose()
+        self.x11_interface.close()
+
+
+def evaluate(rows, thresholds):
+    """[(metric, baseline, end, growth, limit)] for every metric past its limit."""
+    baseline = rows[0]
+    tail = rows[-3:]
+    failures = []
+    for metric in METRICS:
+        end = statistics.median(row[metric] for row in tail)
+        growth = end - baseline[metric]
+        if growth > thresholds[metric]:
+            failures.append((metric, baseline[metric], end, growth, thresholds[metric]))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hours", type=float, default=0.0)
+    parser.add_argument("--minutes", type=float, default=0.0)
+    parser.add_argument("--warmup", type=float, default=5.0, help="minutes before the baseline is taken")
+    parser.add_argument("--display", help="use this X display instead of starting Xvfb")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--names", type=int, default=12, help="distinct characters the clients rotate through")
+    parser.add_argument("--churn", type=float, default=5.0, help="seconds between client open/close/relog events")
+    parser.add_argument("--sample", type=float, default=30.0, help="seconds between samples")
+    parser.add_argument("--report", help="write every sample as a JSON line here")
+    parser.add_argument("--max-rss-mb", type=float, default=50.0, help="allowed RSS growth after warmup")
+    parser.add_argument("--max-python-mb", type=float, default=10.0, help="allowed tracemalloc growth")
+    parser.add_argument("--max-fds", type=int, default=8)
+    parser.add_argument("--max-threads", type=int, default=4)
+    parser.add_argument("--max-qobjects", type=int, default=50)
+    parser.add_argument("--max-widgets", type=int, default=20)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+    duration = args.hours * 3600 + args.minutes * 60 or 3600
+    thresholds = {"rss_mb": args.max_rss_mb, "fds": args.max_fds, "threads": args.max_threads,
+                  "qobjects": args.max_qobjects, "widgets": args.max_widgets, "python_mb": args.max_python_mb}
+
+    from tools.xvfb_harness import Xvfb
+    server = None if args.display else Xvfb().start()
+    display_name = args.display or server.display
+    os.environ["DISPLAY"] = display_name
+    os.environ.pop("WAYLAND_DISPLAY", None)
+    # Keep the user's config and caches out of it; CONFIG_FOLDER is derived from HOME on import
+    home = tempfile.mkdtemp(prefix="eve-l-soak-")
+    os.environ["HOME"] = home
+    harness = subprocess.Popen([sys.executable, "-m", "tools.xvfb_harness", "--display", display_name,
+                                "--clients", str(args.clients), "--names", str(args.names),
+                                "--churn", str(args.churn), "--seconds", str(duration + 60)]
+                               + (["--seed", str(args.seed)] if args.seed is not None else []))
+
+    tracemalloc.start(5)
+    from PyQt5.QtCore import QTimer
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication(sys.argv[:1])
+    app.setQuitOnLastWindowClosed(False)
+    soak = SoakApp({
+        "preview_pool": {"park_ttl": max(args.churn * 4, 10), "pool_size": 2},
+        "stream": {"enabled": False},
+        "frame_export": {"enabled": True, "directory": os.path.join(home, "frames")},
+    })
+
+    started = time.monotonic()
+    rows = []
+    baseline_snapshot = []
+    report = open(args.report, "w") if args.report else None
+
+    def take_sample():
+        gc.collect()
+        row = sample(soak, started)
+        print(f"[{row['t']:>7.0f} s] rss {row['rss_mb']} MB, python {row['python_mb']} MB, fds {row['fds']}, "
+              f"threads {row['threads']}, children {row['children']}, qobjects {row['qobjects']}, "
+              f"widgets {row['widgets']}, previews {row['previews']}/{row['parked']}/{row['pooled']}", flush=True)
+        if report:
+            report.write(json.dumps(row) + "\n")
+            report.flush()
+        if row["t"] >= args.warmup * 60:
+            if not rows:
+                baseline_snapshot.append(tracemalloc.take_snapshot())
+            rows.append(row)
+        if time.monotonic() - started >= duration:
+            app.quit()
+
+    timer = QTimer()
+    timer.timeout.connect(take_sample)
+    timer.start(int(args.sample * 1000))
+    try:
+        app.exec_()
+    finally:
+        final_snapshot = tracemalloc.take_snapshot()
+        soak.close()
+        harness.terminate()
+        harness.wait()
+        if server:
+            server.stop()
+        if report:
+            report.close()
+
+    if baseline_snapshot:
+        print("\nTop allocators since the baseline:")
+        for stat in final_snapshot.compare_to(baseline_snapshot[0], "traceback")[:15]:
+            print(f"  {stat.size_diff / 1024:+10.1f} KiB {stat.count_diff:+7d} blocks  "
+                  f"{stat.traceback.format()[-1].strip() if stat.traceback else ''}")
+    if len(rows) < 3:
+        print("Not enough samples after warmup to judge growth; run longer or lower --warmup/--sample")
+        return 2
+    failures = evaluate(rows, thresholds)
+    for metric, start, end, growth, limit in failures:
+        print(f"FAIL {metric}: {start} -> {end} (+{growth:g}, limit {limit:g})")
+    if not failures:
+        print(f"PASS: no growth past the thresholds over {rows[-1]['t'] - rows[0]['t']:.0f} s after warmup "
+              f"({threading.active_count()} Python threads at the end)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
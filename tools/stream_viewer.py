@@ -0,0 +1,100 @@
+"""
+Minimal viewer for the thumbnail stream (settings.stream).
+
+    python -m tools.stream_viewer HOST [--port 8765] [--token SECRET]
+"""
+import argparse
+import socket
+import struct
+import sys
+import logging
+from PyQt5.QtWidgets import QApplication, QWidget, QGridLayout, QLabel
+from PyQt5.QtCore import QThread, pyqtSignal, Qt
+from PyQt5.QtGui import QImage, QPixmap, QPainter
+from utils.stream_server import LENGTH, MSG_HELLO, MSG_FRAME, PROTOCOL_VERSION, decode_frame
+
+COLUMNS = 4
+
+
+class StreamReader(QThread):
+    frame = pyqtSignal(str, int, int, list)  # name, width, height, [(x, y, w, h, RGB888 bytes)]
+    failed = pyqtSignal(str)
+
+    def __init__(self, host, port, token):
+        super().__init__()
+        self.host, self.port, self.token = host, port, token
+
+    def _read(self, sock, size):
+        data = b""
+        while len(data) < size:
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("server closed the connection")
+            data += chunk
+        return data
+
+    def run(self):
+        try:
+            sock = socket.create_connection((self.host, self.port))
+            token = self.token.encode()
+            sock.sendall(struct.pack("<H", len(token)) + token)
+            while True:
+                body = self._read(sock, LENGTH.unpack(self._read(sock, LENGTH.size))[0])
+                if body[0] == MSG_HELLO:
+                    if body[1] != PROTOCOL_VERSION:
+                        raise ConnectionError(f"server speaks protocol {body[1]}, viewer {PROTOCOL_VERSION}")
+                elif body[0] == MSG_FRAME:
+                    self.frame.emit(*decode_frame(body))
+        except OSError as e:
+            self.failed.emit(str(e))
+
+
+class StreamViewer(QWidget):
+    """One label per character, patched with the rects as they arrive."""
+
+    def __init__(self, reader):
+        super().__init__()
+        self.setWindowTitle("EVE-L Preview stream")
+        self.grid = QGridLayout(self)
+        self.canvases = {}  # name -> QImage
+        self.labels = {}
+        reader.frame.connect(self.apply_frame)
+        reader.failed.connect(lambda error: self.setWindowTitle(f"EVE-L Preview stream - {error}"))
+
+    def apply_frame(self, name, width, height, rects):
+        canvas = self.canvases.get(name)
+        if canvas is None or (canvas.width(), canvas.height()) != (width, height):
+            canvas = self.canvases[name] = QImage(width, height, QImage.Format_RGB888)
+        painter = QPainter(canvas)
+        for x, y, w, h, pixels in rects:
+            painter.drawImage(x, y, QImage(pixels, w, h, w * 3, QImage.Format_RGB888))
+        painter.end()
+
+        label = self.labels.get(name)
+        if label is None:
+            label = self.labels[name] = QLabel()
+            label.setToolTip(name)
+            label.setAlignment(Qt.AlignCenter)
+            index = len(self.labels) - 1
+            self.grid.addWidget(label, index // COLUMNS, index % COLUMNS)
+        label.setPixmap(QPixmap.fromImage(canvas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch EVE-L Preview thumbnails from another machine")
+    parser.add_argument("host")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--token", default="")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    app = QApplication(sys.argv)
+    reader = StreamReader(args.host, args.port, args.token)
+    viewer = StreamViewer(reader)
+    viewer.show()
+    reader.start()
+    sys.exit(app.exec_())
+
+
+if __name__ == "__main__":
+    main()
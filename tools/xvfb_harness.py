@@ -0,0 +1,257 @@
+"""
+A throwaway X server with fake EVE clients, for soak and load testing.
+
+Xvfb provides the display; FakeClients plays both the clients (windows
+titled "EVE - <name>" whose content keeps changing) and the window manager
+(_NET_CLIENT_LIST for wmctrl, _NET_ACTIVE_WINDOW for focus requests), so
+no real WM is needed. Run standalone to churn clients on a display:
+
+    python -m tools.xvfb_harness --start-xvfb --clients 8 --names 12 --churn 5 --seconds 3600
+"""
+import argparse
+import os
+import random
+import socket
+import subprocess
+import time
+from Xlib import X, Xatom, display as xdisplay
+
+
+class Xvfb:
+    """An Xvfb server on the first free display number; use as a context manager."""
+
+    def __init__(self, display=None, size="1920x1080x24"):
+        self.display = display or self.free_display()
+        self.size = size
+        self.process = None
+
+    @staticmethod
+    def free_display(start=90):
+        number = start
+        while os.path.exists(f"/tmp/.X{number}-lock") or os.path.exists(f"/tmp/.X11-unix/X{number}"):
+            number += 1
+        return f":{number}"
+
+    def start(self, timeout=10.0):
+        self.process = subprocess.Popen(["Xvfb", self.display, "-screen", "0", self.size, "-nolisten", "tcp",
+                                         "+extension", "Composite", "+extension", "MIT-SHM"],
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        socket_path = f"/tmp/.X11-unix/X{self.display.lstrip(':')}"
+        deadline = time.monotonic() + timeout
+        while not os.path.exists(socket_path):
+            if self.process.poll() is not None or time.monotonic() > deadline:
+                self.stop()
+                raise RuntimeError(f"Xvfb did not come up on {self.display}")
+            time.sleep(0.05)
+        return self
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self.process = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class FakeClients:
+    """Client windows plus the EWMH bookkeeping a window manager would do for them."""
+
+    def __init__(self, display_name, size=(960, 540)):
+        self.display = xdisplay.Display(display_name)
+        self.screen = self.display.screen()
+        self.root = self.screen.root
+        self.size = size
+        self.hostname = socket.gethostname()
+        self.clients = {}  # window id -> (window, size), every mapped client
+        self.windows = {}  # character name -> window, for clients opened by name
+        self.frame = 0
+        self.atoms = {name: self.display.intern_atom(name) for name in (
+            "_NET_CLIENT_LIST", "_NET_ACTIVE_WINDOW", "_NET_WM_NAME", "_NET_WM_DESKTOP", "_NET_WM_PID",
+            "_NET_SUPPORTING_WM_CHECK", "_NET_SUPPORTED", "UTF8_STRING")}
+        # Announce a "window manager" so EWMH tools trust the root properties
+        self.check_window = self.root.create_window(-10, -10, 1, 1, 0, self.screen.root_depth)
+        for window in (self.root, self.check_window):
+            window.change_property(self.atoms["_NET_SUPPORTING_WM_CHECK"], Xatom.WINDOW, 32, [self.check_window.id])
+        self.check_window.change_property(self.atoms["_NET_WM_NAME"], self.atoms["UTF8_STRING"], 8, b"xvfb-harness")
+        self.root.change_property(self.atoms["_NET_SUPPORTED"], Xatom.ATOM, 32,
+                                  [self.atoms[name] for name in ("_NET_CLIENT_LIST", "_NET_ACTIVE_WINDOW")])
+        # Focus requests (wmctrl -a, xdotool) arrive as client messages on the root
+        self.root.change_attributes(event_mask=X.SubstructureNotifyMask | X.SubstructureRedirectMask)
+        self.gc = self.root.create_gc(foreground=self.screen.black_pixel)
+        self._publish()
+
+    def _set_title(self, window, title):
+        window.set_wm_name(title)
+        window.change_property(self.atoms["_NET_WM_NAME"], self.atoms["UTF8_STRING"], 8, title.encode())
+
+    def _publish(self):
+        self.root.change_property(self.atoms["_NET_CLIENT_LIST"], Xatom.WINDOW, 32,
+                                  list(self.clients))
+        self.display.flush()
+
+    # ---------------- windows ------------------------------------------
+    def create(self, title, size=None):
+        """Map a client window; it is listed until destroy()."""
+        index = len(self.clients)
+        width, height = size or self.size
+        window = self.root.create_window((index % 4) * 40, (index // 4) * 40, width, height, 0,
+                                         self.screen.root_depth, background_pixel=self.screen.white_pixel)
+        self._set_title(window, title)
+        window.set_wm_client_machine(self.hostname)
+        window.change_property(self.atoms["_NET_WM_DESKTOP"], Xatom.CARDINAL, 32, [0])
+        window.change_property(self.atoms["_NET_WM_PID"], Xatom.CARDINAL, 32, [os.getpid()])
+        window.map()
+        self.clients[window.id] = (window, (width, height))
+        self._publish()
+        return window
+
+    def retitle(self, window, title):
+        self._set_title(window, title)
+        self.display.flush()
+
+    def destroy(self, window):
+        if self.clients.pop(window.id, None) is not None:
+            window.destroy()
+            self._publish()
+
+    def paint_window(self, window, fraction=0.125):
+        """Change about fraction of a window's area."""
+        _, (width, height) = self.clients.get(window.id, (None, self.size))
+        self.frame += 1
+        band = max(1, int(height * fraction))
+        self.gc.change(foreground=(self.frame * 2654435761) & 0xffffff)
+        window.fill_rectangle(self.gc, 0, (self.frame * band) % max(1, height - band + 1), width, band)
+        self.display.flush()
+
+    # ---------------- characters ---------------------------------------
+    def open(self, name):
+        """Start a client (logged in as name) with a new window id."""
+        if name not in self.windows:
+            self.windows[name] = self.create(f"EVE - {name}")
+
+    def close(self, name):
+        """The client exits or crashes."""
+        window = self.windows.pop(name, None)
+        if window is not None:
+            self.destroy(window)
+
+    def relog(self, name):
+        """Client restart: same character, new window id."""
+        self.close(name)
+        self.open(name)
+
+    def log_out(self, name):
+        """Back to character select: the window stays, the title drops the name."""
+        window = self.windows.get(name)
+        if window is not None:
+            self.retitle(window, "EVE")
+
+    def log_in(self, name):
+        window = self.windows.get(name)
+        if window is not None:
+            self.retitle(window, f"EVE - {name}")
+
+    def paint(self):
+        """Change a band of every client so captures see new frames."""
+        for window, _ in list(self.clients.values()):
+            self.paint_window(window)
+
+    def handle_events(self):
+        """Act as the WM: grant other clients' map/configure requests and honour focus requests."""
+        while self.display.pending_events():
+            event = self.display.next_event()
+            if event.type == X.ClientMessage and event.client_type == self.atoms["_NET_ACTIVE_WINDOW"]:
+                self.activate(event.window)
+            elif event.type == X.MapRequest:
+                event.window.map()
+            elif event.type == X.ConfigureRequest:
+                event.window.configure(x=event.x, y=event.y, width=event.width, height=event.height)
+
+    def activate(self, window):
+        window.configure(stack_mode=X.Above)
+        window.set_input_focus(X.RevertToParent, X.CurrentTime)
+        self.root.change_property(self.atoms["_NET_ACTIVE_WINDOW"], Xatom.WINDOW, 32, [window.id])
+        self.display.flush()
+
+    def close_all(self):
+        for window, _ in list(self.clients.values()):
+            self.destroy(window)
+        self.windows = {}
+        self.display.close()
+
+
+def churn(clients, names, active, churn_interval, paint_interval, seconds, seed=None):
+    """Open, close, relog and log out clients at random while repainting them all."""
+    rng = random.Random(seed)
+    for name in names[:active]:
+        clients.open(name)
+    logged_out = set()
+    deadline = time.monotonic() + seconds
+    next_churn = time.monotonic() + churn_interval
+    while time.monotonic() < deadline:
+        clients.handle_events()
+        clients.paint()
+        if time.monotonic() >= next_churn:
+            next_churn += churn_interval
+            # Whoever sat at character select since the last event logs back in
+            for name in logged_out:
+                clients.log_in(name)
+            logged_out.clear()
+            running = list(clients.windows)
+            idle = [name for name in names if name not in clients.windows]
+            action = rng.choice(["relog", "close", "open", "log_out", "activate"])
+            if action == "open" and idle:
+                clients.open(rng.choice(idle))
+            elif action == "close" and len(running) > 1:
+                clients.close(rng.choice(running))
+            elif action == "relog" and running:
+                clients.relog(rng.choice(running))
+            elif action == "log_out" and running:
+                name = rng.choice(running)
+                clients.log_out(name)
+                logged_out.add(name)
+            elif action == "activate" and running:
+                clients.activate(clients.windows[rng.choice(running)])
+            if len(clients.windows) < active // 2 and idle:
+                clients.open(rng.choice(idle))
+        time.sleep(paint_interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--display", help="display to use (default: $DISPLAY, or a new Xvfb with --start-xvfb)")
+    parser.add_argument("--start-xvfb", action="store_true")
+    parser.add_argument("--clients", type=int, default=8, help="clients running at the start")
+    parser.add_argument("--names", type=int, default=12, help="distinct characters to rotate through")
+    parser.add_argument("--churn", type=float, default=5.0, help="seconds between open/close/relog events")
+    parser.add_argument("--paint", type=float, default=0.2, help="seconds between content changes")
+    parser.add_argument("--seconds", type=float, default=3600.0)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    server = Xvfb(args.display).start() if args.start_xvfb else None
+    display_name = server.display if server else args.display or os.environ.get("DISPLAY")
+    print(f"Fake clients on {display_name}", flush=True)
+    clients = FakeClients(display_name)
+    try:
+        churn(clients, [f"Soak Pilot {number}" for number in range(args.names)], args.clients,
+              args.churn, args.paint, args.seconds, args.seed)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        clients.close_all()
+        if server:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QCheckBox
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QCheckBox, QLabel, QComboBox
 from utils.config import save_config
+from utils.log_setup import LOG_LEVELS, set_level
 
 class GeneralTab(QWidget):
     def __init__(self, config, parent=None):  # Accept config
@@ -13,4 +14,21 @@ class GeneralTab(QWidget):
         layout.addWidget(self.checkbox1)
         layout.addWidget(self.checkbox2)
 
+        # Takes effect at once; DEBUG while chasing a problem, INFO otherwise
+        self.log_level_label = QLabel("Log Level:")
+        self.log_level_combo = QComboBox()
+        self.log_level_combo.addItems(LOG_LEVELS)
+        self.log_level_combo.setCurrentText(self.config["settings"].get("logging", {}).get("level", "INFO"))
+        self.log_level_combo.currentTextChanged.connect(self.update_log_level)
+        log_level_row = QHBoxLayout()
+        log_level_row.addWidget(self.log_level_label)
+        log_level_row.addWidget(self.log_level_combo)
+        layout.addLayout(log_level_row)
+        layout.addStretch()
+
         self.setLayout(layout)
+
+    def update_log_level(self, level):
+        set_level(level)
+        self.config["settings"].setdefault("logging", {})["level"] = level
+        save_config(self.config)
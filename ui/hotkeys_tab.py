@@ -1,7 +1,12 @@
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QTextEdit, QLabel
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTextEdit, QLabel, QTableWidget,
+                             QTableWidgetItem, QComboBox, QPushButton, QHeaderView)
+from PyQt5.QtCore import Qt, pyqtSignal
 from utils.config import save_config
+from utils.hotkeys import HOTKEY_ACTIONS
 
 class HotkeysTab(QWidget):
+    bindings_changed = pyqtSignal()  # Bindings or cycle order edited; the hotkey table is recompiled
+
     def __init__(self, config, parent=None):
         super(HotkeysTab, self).__init__(parent)
         self.config = config  # Store config
@@ -19,9 +24,120 @@ class HotkeysTab(QWidget):
 
         layout.addWidget(self.label)
         layout.addWidget(self.character_textbox)
+
+        # Named cycle groups, each stepped by its own next/previous bindings
+        self.groups_label = QLabel("Cycle groups (one per line, e.g. logi: Char A, Char B):")
+        self.groups_textbox = QTextEdit()
+        self.groups_textbox.setPlaceholderText("logi: Character Name 1, Character Name 2\ndps: Character Name 3")
+        groups = self.config.get("hotkeys", {}).get("groups", {})
+        self.groups_textbox.setPlainText("\n".join(f"{name}: {', '.join(members)}" for name, members in groups.items()))
+        layout.addWidget(self.groups_label)
+        layout.addWidget(self.groups_textbox)
+
+        # Binding editor: key combo -> focus a character or step the cycle
+        self.bindings_label = QLabel("Key bindings (e.g. f1, ctrl+num 1, shift+tab):")
+        self.bindings_table = QTableWidget(0, 5)
+        self.bindings_table.setHorizontalHeaderLabels(["Key", "Action", "Character", "Group", "EVE focused only"])
+        self.bindings_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.add_binding_button = QPushButton("Add Binding")
+        self.remove_binding_button = QPushButton("Remove Binding")
+        self.add_binding_button.clicked.connect(self.add_binding)
+        self.remove_binding_button.clicked.connect(self.remove_binding)
+        binding_buttons = QHBoxLayout()
+        binding_buttons.addWidget(self.add_binding_button)
+        binding_buttons.addWidget(self.remove_binding_button)
+
+        layout.addWidget(self.bindings_label)
+        layout.addWidget(self.bindings_table)
+        layout.addLayout(binding_buttons)
         self.setLayout(layout)
 
+        self.load_bindings()
         self.character_textbox.textChanged.connect(self.save_character_list)
+        self.groups_textbox.textChanged.connect(self.save_groups)
+        self.bindings_table.itemChanged.connect(lambda item: self.save_bindings())
+
+    def load_bindings(self):
+        """Fill the table from config["hotkeys"]["bindings"]."""
+        self.bindings_table.blockSignals(True)
+        self.bindings_table.setRowCount(0)
+        for binding in self.config.get("hotkeys", {}).get("bindings", []):
+            self.insert_binding_row(binding)
+        self.bindings_table.blockSignals(False)
+
+    def insert_binding_row(self, binding):
+        row = self.bindings_table.rowCount()
+        self.bindings_table.insertRow(row)
+        self.bindings_table.setItem(row, 0, QTableWidgetItem(binding.get("key", "")))
+        action_combo = QComboBox()
+        action_combo.addItems(HOTKEY_ACTIONS)
+        action_combo.setCurrentText(binding.get("action", "focus"))
+        action_combo.currentTextChanged.connect(lambda _: self.save_bindings())
+        self.bindings_table.setCellWidget(row, 1, action_combo)
+        self.bindings_table.setItem(row, 2, QTableWidgetItem(binding.get("target", "")))
+        self.bindings_table.setItem(row, 3, QTableWidgetItem(binding.get("group", "")))
+        eve_only = QTableWidgetItem()
+        eve_only.setFlags(Qt.ItemIsUserCheckable | Qt.ItemIsEnabled)
+        eve_only.setCheckState(Qt.Checked if binding.get("eve_only", False) else Qt.Unchecked)
+        self.bindings_table.setItem(row, 4, eve_only)
+
+    def add_binding(self):
+        self.bindings_table.blockSignals(True)
+        self.insert_binding_row({"key": "", "action": "focus"})
+        self.bindings_table.blockSignals(False)
+
+    def remove_binding(self):
+        row = self.bindings_table.currentRow()
+        if row >= 0:
+            self.bindings_table.removeRow(row)
+            self.save_bindings()
+
+    def save_bindings(self):
+        """Save the table to config and recompile the hotkey table."""
+        bindings = []
+        for row in range(self.bindings_table.rowCount()):
+            key_item = self.bindings_table.item(row, 0)
+            key = key_item.text().strip() if key_item else ""
+            if not key:
+                continue
+            target_item = self.bindings_table.item(row, 2)
+            group_item = self.bindings_table.item(row, 3)
+            eve_only_item = self.bindings_table.item(row, 4)
+            binding = {"key": key, "action": self.bindings_table.cellWidget(row, 1).currentText()}
+            if binding["action"] == "focus":
+                binding["target"] = target_item.text().strip() if target_item else ""
+            elif group_item is not None and group_item.text().strip():
+                binding["group"] = group_item.text().strip()
+            if eve_only_item is not None and eve_only_item.checkState() == Qt.Checked:
+                binding["eve_only"] = True
+            bindings.append(binding)
+
+        self.config.setdefault("hotkeys", {})["bindings"] = bindings
+        save_config(self.config)
+        self.bindings_changed.emit()
+
+    def save_groups(self):
+        """Save the cycle groups to config."""
+        groups = {}
+        for line in self.groups_textbox.toPlainText().split("\n"):
+            name, _, members = line.partition(":")
+            if name.strip() and members.strip():
+                groups[name.strip()] = [member.strip() for member in members.split(",") if member.strip()]
+
+        self.config.setdefault("hotkeys", {})["groups"] = groups
+        save_config(self.config)
+        self.bindings_changed.emit()
+
+    def reload_character_list(self):
+        """Show the cycle order and groups from config again (e.g. after a profile switch)."""
+        stored_chars = self.config.get("hotkeys", {}).get("character_list", {})
+        self.character_textbox.blockSignals(True)
+        self.character_textbox.setPlainText("\n".join(stored_chars.keys()))
+        self.character_textbox.blockSignals(False)
+        groups = self.config.get("hotkeys", {}).get("groups", {})
+        self.groups_textbox.blockSignals(True)
+        self.groups_textbox.setPlainText("\n".join(f"{name}: {', '.join(members)}" for name, members in groups.items()))
+        self.groups_textbox.blockSignals(False)
 
     def save_character_list(self):
         """Save the list of character names to config."""
@@ -32,6 +148,7 @@ class HotkeysTab(QWidget):
                 
         self.config.setdefault("hotkeys", {})["character_list"] = char_dict
         save_config(self.config)
+        self.bindings_changed.emit()
 
     def get_character_list(self):
         """Return character names as a list, respecting the order in the text box."""
@@ -5,13 +5,21 @@ from .general_tab import GeneralTab
 from .settings_tab import SettingsTab
 from .profiles_tab import ProfilesTab
 from .hotkeys_tab import HotkeysTab  # Import HotkeysTab
+from .telemetry_tab import TelemetryTab
 from utils.config import load_config, save_config
+from utils.layout_engine import ARRANGE_MODES
+from utils.profiler import SamplingProfiler
+from utils.tracing import tracer
+
+PROFILE_DURATIONS = (10, 30, 60)  # Seconds offered in the tray menu
+TRACE_WINDOW = 30  # Seconds of spans saved by the tray action
 
 class MainWindow(QMainWindow):
     def __init__(self, config, window_manager, x11_interface):
         super().__init__()
         self.config = config  
         self.x11_interface = x11_interface  # Store X11Interface for hotkey access
+        self.window_manager = window_manager
         self.setWindowTitle("EVE-L Preview")
         self.setGeometry(100, 100, 600, 450)
 
@@ -22,19 +30,81 @@ class MainWindow(QMainWindow):
         quit_action = QAction("Exit", self)
         show_action.triggered.connect(self.show)
         quit_action.triggered.connect(lambda: self.close())
+        arrange_menu = tray_menu.addMenu("Arrange Thumbnails")
+        for mode in ARRANGE_MODES:
+            arrange_action = arrange_menu.addAction(mode.capitalize())
+            arrange_action.triggered.connect(lambda _, m=mode: self.window_manager.layout.arrange(m))
+        self.profiles_menu = tray_menu.addMenu("Profiles")
+        self.profiles_menu.aboutToShow.connect(self.build_profiles_menu)
+        self.profiler = SamplingProfiler(config)
+        self.profiler.finished.connect(self.on_profile_written)
+        self.profiling_menu = tray_menu.addMenu("Profiling")
+        self.profiling_menu.aboutToShow.connect(self.build_profiling_menu)
         tray_menu.addAction(show_action)
         tray_menu.addAction(quit_action)
         self.tray_icon.setContextMenu(tray_menu)
         self.tray_icon.show()
 
         self.tabs = QTabWidget()
-        self.tabs.addTab(ThumbnailsTab(self.config), "Thumbnails")  
+        self.tabs.addTab(ThumbnailsTab(self.config, window_manager), "Thumbnails")  
         self.tabs.addTab(SettingsTab(self.config), "Settings")      
-        self.tabs.addTab(ProfilesTab(self.config), "Profiles")      
+        self.tabs.addTab(ProfilesTab(self.config, window_manager), "Profiles")      
         self.tabs.addTab(GeneralTab(self.config), "General")        
-        self.tabs.addTab(HotkeysTab(self.config), "Hotkeys")  # Add Hotkeys tab
+        self.hotkeys_tab = HotkeysTab(self.config)
+        self.tabs.addTab(self.hotkeys_tab, "Hotkeys")  # Add Hotkeys tab
+        self.tabs.addTab(TelemetryTab(self.config, window_manager), "Telemetry")
         self.setCentralWidget(self.tabs)
 
+        window_manager.profiles.profile_switched.connect(lambda _: self.hotkeys_tab.reload_character_list())
+
+    def build_profiles_menu(self):
+        """List the stored profiles each time the tray submenu opens."""
+        self.profiles_menu.clear()
+        profiles = self.window_manager.profiles
+        active = profiles.get_active_profile()
+        for name in profiles.get_profiles():
+            action = self.profiles_menu.addAction(name)
+            action.setCheckable(True)
+            action.setChecked(name == active)
+            action.triggered.connect(lambda _, n=name: profiles.switch(n))
+        if self.profiles_menu.isEmpty():
+            self.profiles_menu.addAction("No profiles saved").setEnabled(False)
+
+    def build_profiling_menu(self):
+        """Offer a session length, or stopping the running session early; and the trace dump."""
+        self.profiling_menu.clear()
+        trace_action = self.profiling_menu.addAction(f"Save trace of the last {TRACE_WINDOW} s")
+        trace_action.setEnabled(tracer.enabled)
+        trace_action.triggered.connect(self.save_trace)
+        recorder = self.window_manager.recorder
+        if recorder.recording:
+            self.profiling_menu.addAction("Stop recording session").triggered.connect(self.stop_recording)
+        else:
+            self.profiling_menu.addAction("Record session for replay").triggered.connect(recorder.start)
+        self.profiling_menu.addSeparator()
+        if self.profiler.is_running():
+            self.profiling_menu.addAction("Stop and save profile").triggered.connect(self.profiler.stop)
+            return
+        for seconds in PROFILE_DURATIONS:
+            action = self.profiling_menu.addAction(f"Profile all threads for {seconds} s")
+            action.triggered.connect(lambda _, s=seconds: self.profiler.start(s))
+
+    def save_trace(self):
+        try:
+            path = tracer.save_recent(TRACE_WINDOW)
+        except OSError as e:
+            self.tray_icon.showMessage("EVE-L Preview", f"Could not save trace: {e}", QSystemTrayIcon.Warning, 5000)
+            return
+        self.tray_icon.showMessage("EVE-L Preview", f"Trace saved to {path}", QSystemTrayIcon.Information, 5000)
+
+    def stop_recording(self):
+        path = self.window_manager.recorder.stop()
+        if path is not None:
+            self.tray_icon.showMessage("EVE-L Preview", f"Session recorded to {path}", QSystemTrayIcon.Information, 5000)
+
+    def on_profile_written(self, path):
+        self.tray_icon.showMessage("EVE-L Preview", f"Profile saved to {path}", QSystemTrayIcon.Information, 5000)
+
     def closeEvent(self, event):
         # This is called when self.close() is executed
         if event.spontaneous():
@@ -1,16 +1,78 @@
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QCheckBox
-from utils.config import save_config
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QListWidget,
+                             QListWidgetItem, QPushButton)
+from PyQt5.QtCore import Qt
 
 class ProfilesTab(QWidget):
-    def __init__(self, config, parent=None):  # Accept config
+    def __init__(self, config, window_manager, parent=None):  # Accept config
         super(ProfilesTab, self).__init__(parent)
         self.config = config  # Store config
+        self.profiles = window_manager.profiles
         layout = QVBoxLayout()
 
-        self.checkbox1 = QCheckBox("Profiles option 1")
-        self.checkbox2 = QCheckBox("Profiles option 2")
+        self.label = QLabel("Profiles store positions, cycle order, alert regions and capture settings:")
+        self.profile_list = QListWidget()
+        self.profile_list.itemDoubleClicked.connect(lambda item: self.switch_profile())
+        self.profile_list.currentItemChanged.connect(self.show_selected)
 
-        layout.addWidget(self.checkbox1)
-        layout.addWidget(self.checkbox2)
+        self.name_input = QLineEdit()
+        self.name_input.setPlaceholderText("Profile name (e.g. Mining)")
+        self.hotkey_input = QLineEdit()
+        self.hotkey_input.setPlaceholderText("Hotkey (optional, e.g. ctrl+alt+1)")
 
+        self.save_button = QPushButton("Save Current Setup")
+        self.switch_button = QPushButton("Switch")
+        self.delete_button = QPushButton("Delete")
+        self.save_button.clicked.connect(self.save_profile)
+        self.switch_button.clicked.connect(self.switch_profile)
+        self.delete_button.clicked.connect(self.delete_profile)
+
+        buttons = QHBoxLayout()
+        buttons.addWidget(self.save_button)
+        buttons.addWidget(self.switch_button)
+        buttons.addWidget(self.delete_button)
+
+        layout.addWidget(self.label)
+        layout.addWidget(self.profile_list)
+        layout.addWidget(self.name_input)
+        layout.addWidget(self.hotkey_input)
+        layout.addLayout(buttons)
         self.setLayout(layout)
+
+        self.profiles.profiles_changed.connect(self.refresh)
+        self.profiles.profile_switched.connect(lambda _: self.refresh())
+        self.refresh()
+
+    def refresh(self):
+        """Rebuild the list, marking the active profile."""
+        active = self.profiles.get_active_profile()
+        self.profile_list.clear()
+        for name in self.profiles.get_profiles():
+            item = QListWidgetItem(f"{name} (active)" if name == active else name)
+            item.setData(Qt.UserRole, name)
+            self.profile_list.addItem(item)
+
+    def selected_name(self):
+        item = self.profile_list.currentItem()
+        return item.data(Qt.UserRole) if item else None
+
+    def show_selected(self, item, previous=None):
+        if item is None:
+            return
+        name = item.data(Qt.UserRole)
+        self.name_input.setText(name)
+        self.hotkey_input.setText(self.profiles.get_profiles().get(name, {}).get("hotkey", ""))
+
+    def save_profile(self):
+        name = self.name_input.text().strip()
+        if name:
+            self.profiles.save_profile(name, self.hotkey_input.text().strip())
+
+    def switch_profile(self):
+        name = self.selected_name()
+        if name:
+            self.profiles.switch(name)
+
+    def delete_profile(self):
+        name = self.selected_name()
+        if name:
+            self.profiles.delete_profile(name)
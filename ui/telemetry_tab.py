@@ -0,0 +1,121 @@
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel
+from PyQt5.QtCore import QTimer, Qt
+import time
+
+class TelemetryTab(QWidget):
+    def __init__(self, config, window_manager, parent=None):
+        super(TelemetryTab, self).__init__(parent)
+        self.config = config  # Store config
+        self.window_manager = window_manager
+        self.last_refresh = time.monotonic()
+        self.last_repainted = window_manager.repainted_pixels
+        self.last_frame_pixels = window_manager.frame_pixels
+        self.last_display_refresh = self.last_refresh
+        self.last_display_stats = {}  # display label -> cumulative capture stats at the previous refresh
+
+        layout = QVBoxLayout()
+
+        self.stats_label = QLabel()
+        self.stats_label.setAlignment(Qt.AlignLeft | Qt.AlignTop)
+        self.stats_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        layout.addWidget(self.stats_label)
+
+        self.setLayout(layout)
+
+        # Only refresh while the tab is actually visible
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        self.refresh()
+        self.timer.start(1000)
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
+
+    def get_lines(self):
+        """Collect one line per statistic."""
+        monitor = self.window_manager.resource_monitor
+        lines = [
+            f"Previews: {len(self.window_manager.previews)} bound, "
+            f"{len(self.window_manager.previews_by_character) - len(self.window_manager.previews)} parked, "
+            f"{len(self.window_manager.preview_pool)} pooled",
+            f"Capture backend: {self.window_manager.x11_interface.get_active_backend()}",
+            f"Load per CPU: {monitor.load_per_cpu:.2f}",
+            f"EVE client CPU: {monitor.eve_cpu_percent:.1f}% of machine",
+            f"Capture backoff: {monitor.backoff:.1f}x",
+            f"Capture thread policy: {', '.join(monitor.capture_policy) or 'default'}",
+            f"Input thread policy: {', '.join(monitor.input_policy) or 'default'}",
+        ]
+        scheduler = self.window_manager.capture_scheduler
+        if scheduler is not None:
+            workers, in_flight, peak = scheduler.get_status()
+            lines.append(f"Capture pool: {in_flight} of {workers} workers busy, peak {peak} "
+                         f"({len(self.window_manager.previews)} previews on the asyncio loop)")
+        lines.append(self.get_repaint_line())
+        lines.extend(self.get_display_lines())
+        stream_server = self.window_manager.stream_server
+        if stream_server.enabled:
+            viewers = stream_server.get_stats()
+            lines.append(f"Stream: {len(viewers)} viewers, {sum(sent for _, sent, _ in viewers) / 1024:.0f} KB sent, "
+                         f"{sum(dropped for _, _, dropped in viewers)} frames skipped for slow viewers")
+        frame_exporter = self.window_manager.frame_exporter
+        if frame_exporter.enabled:
+            lines.append(f"Frame export: {len(frame_exporter.segments)} characters in {frame_exporter.directory}")
+        x11_interface = self.window_manager.x11_interface
+        lines.extend(self.get_memory_lines(x11_interface.frame_memory.get_metrics()))
+        hotkey_manager = self.window_manager.hotkey_manager
+        if hotkey_manager is not None:
+            dispatches, average_ms, max_ms = hotkey_manager.get_dispatch_stats()
+            lines.append(f"Hotkey dispatch: {average_ms:.1f} ms avg, {max_ms:.1f} ms max over {dispatches} presses "
+                         f"(key event to focus request)")
+            names, hits, misses = hotkey_manager.prewarmer.get_status()
+            lines.append(f"Pre-warmed targets: {', '.join(names) or 'none'} ({hits} hits, {misses} misses)")
+        helper = "resident helper" if x11_interface.tools.enabled else "fork per call"
+        for operation, (calls, average_ms) in sorted(x11_interface.get_call_stats().items()):
+            lines.append(f"{operation}: {average_ms:.1f} ms avg over {calls} calls ({helper})")
+        return lines
+
+    def get_repaint_line(self):
+        """Repainted area per second since the previous refresh."""
+        now = time.monotonic()
+        elapsed = max(now - self.last_refresh, 1e-3)
+        repainted = (self.window_manager.repainted_pixels - self.last_repainted) / elapsed
+        full = (self.window_manager.frame_pixels - self.last_frame_pixels) / elapsed
+        self.last_refresh = now
+        self.last_repainted = self.window_manager.repainted_pixels
+        self.last_frame_pixels = self.window_manager.frame_pixels
+        share = f" ({repainted / full * 100:.0f}% of full frames)" if full else ""
+        return f"Repainted area: {repainted / 1000:.1f} kpx/s{share}"
+
+    def get_display_lines(self):
+        """Capture throughput of each display since the previous refresh."""
+        now = time.monotonic()
+        elapsed = max(now - self.last_display_refresh, 1e-3)
+        self.last_display_refresh = now
+        lines = []
+        for label, stats in self.window_manager.x11_interface.get_display_stats():
+            captures, failures, seconds, pixels = (current - previous for current, previous in
+                                                   zip(stats, self.last_display_stats.get(label, (0, 0, 0.0, 0))))
+            self.last_display_stats[label] = stats
+            average_ms = seconds / captures * 1000 if captures else 0.0
+            lines.append(f"Display {label}: {captures / elapsed:.1f} captures/s, {pixels / elapsed / 1e6:.1f} Mpx/s "
+                         f"source, {average_ms:.1f} ms avg, {failures} failed")
+        return lines
+
+    @staticmethod
+    def get_memory_lines(metrics):
+        """Process memory and frame budget/pool usage."""
+        mb = 1024 * 1024
+        return [
+            f"Memory: {metrics['rss'] / mb:.1f} MB RSS, {metrics['peak_rss'] / mb:.1f} MB peak",
+            f"Frame budget: {metrics['budget_in_use'] / mb:.1f} / {metrics['budget'] / mb:.0f} MB in use, "
+            f"{metrics['budget_peak'] / mb:.1f} MB peak, {metrics['budget_waits']} waits",
+            f"Frame pool: {metrics['pool_bytes'] / mb:.1f} MB, {metrics['pool_hits']} hits, "
+            f"{metrics['pool_misses']} misses, {metrics['pool_shared']} still shared when returned",
+        ]
+
+    def refresh(self):
+        self.stats_label.setText("\n".join(self.get_lines()))
@@ -1,10 +1,12 @@
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QCheckBox, QLabel, QLineEdit
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QCheckBox, QLabel, QLineEdit, QComboBox, QPushButton
 from utils.config import save_config  # Remove load_config (no need to reload)
+from utils.layout_engine import ARRANGE_MODES
 
 class ThumbnailsTab(QWidget):
-    def __init__(self, config, parent=None):  # Accept config explicitly
+    def __init__(self, config, window_manager=None, parent=None):  # Accept config explicitly
         super(ThumbnailsTab, self).__init__(parent)
         self.config = config  # Store config
+        self.window_manager = window_manager
 
         layout = QVBoxLayout()
 
@@ -29,6 +31,20 @@ class ThumbnailsTab(QWidget):
         layout.addWidget(self.font_family_label)  # Add font family label to layout
         layout.addWidget(self.font_family_input)  # Add font family input to layout
 
+        # Auto-arrange all thumbnails in one go
+        self.layout_mode_label = QLabel("Auto-Arrange Layout:")
+        self.layout_mode_combo = QComboBox()
+        self.layout_mode_combo.addItems(ARRANGE_MODES)
+        self.layout_mode_combo.setCurrentText(self.config["settings"].get("layout", {}).get("mode", "grid"))
+        self.layout_mode_combo.currentTextChanged.connect(self.update_layout_mode)
+        self.arrange_button = QPushButton("Arrange Now")
+        self.arrange_button.clicked.connect(self.arrange_thumbnails)
+        arrange_row = QHBoxLayout()
+        arrange_row.addWidget(self.layout_mode_combo)
+        arrange_row.addWidget(self.arrange_button)
+        layout.addWidget(self.layout_mode_label)
+        layout.addLayout(arrange_row)
+
         self.setLayout(layout)
 
         self.active_border_color_input.editingFinished.connect(self.update_active_border_color)
@@ -56,6 +72,14 @@ class ThumbnailsTab(QWidget):
         self.config["settings"]["font_family"] = font_family
         save_config(self.config)
 
+    def update_layout_mode(self, mode):
+        self.config["settings"].setdefault("layout", {})["mode"] = mode
+        save_config(self.config)
+
+    def arrange_thumbnails(self):
+        if self.window_manager is not None:
+            self.window_manager.layout.arrange(self.layout_mode_combo.currentText())
+
     def is_valid_hex_color(self, color):
         if color.startswith('#') and len(color) == 7:
             try:
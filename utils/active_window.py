@@ -0,0 +1,99 @@
+import select
+import logging
+from PyQt5.QtCore import QThread, pyqtSignal
+from Xlib import X, display as xdisplay
+from Xlib.error import XError
+
+
+class ActiveWindowWatcher(QThread):
+    """
+    Emits the new active window whenever _NET_ACTIVE_WINDOW changes on the
+    root window, whatever caused it (click, hotkey, the window manager).
+    Uses its own X connections and just waits on their sockets, so nothing
+    is polled or re-listed. With an asyncio loop the sockets are watched by
+    the loop and no thread is started.
+
+    displays is a list of (display name, id base); the emitted id is the
+    window id plus its display's base, as DisplaySet hands them out.
+    """
+
+    activated = pyqtSignal(object)  # Window id of the newly active window (may not fit 32 bits)
+
+    POLL_TIMEOUT = 0.5  # Seconds between checks of the stop flag
+
+    def __init__(self, displays=None, loop=None):
+        super().__init__()
+        self.displays = displays or [(None, 0)]
+        self.loop = loop  # asyncio loop to watch the sockets on instead of a thread of our own
+        self.watched = {}  # fileno -> (display, root, active atom, id base)
+        self.last_window = None
+        self.stopped = False
+
+    def start(self):
+        if self.loop is None:
+            super().start()
+            return
+        self.open_displays()
+        for fileno in self.watched:
+            self.loop.add_reader(fileno, self.drain, fileno)
+
+    def stop(self):
+        self.stopped = True
+        if self.loop is None:
+            self.wait(int(self.POLL_TIMEOUT * 2000))
+            return
+        for fileno, (display, _, _, _) in self.watched.items():
+            self.loop.remove_reader(fileno)
+            display.close()
+        self.watched = {}
+
+    def isRunning(self):
+        if self.loop is None:
+            return super().isRunning()
+        return bool(self.watched)
+
+    def open_displays(self):
+        for name, id_base in self.displays:
+            try:
+                display = xdisplay.Display(name)
+            except Exception as e:
+                logging.warning(f"Active window tracking disabled for {name or 'default display'}: {e}")
+                continue
+            root = display.screen().root
+            root.change_attributes(event_mask=X.PropertyChangeMask)
+            display.flush()
+            self.watched[display.fileno()] = (display, root, display.intern_atom("_NET_ACTIVE_WINDOW"), id_base)
+
+    def drain(self, fileno):
+        """Handle the queued events of one display; emits if the active window changed."""
+        display, root, active_atom, id_base = self.watched[fileno]
+        changed = False
+        for _ in range(display.pending_events()):
+            event = display.next_event()
+            if event.type == X.PropertyNotify and event.atom == active_atom:
+                changed = True
+        if not changed:
+            return
+        try:
+            prop = root.get_full_property(active_atom, X.AnyPropertyType)
+        except XError as e:
+            logging.debug(f"Could not read _NET_ACTIVE_WINDOW: {e}")
+            return
+        window = prop.value[0] if prop and len(prop.value) else 0
+        if window and id_base | window != self.last_window:
+            self.last_window = id_base | window
+            self.activated.emit(self.last_window)
+
+    def run(self):
+        self.open_displays()
+        if not self.watched:
+            return
+
+        while not self.stopped:
+            readable, _, _ = select.select(list(self.watched), [], [], self.POLL_TIMEOUT)
+            for fileno, (display, _, _, _) in self.watched.items():
+                if fileno in readable or display.pending_events():
+                    self.drain(fileno)
+
+        for display, _, _, _ in self.watched.values():
+            display.close()
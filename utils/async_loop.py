@@ -0,0 +1,76 @@
+import asyncio
+import logging
+
+try:
+    import qasync
+except ImportError:
+    qasync = None
+
+_loop = None  # The asyncio loop running inside the Qt loop, once installed
+
+
+def install(app, config):
+    """
+    Run asyncio inside the Qt event loop (qasync) unless settings.async_io.enabled is off.
+
+    Returns the loop, or None when disabled or qasync is missing; the app
+    then falls back to a capture thread per preview and the plain Qt loop.
+    """
+    global _loop
+    if not config["settings"].get("async_io", {}).get("enabled", True):
+        return None
+    if qasync is None:
+        logging.warning("qasync is not installed; using a capture thread per preview")
+        return None
+    _loop = qasync.QEventLoop(app)
+    asyncio.set_event_loop(_loop)
+    logging.info("Running on the asyncio/Qt event loop")
+    return _loop
+
+
+def get_loop():
+    return _loop
+
+
+def run(app):
+    """Run the app until it quits, on the asyncio loop if one was installed."""
+    if _loop is None:
+        return app.exec_()
+    quit_event = asyncio.Event()
+    app.aboutToQuit.connect(quit_event.set)
+    with _loop:
+        _loop.run_until_complete(quit_event.wait())
+    return 0
+
+
+async def run_blocking(function, *args, executor=None):
+    """Await a blocking call on an executor (default: the loop's own pool)."""
+    return await asyncio.get_running_loop().run_in_executor(executor, function, *args)
+
+
+class LoopEvent:
+    """
+    threading.Event look-alike for code on the asyncio loop: set() may come
+    from any thread (hotkeys boost captures from the keyboard thread), and
+    the loop side awaits wait(timeout) instead of blocking.
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.event = asyncio.Event()
+
+    def set(self):
+        self.loop.call_soon_threadsafe(self.event.set)
+
+    def clear(self):
+        self.event.clear()
+
+    def is_set(self):
+        return self.event.is_set()
+
+    async def wait(self, timeout=None):
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.event.is_set()
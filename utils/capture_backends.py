@@ -0,0 +1,401 @@
+import ctypes
+import ctypes.util
+import shutil
+import subprocess
+import threading
+import logging
+from errno import ENOSYS
+from PyQt5.QtGui import QImage, QImageReader
+from PyQt5.QtCore import Qt, QBuffer, QByteArray, QIODevice, QSize
+from PyQt5 import sip
+
+try:
+    from Xlib import X, display as xdisplay
+    from Xlib.ext import composite
+except ImportError:  # python-xlib missing - only the maim backend can work
+    X = xdisplay = composite = None
+
+CAPTURE_BACKENDS = {}  # backend name -> backend class, in registration order
+
+
+def register_backend(cls):
+    """Class decorator adding a capture backend to the registry."""
+    CAPTURE_BACKENDS[cls.name] = cls
+    return cls
+
+
+def root_window_id(display_name=None):
+    """Return the root window id, used as a synthetic calibration target."""
+    if xdisplay is None:
+        return None
+    display = xdisplay.Display(display_name)
+    try:
+        return display.screen().root.id
+    finally:
+        display.close()
+
+
+def scale_image(image, scale):
+    """Smooth-scale an image to scale percent; returns a detached copy either way."""
+    if scale is None:
+        return image.copy()
+    w, h = max(1, int(image.width() * scale / 100.0)), max(1, int(image.height() * scale / 100.0))
+    return image.scaled(w, h, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+
+class BackendUnavailable(Exception):
+    """Raised when a backend can never work here (missing binary or extension)."""
+
+
+class WindowGone(Exception):
+    """Raised by the ctypes backends when X reports the drawable as invalid."""
+
+
+class WindowHidden(Exception):
+    """Raised when a window is not on screen and a region capture would show whatever covers it."""
+
+
+class WindowUnsupported(Exception):
+    """Raised when a backend cannot capture this one window (e.g. its depth); others still work."""
+
+
+class CaptureBackend:
+    """
+    A way of grabbing the contents of one window.
+
+    grab(win_id, scale) returns (image, source width, source height) with the
+    image already reduced to scale percent (full size if scale is None), or
+    None. Backends scale while their full-resolution data is still in place
+    so no extra full-size copy is made. It raises BackendUnavailable when the
+    backend cannot work on this machine at all, WindowUnsupported when only
+    this window is out of reach, and lets Xlib errors such as BadDrawable
+    (or WindowGone) through so the caller can decide whether to fall back.
+
+    Backends may keep per-thread connections; release_thread() frees those
+    of the calling thread and is called when a capture thread ends.
+    """
+    name = None
+    tools = None  # ToolBroker for external binaries, set by X11Interface
+    display_name = None  # X display to capture from; None is $DISPLAY
+
+    def is_available(self):
+        return True
+
+    def grab(self, win_id, scale=None):
+        raise NotImplementedError
+
+    def release_thread(self):
+        pass
+
+
+@register_backend
+class MaimBackend(CaptureBackend):
+    """Fork maim per frame and decode its JPEG output at (close to) thumbnail size."""
+    name = "maim"
+
+    def is_available(self):
+        return shutil.which("maim") is not None
+
+    def grab(self, win_id, scale=None):
+        argv = ["maim", "-i", hex(win_id), "-f", "jpg", "-m", "2", "-o"]
+        try:
+            if self.tools is not None:
+                result = self.tools.run(argv, binary=True)
+                if result.returncode != 0:
+                    logging.debug(f"maim process failed with exit code {result.returncode}")
+                    return None
+                jpg_data = result.stdout
+            else:
+                jpg_data = subprocess.check_output(argv, stderr=subprocess.DEVNULL)
+        except FileNotFoundError:
+            raise BackendUnavailable("maim binary not found")
+        except subprocess.CalledProcessError as e:
+            logging.debug(f"maim process failed: {e}")
+            return None
+
+        buffer = QBuffer()
+        buffer.setData(QByteArray(jpg_data))
+        buffer.open(QIODevice.ReadOnly)
+        reader = QImageReader(buffer, b"jpg")
+        source = reader.size()
+        if scale is not None and source.isValid():
+            # libjpeg decodes straight to a reduced size; no full-resolution image is built
+            reader.setScaledSize(QSize(max(1, int(source.width() * scale / 100.0)),
+                                       max(1, int(source.height() * scale / 100.0))))
+        qt_img = reader.read()
+        if qt_img.isNull():
+            return None
+        return qt_img, source.width(), source.height()
+
+
+class _XlibBackend(CaptureBackend):
+    """Shared per-thread python-xlib connection handling."""
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def is_available(self):
+        if xdisplay is None:
+            return False
+        try:
+            self._display()
+            return True
+        except Exception as e:
+            logging.debug(f"{self.name} backend unavailable: {e}")
+            return False
+
+    def _display(self):
+        # Xlib connections are not shared between capture threads
+        if getattr(self.local, "display", None) is None:
+            self.local.display = xdisplay.Display(self.display_name)
+        return self.local.display
+
+    def release_thread(self):
+        display = getattr(self.local, "display", None)
+        if display is not None:
+            self.local.display = None
+            display.close()
+
+    @staticmethod
+    def _to_qimage(data, width, height, scale):
+        # ZPixmap at depth 24/32 is 4 bytes per pixel, rows padded to 32 bits
+        image = QImage(data, width, height, width * 4, QImage.Format_RGB32)
+        return scale_image(image, scale), width, height
+
+
+@register_backend
+class XGetImageBackend(_XlibBackend):
+    """Plain XGetImage over the X socket."""
+    name = "xgetimage"
+
+    def grab(self, win_id, scale=None):
+        display = self._display()
+        window = display.create_resource_object("window", win_id)
+        geom = window.get_geometry()
+        raw = window.get_image(0, 0, geom.width, geom.height, X.ZPixmap, 0xffffffff)
+        return self._to_qimage(raw.data, geom.width, geom.height, scale)
+
+
+@register_backend
+class CompositeBackend(_XlibBackend):
+    """Read the window's off-screen pixmap kept by the compositing manager."""
+    name = "composite"
+
+    def is_available(self):
+        if not super().is_available():
+            return False
+        return self._display().has_extension(composite.extname)
+
+    def grab(self, win_id, scale=None):
+        display = self._display()
+        window = display.create_resource_object("window", win_id)
+        geom = window.get_geometry()
+        pixmap = window.composite_name_window_pixmap()
+        try:
+            raw = pixmap.get_image(0, 0, geom.width, geom.height, X.ZPixmap, 0xffffffff)
+        finally:
+            pixmap.free()
+        return self._to_qimage(raw.data, geom.width, geom.height, scale)
+
+
+class _XImage(ctypes.Structure):
+    _fields_ = [
+        ("width", ctypes.c_int), ("height", ctypes.c_int),
+        ("xoffset", ctypes.c_int), ("format", ctypes.c_int),
+        ("data", ctypes.c_void_p),
+        ("byte_order", ctypes.c_int), ("bitmap_unit", ctypes.c_int),
+        ("bitmap_bit_order", ctypes.c_int), ("bitmap_pad", ctypes.c_int),
+        ("depth", ctypes.c_int), ("bytes_per_line", ctypes.c_int),
+        ("bits_per_pixel", ctypes.c_int),
+        ("red_mask", ctypes.c_ulong), ("green_mask", ctypes.c_ulong), ("blue_mask", ctypes.c_ulong),
+        ("obdata", ctypes.c_void_p),
+        ("funcs", ctypes.c_void_p * 6),
+    ]
+
+
+class _XShmSegmentInfo(ctypes.Structure):
+    _fields_ = [
+        ("shmseg", ctypes.c_ulong), ("shmid", ctypes.c_int),
+        ("shmaddr", ctypes.c_void_p), ("readOnly", ctypes.c_int),
+    ]
+
+
+class _XErrorEvent(ctypes.Structure):
+    _fields_ = [
+        ("type", ctypes.c_int), ("display", ctypes.c_void_p),
+        ("resourceid", ctypes.c_ulong), ("serial", ctypes.c_ulong),
+        ("error_code", ctypes.c_ubyte), ("request_code", ctypes.c_ubyte), ("minor_code", ctypes.c_ubyte),
+    ]
+
+
+_X_ERROR_HANDLER = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p, ctypes.POINTER(_XErrorEvent))
+
+
+@register_backend
+class XShmBackend(CaptureBackend):
+    """
+    XShmGetImage through libX11/libXext via ctypes.
+
+    The server writes pixels straight into a SysV shared-memory segment, so
+    there is no copy over the X socket. Segments are kept per thread and only
+    recreated when the window size changes.
+    """
+    name = "xshm"
+
+    IPC_PRIVATE = 0
+    IPC_CREAT = 0o1000
+    IPC_RMID = 0
+    ZPIXMAP = 2
+    # The X error handler is process wide, so one per display would overwrite each other
+    error_lock = threading.Lock()
+    error_code = 0
+
+    def __init__(self):
+        self.local = threading.local()
+        self.xlib = self.xext = self.libc = None
+        try:
+            self.xlib = ctypes.CDLL(ctypes.util.find_library("X11"))
+            self.xext = ctypes.CDLL(ctypes.util.find_library("Xext"))
+            self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        except (OSError, TypeError) as e:
+            logging.debug(f"xshm backend libraries missing: {e}")
+            return
+
+        self.xlib.XOpenDisplay.restype = ctypes.c_void_p
+        self.xlib.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        self.xlib.XDefaultScreen.argtypes = [ctypes.c_void_p]
+        self.xlib.XDefaultVisual.restype = ctypes.c_void_p
+        self.xlib.XDefaultVisual.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        self.xlib.XDefaultDepth.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        self.xlib.XGetGeometry.argtypes = [ctypes.c_void_p, ctypes.c_ulong] + [ctypes.c_void_p] * 7
+        self.xlib.XSync.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        self.xlib.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        self.xlib.XFree.argtypes = [ctypes.c_void_p]
+        self.xext.XShmQueryExtension.argtypes = [ctypes.c_void_p]
+        self.xext.XShmCreateImage.restype = ctypes.POINTER(_XImage)
+        self.xext.XShmCreateImage.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int,
+                                              ctypes.c_void_p, ctypes.POINTER(_XShmSegmentInfo),
+                                              ctypes.c_uint, ctypes.c_uint]
+        self.xext.XShmAttach.argtypes = [ctypes.c_void_p, ctypes.POINTER(_XShmSegmentInfo)]
+        self.xext.XShmDetach.argtypes = [ctypes.c_void_p, ctypes.POINTER(_XShmSegmentInfo)]
+        self.xext.XShmGetImage.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(_XImage),
+                                           ctypes.c_int, ctypes.c_int, ctypes.c_ulong]
+        self.libc.shmget.argtypes = [ctypes.c_int, ctypes.c_size_t, ctypes.c_int]
+        self.libc.shmat.restype = ctypes.c_void_p
+        self.libc.shmat.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_int]
+        self.libc.shmdt.argtypes = [ctypes.c_void_p]
+        self.libc.shmctl.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_void_p]
+
+        # Without a handler, any X error (e.g. a closed window) would exit the process
+        self.xlib.XSetErrorHandler.restype = ctypes.c_void_p
+        self.xlib.XSetErrorHandler.argtypes = [_X_ERROR_HANDLER]
+        self.error_handler = _X_ERROR_HANDLER(self._on_x_error)
+        self.xlib.XSetErrorHandler(self.error_handler)
+
+    def _on_x_error(self, display, event):
+        XShmBackend.error_code = event.contents.error_code
+        return 0
+
+    def is_available(self):
+        if self.xlib is None:
+            return False
+        try:
+            return bool(self.xext.XShmQueryExtension(self._display()))
+        except BackendUnavailable:
+            return False
+
+    def _display(self):
+        if getattr(self.local, "display", None) is None:
+            display = self.xlib.XOpenDisplay(self.display_name.encode() if self.display_name else None)
+            if not display:
+                raise BackendUnavailable("XOpenDisplay failed")
+            self.local.display = display
+            self.local.image = None
+            self.local.size = None
+        return self.local.display
+
+    def _release_image(self):
+        image, shminfo = self.local.image
+        self.xext.XShmDetach(self.local.display, ctypes.byref(shminfo))
+        self.xlib.XSync(self.local.display, 0)
+        self.xlib.XFree(image)
+        self.libc.shmdt(shminfo.shmaddr)
+        self.local.image = None
+        self.local.size = None
+
+    def release_thread(self):
+        display = getattr(self.local, "display", None)
+        if display is None:
+            return
+        if self.local.image is not None:
+            self._release_image()
+        self.local.display = None
+        self.xlib.XCloseDisplay(display)
+
+    def _image_for(self, display, width, height, depth):
+        if self.local.image is not None and self.local.size == (width, height, depth):
+            return self.local.image[0]
+        if self.local.image is not None:
+            self._release_image()
+
+        screen = self.xlib.XDefaultScreen(display)
+        if depth != self.xlib.XDefaultDepth(display, screen):
+            raise WindowUnsupported(f"window depth {depth} differs from default visual")
+
+        shminfo = _XShmSegmentInfo()
+        image = self.xext.XShmCreateImage(display, self.xlib.XDefaultVisual(display, screen), depth,
+                                          self.ZPIXMAP, None, ctypes.byref(shminfo), width, height)
+        if not image:
+            raise WindowUnsupported(f"XShmCreateImage failed for {width}x{height}")
+
+        size = image.contents.bytes_per_line * height
+        shminfo.shmid = self.libc.shmget(self.IPC_PRIVATE, size, self.IPC_CREAT | 0o600)
+        if shminfo.shmid < 0:
+            errno = ctypes.get_errno()
+            self.xlib.XFree(image)
+            if errno == ENOSYS:
+                raise BackendUnavailable("System V shared memory not supported")
+            # Usually a segment over SHMMAX; smaller windows still fit
+            raise WindowUnsupported(f"shmget of {size} bytes failed: errno {errno}")
+        shminfo.shmaddr = self.libc.shmat(shminfo.shmid, None, 0)
+        if shminfo.shmaddr in (None, ctypes.c_void_p(-1).value):
+            errno = ctypes.get_errno()
+            self.libc.shmctl(shminfo.shmid, self.IPC_RMID, None)
+            self.xlib.XFree(image)
+            raise WindowUnsupported(f"shmat failed: errno {errno}")
+        image.contents.data = shminfo.shmaddr
+        shminfo.readOnly = 0
+        self.xext.XShmAttach(display, ctypes.byref(shminfo))
+        self.xlib.XSync(display, 0)
+        # Mark for removal now; the kernel frees it once both sides detach
+        self.libc.shmctl(shminfo.shmid, self.IPC_RMID, None)
+
+        self.local.image = (image, shminfo)
+        self.local.size = (width, height, depth)
+        return image
+
+    def grab(self, win_id, scale=None):
+        display = self._display()
+        root = ctypes.c_ulong()
+        x, y = ctypes.c_int(), ctypes.c_int()
+        width, height, border, depth = ctypes.c_uint(), ctypes.c_uint(), ctypes.c_uint(), ctypes.c_uint()
+
+        with self.error_lock:
+            XShmBackend.error_code = 0
+            ok = self.xlib.XGetGeometry(display, win_id, ctypes.byref(root), ctypes.byref(x), ctypes.byref(y),
+                                        ctypes.byref(width), ctypes.byref(height),
+                                        ctypes.byref(border), ctypes.byref(depth))
+            if not ok or self.error_code:
+                raise WindowGone(f"X error {self.error_code} on window {hex(win_id)}")
+
+            image = self._image_for(display, width.value, height.value, depth.value)
+            ok = self.xext.XShmGetImage(display, win_id, image, 0, 0, 0xffffffff)
+            self.xlib.XSync(display, 0)
+            if not ok or self.error_code:
+                raise WindowGone(f"X error {self.error_code} on window {hex(win_id)}")
+
+        # Wrap the (per-thread) shared segment directly - the only copy made is the scaled result
+        contents = image.contents
+        frame = QImage(sip.voidptr(contents.data), contents.width, contents.height,
+                       contents.bytes_per_line, QImage.Format_RGB32)
+        return scale_image(frame, scale), contents.width, contents.height
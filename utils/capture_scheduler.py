@@ -0,0 +1,104 @@
+import os
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from utils.async_loop import LoopEvent
+from utils.profiler import name_current_thread
+from utils.update_thread import UpdateThread
+
+
+class CaptureScheduler:
+    """
+    Runs every preview's capture loop as a task on the asyncio loop, with
+    the blocking work (grab, scale, analysis, conversion) on one bounded
+    pool. Threads stay at capture_workers however many clients there are,
+    and a slow capture only delays its own preview.
+    """
+
+    def __init__(self, loop, config, resource_monitor=None):
+        self.loop = loop
+        settings = config["settings"].get("async_io", {})
+        self.workers = settings.get("capture_workers", min(4, os.cpu_count() or 1))
+        self.resource_monitor = resource_monitor
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="capture",
+                                           initializer=self._init_worker)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def _init_worker(self):
+        name_current_thread("capture")
+        # Same policy as a capture thread: never compete with the game clients
+        if self.resource_monitor is not None:
+            self.resource_monitor.apply_capture_policy()
+
+    def run_step(self, capture):
+        with self.lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            return capture.capture_step()
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def get_status(self):
+        """(workers, captures running now, most captures running at once)"""
+        with self.lock:
+            return self.workers, self.in_flight, self.peak_in_flight
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ScheduledCapture(UpdateThread):
+    """
+    UpdateThread's API and capture step, driven by a task on the asyncio
+    loop instead of a thread of its own. The QThread is never started.
+    Signals emitted from the pool reach the preview queued, as before.
+    """
+
+    def __init__(self, scheduler, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.scheduler = scheduler
+        self.wake = LoopEvent(scheduler.loop)
+        self.task = None
+        self.stepping = False  # A capture_step is running on the pool
+
+    def start(self):
+        self.task = self.scheduler.loop.create_task(self.capture_loop())
+
+    async def capture_loop(self):
+        loop = self.scheduler.loop
+        try:
+            while not self.stopped:
+                if self.paused:
+                    await self.wake.wait()
+                    self.wake.clear()
+                    continue
+                self.stepping = True
+                try:
+                    wait = await loop.run_in_executor(self.scheduler.executor, self.scheduler.run_step, self)
+                except RuntimeError:
+                    return  # Pool shut down on exit
+                finally:
+                    self.stepping = False
+                if wait:
+                    await self.wake.wait(self.sleep_interval() / 1000)
+                    self.wake.clear()
+        finally:
+            # A preview disposed mid-step leaves this cleanup to us (see delete_when_finished)
+            self.previous_image = None
+            logging.debug(f"Capture task for {self.window_id} ended")
+
+    def isRunning(self):
+        return self.task is not None and not self.task.done()
+
+    def wait(self, msecs=None):
+        # Cannot block the loop the task runs on; report whether a step is still out on the pool
+        return not self.stepping
+
+    def delete_when_finished(self):
+        # Never started as a QThread and still owned by Python: the task keeps this
+        # object alive until its step returns, then the exit path above cleans up
+        pass
@@ -1,3 +1,4 @@
+import copy
 import json
 import os
 from datetime import datetime
@@ -18,11 +19,114 @@ DEFAULT_CONFIG = {
         "enable_borders": True,
         "active_border_color": "#47f73e",
         "inactive_border_color": "#808080",
-        "font_family": "Courier New"
+        "font_family": "Courier New",
+        "display_backend": "auto",
+        "capture_backend": "auto",
+        "capture_calibration_samples": 3,
+        "capture_calibration": {},
+        "hover_zoom": {
+            "enabled": True,
+            "scale": 30.0,
+            "interval": 100
+        },
+        "tool_broker": {
+            "enabled": True
+        },
+        "resource_control": {
+            "enabled": True,
+            "capture_nice": 10,
+            "capture_sched_idle": False,
+            "capture_cpus": [],
+            "input_nice": -5,
+            "input_cpus": [],
+            "load_threshold": 0.9,
+            "eve_cpu_threshold": 70.0,
+            "max_backoff": 4.0,
+            "sample_interval": 2000
+        },
+        "thumbnail_cache": {
+            "enabled": True,
+            "max_entries": 32,
+            "slot_size": 131072,
+            "write_interval": 10
+        },
+        "frame_memory": {
+            "budget_mb": 128,
+            "pool_max_mb": 64
+        },
+        "layout": {
+            "mode": "grid",
+            "spacing": 0
+        },
+        "preview_pool": {
+            "park_ttl": 600,
+            "pool_size": 4
+        },
+        "displays": {
+            "extra": [],
+            "capture_slots": 4
+        },
+        "stream": {
+            "enabled": False,
+            "host": "127.0.0.1",
+            "port": 8765,
+            "token": "",
+            "max_kbps": 2000,
+            "max_clients": 4
+        },
+        "frame_export": {
+            "enabled": False,
+            "directory": "",
+            "min_capacity_kb": 256
+        },
+        "prewarm": {
+            "enabled": True,
+            "capture_boost": 0.7
+        },
+        "profiler": {
+            "interval_ms": 10,
+            "max_depth": 64
+        },
+        "tracing": {
+            "enabled": True,
+            "buffer_events": 50000
+        },
+        "logging": {
+            "level": "INFO",
+            "json_file": False,
+            "rate_limit": {
+                "per_site": 20,
+                "window_s": 10
+            }
+        },
+        "async_io": {
+            "enabled": True,
+            "capture_workers": 4
+        },
+        "capture_interval": REFRESH_RATE,
+        "capture_intervals": {},
+        "thumbnail_format": "rgb32",
+        "thumbnail_formats": {}
     },
     "thumbnail_position": {},
     "hotkeys": {
-        "character_list": {}
+        "character_list": {},
+        "groups": {},
+        "bindings": [
+            {"key": "tab", "action": "next", "eve_only": True},
+            {"key": "shift+tab", "action": "previous", "eve_only": True}
+        ]
+    },
+    "profiles": {},
+    "active_profile": "",
+    "alerts": {
+        "enabled": True,
+        "frame_budget_ms": 1.0,
+        "border_color": "#ff3030",
+        "border_width": 3,
+        "sound": "",
+        "sound_cooldown": 10,
+        "rois": {}
     }
 }
 
@@ -36,6 +140,15 @@ def load_config():
                     config["hotkeys"] = {"character_list": {}}
                 if "character_list" not in config.get("hotkeys", {}):
                     config["hotkeys"]["character_list"] = {}
+                config["hotkeys"].setdefault("groups", {})
+                if "bindings" not in config["hotkeys"]:
+                    config["hotkeys"]["bindings"] = copy.deepcopy(DEFAULT_CONFIG["hotkeys"]["bindings"])
+                if "alerts" not in config:
+                    config["alerts"] = copy.deepcopy(DEFAULT_CONFIG["alerts"])
+                config.setdefault("profiles", {})
+                config.setdefault("active_profile", "")
+                for key, value in DEFAULT_CONFIG["settings"].items():
+                    config.setdefault("settings", {}).setdefault(key, copy.deepcopy(value))
                 return config
         except (json.JSONDecodeError, IOError) as e:
             print(f"Warning: Could not load config file {CONFIG_FILE}: {e}")
@@ -43,6 +156,8 @@ def load_config():
     return DEFAULT_CONFIG
 
 def save_config(config):
-    config["metadata"]["lastmodified"] = str(datetime.now())
-    with open(CONFIG_FILE, 'w') as f:
-        json.dump(config, f, indent=4)
\ No newline at end of file
+    from utils.tracing import tracer  # Imported here: tracing itself needs CONFIG_FOLDER
+    with tracer.span("save_config", "config"):
+        config["metadata"]["lastmodified"] = str(datetime.now())
+        with open(CONFIG_FILE, 'w') as f:
+            json.dump(config, f, indent=4)
\ No newline at end of file
@@ -0,0 +1,124 @@
+import logging
+from utils.active_window import ActiveWindowWatcher
+from utils.async_loop import get_loop
+from utils.frame_memory import FrameMemoryManager
+from utils.x11_interface import X11Interface
+
+try:
+    from Xlib import display as xdisplay
+except ImportError:
+    xdisplay = None
+
+DISPLAY_SHIFT = 32  # X window ids fit in 29 bits; the display index goes above them
+
+
+class DisplaySet:
+    """
+    Several X displays ($DISPLAY plus settings.displays.extra, e.g. a Xephyr
+    or a second Xvfb) behind the X11Interface API.
+
+    Each display keeps its own X11Interface: Xlib connections, tool helpers
+    running with that DISPLAY, calibrated capture backends and capture
+    scheduler. Window ids are tagged with the display index above bit 32,
+    so WindowManager and the hotkeys see one flat set of windows and build
+    one set of previews and one cycle order from it.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.frame_memory = FrameMemoryManager(config)  # One budget for the whole process
+        self.interfaces = []
+        names = [None] + list(config["settings"].get("displays", {}).get("extra", []))
+        for name in names:
+            if name is not None and not self._reachable(name):
+                continue
+            id_base = len(self.interfaces) << DISPLAY_SHIFT
+            self.interfaces.append(X11Interface(config, name, self.frame_memory, id_base))
+        self.registries = {index: [] for index in range(len(self.interfaces))}  # Last listed windows per display
+        logging.info(f"Managing displays: {[interface.display_label() for interface in self.interfaces]}")
+
+    @staticmethod
+    def _reachable(name):
+        if xdisplay is None:
+            return True  # Cannot check; the tools will report errors
+        try:
+            xdisplay.Display(name).close()
+            return True
+        except Exception as e:
+            logging.warning(f"Skipping display {name}: {e}")
+            return False
+
+    @property
+    def tools(self):
+        return self.interfaces[0].tools
+
+    def _route(self, window_id):
+        """(interface, window id on its display) for a tagged window id."""
+        win_id = int(window_id, 16) if isinstance(window_id, str) else window_id
+        index = win_id >> DISPLAY_SHIFT
+        if index >= len(self.interfaces):
+            raise ValueError(f"window {hex(win_id)} is on an unknown display")
+        return self.interfaces[index], win_id & ((1 << DISPLAY_SHIFT) - 1)
+
+    # ---------------- X11Interface API ---------------------------------
+    def list_windows(self):
+        """wmctrl -l lines of every display, with tagged window ids."""
+        lines = []
+        for index, interface in enumerate(self.interfaces):
+            listed = []
+            for line in interface.list_windows():
+                parts = line.split(None, 1)
+                if len(parts) == 2:
+                    listed.append(f"{hex(interface.id_base | int(parts[0], 16))} {parts[1]}")
+            self.registries[index] = listed
+            lines.extend(listed)
+        return lines
+
+    def capture_window(self, window_id, scale=None):
+        interface, win_id = self._route(window_id)
+        return interface.capture_window(win_id, scale)
+
+    def release_capture_thread(self):
+        for interface in self.interfaces:
+            interface.release_capture_thread()
+
+    def rescale(self, image, from_scale):
+        return self.interfaces[0].rescale(image, from_scale)
+
+    def focus_and_raise_window(self, window_id, kwin_uuid=None):
+        interface, win_id = self._route(window_id)
+        return interface.focus_and_raise_window(hex(win_id), kwin_uuid)
+
+    def get_kwin_window_id(self, window_id):
+        interface, win_id = self._route(window_id)
+        return interface.get_kwin_window_id(hex(win_id))
+
+    def active_window_name(self):
+        return self.interfaces[0].active_window_name()
+
+    def create_active_window_watcher(self):
+        return ActiveWindowWatcher([(interface.display_name, interface.id_base) for interface in self.interfaces],
+                                    get_loop())
+
+    def get_active_backend(self):
+        return ", ".join(f"{interface.display_label()}: {interface.get_active_backend()}"
+                         for interface in self.interfaces)
+
+    def get_call_stats(self):
+        """Call timings summed over all displays."""
+        merged = {}
+        for interface in self.interfaces:
+            for operation, (calls, average_ms) in interface.get_call_stats().items():
+                total_calls, total_ms = merged.get(operation, (0, 0.0))
+                merged[operation] = (total_calls + calls, total_ms + calls * average_ms)
+        return {operation: (calls, total_ms / calls) for operation, (calls, total_ms) in merged.items()}
+
+    def get_display_stats(self):
+        stats = []
+        for interface in self.interfaces:
+            stats.extend(interface.get_display_stats())
+        return stats
+
+    def close(self):
+        for interface in self.interfaces:
+            interface.close()
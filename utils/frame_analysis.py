@@ -0,0 +1,180 @@
+import time
+import logging
+from collections import deque
+from PyQt5.QtGui import QImage
+
+try:
+    import numpy as np
+except ImportError:  # Alerts are optional; everything else works without NumPy
+    np = None
+
+HIST_BITS = 4  # Bits kept per channel for the colour histogram (4096 bins)
+MAX_STRIDE = 8
+
+
+class FrameAnalyzer:
+    """
+    Checks user-defined regions of a character's thumbnail for alert conditions.
+
+    Works on the already-downscaled frame as a NumPy view of the QImage
+    buffer (no copy). Supported ROI types:
+      * "color"  - share of pixels near any listed colour, via a coarse
+                   colour histogram (e.g. red/neutral standings in local)
+      * "change" - mean absolute difference against the previous frame
+      * "flash"  - the change score crossing a threshold repeatedly within
+                   the last N frames (a blinking window or icon)
+    If a frame takes longer than the budget, regions are subsampled with a
+    larger stride until it fits again.
+    """
+
+    def __init__(self, config, character_name):
+        self.config = config
+        self.character_name = character_name
+        self.stride = 1
+        self.last_cost_ms = 0.0
+        self.previous = {}  # ROI name -> previous region
+        self.history = {}  # ROI name -> whether each recent frame toggled between changing and still
+        self.changing = {}  # ROI name -> whether the last frame changed
+        self.compiled = []
+        self.compiled_from = None
+
+        if np is None and self._roi_specs():
+            logging.warning("Alert ROIs configured but NumPy is not installed - alerts disabled.")
+
+    def _settings(self):
+        return self.config.get("alerts", {})
+
+    def _roi_specs(self):
+        rois = self._settings().get("rois", {})
+        return rois.get("*", []) + rois.get(self.character_name, [])
+
+    def is_enabled(self):
+        return np is not None and self._settings().get("enabled", True) and bool(self._roi_specs())
+
+    @staticmethod
+    def _parse_colour(colour):
+        """(r, g, b) from "#rgb" or "#rrggbb"; ValueError otherwise."""
+        digits = colour[1:] if isinstance(colour, str) and colour.startswith("#") else ""
+        if len(digits) == 3:
+            digits = "".join(c * 2 for c in digits)
+        if len(digits) != 6:
+            raise ValueError(f"colour {colour!r} is not #rgb or #rrggbb")
+        return tuple(int(digits[i:i + 2], 16) for i in (0, 2, 4))
+
+    @staticmethod
+    def _colour_mask(colours, tolerance):
+        """Histogram bins whose centre lies within tolerance of any (r, g, b) colour."""
+        levels = 1 << HIST_BITS
+        step = 256 // levels
+        centres = np.arange(levels) * step + step // 2
+        mask = np.zeros((levels, levels, levels), dtype=bool)  # indexed [b, g, r]
+        for r, g, b in colours:
+            near_b = np.abs(centres - b) <= tolerance
+            near_g = np.abs(centres - g) <= tolerance
+            near_r = np.abs(centres - r) <= tolerance
+            mask |= near_b[:, None, None] & near_g[None, :, None] & near_r[None, None, :]
+        return mask.ravel()
+
+    def _compile(self, specs):
+        # Checked once here so a typo in the config drops one ROI instead of failing every frame
+        compiled = []
+        for spec in specs:
+            try:
+                roi = dict(spec)
+                roi.setdefault("name", roi.get("detect", "roi"))
+                roi.setdefault("rect", [0.0, 0.0, 1.0, 1.0])
+                rect = roi["rect"]
+                if len(rect) != 4 or not all(isinstance(v, (int, float)) for v in rect):
+                    raise ValueError(f"rect {rect!r} is not [x, y, width, height]")
+                if roi.get("detect") == "color":
+                    colours = [self._parse_colour(colour) for colour in roi.get("colors", [])]
+                    roi["mask"] = self._colour_mask(colours, roi.get("tolerance", 40))
+            except (TypeError, ValueError) as e:
+                logging.warning(f"Ignoring alert ROI {spec!r} for {self.character_name}: {e}")
+                continue
+            compiled.append(roi)
+        self.compiled = compiled
+        self.compiled_from = specs
+        self.previous.clear()
+        self.history.clear()
+        self.changing.clear()
+
+    @staticmethod
+    def _pixels(image):
+        """(h, w, 3) uint8 BGR view over an RGB32 QImage buffer."""
+        ptr = image.constBits()
+        ptr.setsize(image.sizeInBytes())
+        rows = np.frombuffer(ptr, dtype=np.uint8).reshape(image.height(), image.bytesPerLine())
+        return rows[:, :image.width() * 4].reshape(image.height(), image.width(), 4)[..., :3]
+
+    def _region(self, pixels, rect):
+        h, w = pixels.shape[:2]
+        x, y, rw, rh = rect
+        x0, y0 = int(x * w), int(y * h)
+        x1, y1 = max(x0 + 1, int((x + rw) * w)), max(y0 + 1, int((y + rh) * h))
+        return pixels[y0:y1:self.stride, x0:x1:self.stride]
+
+    def _colour_fraction(self, region, mask):
+        quantised = (region >> (8 - HIST_BITS)).astype(np.intp)
+        bins = (quantised[..., 0] << (2 * HIST_BITS)) | (quantised[..., 1] << HIST_BITS) | quantised[..., 2]
+        histogram = np.bincount(bins.ravel(), minlength=mask.size)
+        return histogram[mask].sum() / max(bins.size, 1)
+
+    def _change_score(self, name, region):
+        previous = self.previous.get(name)
+        self.previous[name] = region.copy()
+        if previous is None or previous.shape != region.shape:
+            return 0.0
+        diff = np.abs(region.astype(np.int16) - previous.astype(np.int16))
+        return float(diff.mean()) / 255.0
+
+    def analyze(self, image):
+        """Return the names of the ROIs currently in alert for this frame."""
+        if not self.is_enabled() or image is None or image.isNull():
+            return []
+
+        start = time.perf_counter()
+        if image.format() not in (QImage.Format_RGB32, QImage.Format_ARGB32, QImage.Format_ARGB32_Premultiplied):
+            image = image.convertToFormat(QImage.Format_RGB32)
+        specs = self._roi_specs()
+        if specs != self.compiled_from:
+            self._compile(specs)
+
+        stride = self.stride
+        pixels = self._pixels(image)
+        alerts = []
+        for roi in self.compiled:
+            region = self._region(pixels, roi["rect"])
+            detect = roi.get("detect")
+            name = roi["name"]
+
+            if detect == "color":
+                if self._colour_fraction(region, roi["mask"]) >= roi.get("min_fraction", 0.01):
+                    alerts.append(name)
+            elif detect == "change":
+                if self._change_score(name, region) >= roi.get("threshold", 0.1):
+                    alerts.append(name)
+            elif detect == "flash":
+                # Count toggles between changing and still frames, so a region that changes
+                # all the time (a scrolling log) is not taken for one that blinks
+                changed = self._change_score(name, region) >= roi.get("threshold", 0.2)
+                history = self.history.setdefault(name, deque(maxlen=roi.get("frames", 6)))
+                history.append(changed != self.changing.get(name, changed))
+                self.changing[name] = changed
+                if sum(history) >= roi.get("min_toggles", 2):
+                    alerts.append(name)
+
+        # Stay inside the per-frame budget by adapting the sampling stride
+        self.last_cost_ms = (time.perf_counter() - start) * 1000
+        budget_ms = self._settings().get("frame_budget_ms", 1.0)
+        if self.last_cost_ms > budget_ms and stride < MAX_STRIDE:
+            self.stride = stride * 2
+        elif self.last_cost_ms < budget_ms / 4 and stride > 1:
+            self.stride = stride // 2
+        if self.stride != stride:
+            # Region shapes change with the stride, so change history restarts
+            self.previous.clear()
+            logging.debug(f"Alert analysis for {self.character_name} took {self.last_cost_ms:.2f} ms, "
+                          f"stride {stride} -> {self.stride}")
+
+        return alerts
@@ -0,0 +1,197 @@
+"""
+Shared-memory export of the latest thumbnail of every character.
+
+Layout version 1. Each character has one file under the export directory
+(default /dev/shm/eve-l-preview-<uid>/), memory mapped by readers:
+
+    offset  type     field
+    0       4s       magic b"EVLF"
+    4       uint32   layout version (1)
+    8       uint64   sequence; odd while a frame is being written (seqlock)
+    16      uint32   width
+    20      uint32   height
+    24      uint32   bytes per line
+    28      uint32   pixel format (1 = XRGB8888, bytes B, G, R, X)
+    32      float64  capture time (Unix epoch)
+    40      uint32   flags (1 = retired: re-read the index, the file was replaced)
+    44      uint32   capacity (bytes available for pixels)
+    48..63           reserved
+    64      pixels   height * bytes per line
+
+A reader takes the sequence, uses the pixels, then takes the sequence
+again; the frame is valid if both are equal and even. All fields are
+little endian. The Unix socket index (index.sock in the same directory)
+answers each "LIST" line with one JSON line describing every character.
+utils/frame_reader.py implements the reader side.
+"""
+import json
+import mmap
+import os
+import re
+import socket
+import struct
+import threading
+import time
+import logging
+
+LAYOUT_VERSION = 1
+MAGIC = b"EVLF"
+HEADER = struct.Struct("<4sIQIIIIdII")
+HEADER_SIZE = 64
+SEQ_OFFSET = 8
+FIELDS = struct.Struct("<IIIIdII")  # width .. capacity, written while the sequence is odd
+FIELDS_OFFSET = 16
+FORMAT_XRGB8888 = 1
+FLAG_RETIRED = 1
+INDEX_SOCKET = "index.sock"
+
+
+def default_directory():
+    return f"/dev/shm/eve-l-preview-{os.getuid()}"
+
+
+class ExportSegment:
+    """One character's memory-mapped frame file; written by one capture thread at a time."""
+
+    def __init__(self, path, capacity):
+        self.path = path
+        self.capacity = capacity
+        self.seq = 0
+        self.width = self.height = self.stride = 0
+        self.captured_at = 0.0
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            os.ftruncate(fd, HEADER_SIZE + capacity)
+            self.mm = mmap.mmap(fd, HEADER_SIZE + capacity)
+        finally:
+            os.close(fd)
+        self.mm[:HEADER.size] = HEADER.pack(MAGIC, LAYOUT_VERSION, self.seq, self.width, self.height, self.stride,
+                                            FORMAT_XRGB8888, self.captured_at, 0, self.capacity)
+
+    def _begin(self):
+        self.seq += 1  # Odd: readers retry
+        struct.pack_into("<Q", self.mm, SEQ_OFFSET, self.seq)
+
+    def _write_fields(self, flags):
+        FIELDS.pack_into(self.mm, FIELDS_OFFSET, self.width, self.height, self.stride, FORMAT_XRGB8888,
+                         self.captured_at, flags, self.capacity)
+
+    def _end(self):
+        # Even sequence last, on its own, so no reader pairs it with half-written fields
+        self.seq += 1
+        struct.pack_into("<Q", self.mm, SEQ_OFFSET, self.seq)
+
+    def write(self, image):
+        """Copy an RGB32 QImage in under the seqlock."""
+        nbytes = image.sizeInBytes()
+        bits = image.constBits()
+        bits.setsize(nbytes)
+        self._begin()
+        self.width, self.height, self.stride = image.width(), image.height(), image.bytesPerLine()
+        self.captured_at = time.time()
+        self._write_fields(0)
+        self.mm[HEADER_SIZE:HEADER_SIZE + nbytes] = bits
+        self._end()
+
+    def retire(self):
+        """Tell mapped readers to look the character up again, then drop the file."""
+        self._begin()
+        self._write_fields(FLAG_RETIRED)
+        self._end()
+        self.mm.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+class FrameExporter:
+    """
+    Frame sink writing every changed thumbnail into its character's segment,
+    so overlays, alert scripts or OBS sources can read the frames the app
+    already captured instead of grabbing the windows again.
+    """
+
+    def __init__(self, config):
+        settings = config["settings"].get("frame_export", {})
+        self.enabled = settings.get("enabled", False)
+        self.directory = settings.get("directory") or default_directory()
+        self.min_capacity = settings.get("min_capacity_kb", 256) * 1024
+        self.lock = threading.Lock()
+        self.segments = {}  # character -> ExportSegment
+        self.generation = 0  # Makes replacement file names unique
+        self.listener = None
+        if self.enabled:
+            try:
+                self._start()
+            except OSError as e:
+                logging.error(f"Frame export disabled: {e}")
+                self.enabled = False
+
+    def _start(self):
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        for name in os.listdir(self.directory):  # Leftovers of a previous run
+            if name.endswith(".frame") or name == INDEX_SOCKET:
+                os.unlink(os.path.join(self.directory, name))
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(os.path.join(self.directory, INDEX_SOCKET))
+        self.listener.listen(8)
+        threading.Thread(target=self._serve_index, name="frame-index", daemon=True).start()
+        logging.info(f"Exporting frames to {self.directory}")
+
+    # ---------------- frames from the capture threads ------------------
+    def publish(self, character_name, image, dirty):
+        """Capture thread: write the changed frame (the whole frame; readers may have skipped some)."""
+        if not self.enabled or not character_name:
+            return
+        nbytes = image.sizeInBytes()
+        with self.lock:
+            segment = self.segments.get(character_name)
+            if segment is None or segment.capacity < nbytes:
+                if segment is not None:
+                    segment.retire()
+                self.generation += 1
+                safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", character_name)
+                path = os.path.join(self.directory, f"{safe_name}.{self.generation}.frame")
+                segment = self.segments[character_name] = ExportSegment(path, max(self.min_capacity, nbytes * 2))
+            segment.write(image)  # A thumbnail-sized memcpy; held so close() cannot unmap mid-write
+
+    # ---------------- index --------------------------------------------
+    def describe(self):
+        with self.lock:
+            characters = [{"name": name, "path": segment.path, "width": segment.width, "height": segment.height,
+                           "stride": segment.stride, "format": "xrgb8888", "seq": segment.seq,
+                           "captured_at": segment.captured_at}
+                          for name, segment in self.segments.items()]
+        return {"version": LAYOUT_VERSION, "characters": characters}
+
+    def _serve_index(self):
+        while self.listener is not None:
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._index_client, args=(conn,), name="frame-index-client", daemon=True).start()
+
+    def _index_client(self, conn):
+        with conn, conn.makefile("rwb") as stream:
+            for line in stream:
+                if line.strip().upper() != b"LIST":
+                    stream.write(json.dumps({"error": "unknown request"}).encode() + b"\n")
+                else:
+                    stream.write(json.dumps(self.describe()).encode() + b"\n")
+                stream.flush()
+
+    def close(self):
+        self.enabled = False
+        listener, self.listener = self.listener, None
+        if listener is not None:
+            listener.close()
+            try:
+                os.unlink(os.path.join(self.directory, INDEX_SOCKET))
+            except OSError:
+                pass
+        with self.lock:
+            for segment in self.segments.values():
+                segment.retire()
+            self.segments = {}
@@ -0,0 +1,160 @@
+import os
+import resource
+import threading
+from contextlib import contextmanager
+from PyQt5.QtGui import QImage, QPainter
+from PyQt5.QtCore import Qt
+
+DEFAULT_FRAME_ESTIMATE = 3840 * 2160 * 4  # Assume a 4K RGB32 frame until we have seen the window
+
+THUMBNAIL_FORMATS = {
+    "rgb32": QImage.Format_RGB32,
+    "rgb16": QImage.Format_RGB16,
+    "indexed8": QImage.Format_Indexed8,
+    "grayscale8": QImage.Format_Grayscale8,
+}
+
+
+class FrameMemoryManager:
+    """
+    Bounds the memory used by capture frames across all capture threads.
+
+    * reserve() blocks a capture until its full-resolution intermediate fits
+      in the global budget, so N threads cannot each hold a 4K frame at once
+    * a pool of QImages keyed by size and format is reused for thumbnail
+      storage instead of allocating per frame; the GUI hands frames back
+      after swapping them out, and only unshared ones are kept
+    * thumbnails can be stored in compact formats per character
+    """
+
+    def __init__(self, config):
+        self.config = config
+        settings = config["settings"].get("frame_memory", {})
+        self.budget = int(settings.get("budget_mb", 128) * 1024 * 1024)
+        self.pool_limit = int(settings.get("pool_max_mb", 64) * 1024 * 1024)
+
+        self.condition = threading.Condition()
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.waits = 0
+
+        self.pool_lock = threading.Lock()
+        self.pooled_bytes = 0
+        self.image_pool = {}  # (width, height, format) -> [QImage]
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0  # Handed back while another copy still referenced the pixels
+
+        self.frame_sizes = {}  # window id -> bytes of its last full-resolution frame
+
+    # ---------------- budget -------------------------------------------
+    def estimate(self, win_id):
+        """Expected size of a window's full-resolution frame."""
+        return self.frame_sizes.get(win_id, DEFAULT_FRAME_ESTIMATE)
+
+    def record_frame(self, win_id, width, height):
+        self.frame_sizes[win_id] = width * height * 4
+
+    def forget(self, win_id):
+        """Drop a window that went away; relogs bring new ids, so entries would pile up."""
+        self.frame_sizes.pop(win_id, None)
+
+    @contextmanager
+    def reserve(self, nbytes):
+        """Hold nbytes of the frame budget for the duration of the block."""
+        # A frame bigger than the whole budget still runs, just alone
+        nbytes = min(nbytes, self.budget)
+        with self.condition:
+            if self.in_use + nbytes > self.budget:
+                self.waits += 1
+                self.condition.wait_for(lambda: self.in_use + nbytes <= self.budget)
+            self.in_use += nbytes
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.in_use -= nbytes
+                self.condition.notify_all()
+
+    # ---------------- pool ---------------------------------------------
+    def acquire_image(self, width, height, image_format):
+        """A QImage of the given size and format, reused when possible."""
+        with self.pool_lock:
+            images = self.image_pool.get((width, height, image_format))
+            if images:
+                self.hits += 1
+                image = images.pop()
+                self.pooled_bytes -= image.sizeInBytes()
+                return image
+            self.misses += 1
+        return QImage(width, height, image_format)
+
+    def release_image(self, image):
+        """Return an image to the pool if nothing else shares its pixels."""
+        if image is None or image.isNull():
+            return
+        with self.pool_lock:
+            if not image.isDetached():
+                # Reusing it would detach (copy) on the first write and allocate anyway
+                self.shared += 1
+                return
+            if self.pooled_bytes + image.sizeInBytes() <= self.pool_limit:
+                self.image_pool.setdefault((image.width(), image.height(), image.format()), []).append(image)
+                self.pooled_bytes += image.sizeInBytes()
+
+    # ---------------- storage formats ----------------------------------
+    def storage_format(self, character_name):
+        settings = self.config["settings"]
+        name = settings.get("thumbnail_formats", {}).get(character_name,
+                                                         settings.get("thumbnail_format", "rgb32"))
+        return THUMBNAIL_FORMATS.get(name, QImage.Format_RGB32)
+
+    def to_storage(self, image, character_name):
+        """Convert a thumbnail to the compact format configured for its character."""
+        image_format = self.storage_format(character_name)
+        if image.format() == image_format:
+            return image
+        if image_format == QImage.Format_RGB16:
+            # QPainter can target RGB16, so the pooled buffer is reused in place
+            storage = self.acquire_image(image.width(), image.height(), image_format)
+            painter = QPainter(storage)
+            painter.drawImage(0, 0, image)
+            painter.end()
+            return storage
+        # Indexed8 gets an optimised palette; dithering keeps gradients readable
+        return image.convertToFormat(image_format, Qt.DiffuseDither)
+
+    def recycle_storage(self, image):
+        """Give a frame from to_storage() back once the GUI has swapped it out."""
+        # Only RGB16 frames are drawn into pooled buffers; pooling the others would never hit
+        if image is not None and image.format() == QImage.Format_RGB16:
+            self.release_image(image)
+
+    # ---------------- metrics ------------------------------------------
+    @staticmethod
+    def current_rss():
+        """Resident set size in bytes."""
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, IndexError, ValueError):
+            return 0
+
+    def get_metrics(self):
+        with self.pool_lock:
+            hits, misses, shared, pooled = self.hits, self.misses, self.shared, self.pooled_bytes
+        with self.condition:
+            in_use, peak, waits = self.in_use, self.peak_in_use, self.waits
+        return {
+            "rss": self.current_rss(),
+            "peak_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+            "budget": self.budget,
+            "budget_in_use": in_use,
+            "budget_peak": peak,
+            "budget_waits": waits,
+            "pool_bytes": pooled,
+            "pool_hits": hits,
+            "pool_misses": misses,
+            "pool_shared": shared,
+        }
@@ -0,0 +1,130 @@
+"""
+Reader side of the frame export (see utils/frame_export.py for the layout).
+
+Only the standard library is used so overlays and scripts can copy this
+file without pulling in Qt:
+
+    index = FrameIndex()
+    for entry in index.list():
+        with FrameReader(entry["path"]) as reader:
+            frame = reader.read()  # Frame(seq, width, height, stride, captured_at, pixels)
+"""
+import json
+import mmap
+import os
+import socket
+import struct
+import time
+from collections import namedtuple
+
+LAYOUT_VERSION = 1
+MAGIC = b"EVLF"
+HEADER = struct.Struct("<4sIQIIIIdII")
+HEADER_SIZE = 64
+SEQ = struct.Struct("<Q")
+SEQ_OFFSET = 8
+FLAG_RETIRED = 1
+MAX_RETRIES = 100
+
+Frame = namedtuple("Frame", "seq width height stride captured_at pixels")
+
+
+class FrameRetired(Exception):
+    """The writer replaced this character's file; look it up in the index again."""
+
+
+def default_directory():
+    return f"/dev/shm/eve-l-preview-{os.getuid()}"
+
+
+class FrameIndex:
+    """Client of the index socket; one connection, one LIST per call."""
+
+    def __init__(self, directory=None):
+        self.path = os.path.join(directory or default_directory(), "index.sock")
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+        self.stream = self.sock.makefile("rwb")
+
+    def list(self):
+        """[{"name", "path", "width", "height", "stride", "format", "seq", "captured_at"}, ...]"""
+        self.stream.write(b"LIST\n")
+        self.stream.flush()
+        reply = json.loads(self.stream.readline())
+        if reply.get("version") != LAYOUT_VERSION:
+            raise ValueError(f"frame export version {reply.get('version')}, reader speaks {LAYOUT_VERSION}")
+        return reply["characters"]
+
+    def close(self):
+        self.stream.close()
+        self.sock.close()
+
+
+class FrameReader:
+    """Maps one character's segment read-only and reads consistent frames from it."""
+
+    def __init__(self, path):
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            self.mm = mmap.mmap(fd, 0, prot=mmap.PROT_READ)
+        finally:
+            os.close(fd)
+        magic, version = struct.unpack_from("<4sI", self.mm)
+        if magic != MAGIC or version != LAYOUT_VERSION:
+            self.mm.close()
+            raise ValueError(f"{path} is not a version {LAYOUT_VERSION} frame segment")
+        self.retries = 0  # Reads that raced a write and were repeated
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def sequence(self):
+        """Current sequence number; compare with a previous frame's to see if there is a new one."""
+        return SEQ.unpack_from(self.mm, SEQ_OFFSET)[0]
+
+    def read(self, copy=True):
+        """
+        The latest frame. With copy=False, pixels is a memoryview into the
+        mapping (no copy); it is only guaranteed intact until the sequence
+        changes, so check view_valid(frame) after using it, and release()
+        it before closing the reader.
+        """
+        for _ in range(MAX_RETRIES):
+            _, _, seq, width, height, stride, _, captured_at, flags, _ = HEADER.unpack_from(self.mm)
+            if flags & FLAG_RETIRED:
+                raise FrameRetired()
+            if seq & 1:
+                self.retries += 1
+                time.sleep(0)  # Write in progress; let the writer finish it
+                continue
+            view = memoryview(self.mm)[HEADER_SIZE:HEADER_SIZE + height * stride]
+            if copy:
+                pixels = bytes(view)
+                view.release()
+            else:
+                pixels = view
+            if self.sequence() == seq:
+                return Frame(seq, width, height, stride, captured_at, pixels)
+            if not copy:
+                pixels.release()
+            self.retries += 1
+        raise TimeoutError("frame kept changing while being read")
+
+    def view_valid(self, frame):
+        """Whether a copy=False frame was left untouched while it was used."""
+        return self.sequence() == frame.seq
+
+    def wait(self, seq, timeout=1.0, poll=0.005):
+        """Block until the sequence moves past seq; returns False on timeout."""
+        deadline = time.monotonic() + timeout
+        while self.sequence() <= seq:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(poll)
+        return True
+
+    def close(self):
+        self.mm.close()
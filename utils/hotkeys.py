@@ -1,32 +1,104 @@
 import logging
 import threading
 import subprocess
+import time
 import keyboard  # Replace evdev with keyboard
+from PyQt5.QtCore import QObject, Qt, pyqtSignal
+from utils.prewarm import FocusPrewarmer
+from utils.profiler import name_current_thread
+from utils.tracing import tracer
+from utils.log_setup import log_fields
 
-# Enable logging
-logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
+# keyboard event names -> canonical modifier
+MODIFIERS = {
+    "shift": "shift", "left shift": "shift", "right shift": "shift",
+    "ctrl": "ctrl", "left ctrl": "ctrl", "right ctrl": "ctrl", "control": "ctrl",
+    "alt": "alt", "left alt": "alt", "right alt": "alt", "alt gr": "alt",
+    "windows": "super", "left windows": "super", "right windows": "super", "super": "super",
+}
+HOTKEY_ACTIONS = ["focus", "next", "previous"]
+MAIN_GROUP = ""  # The cycle order from character_list
+HOTKEY_FOCUS_DELAY = 1.0  # Seconds within which a focus change is attributed to our hotkey switch
+
+
+def normalize_combo(combo):
+    """'Ctrl+F1' / 'shift + tab' -> 'ctrl+f1' / 'shift+tab' (modifiers sorted, then the key)."""
+    parts = [part.strip().lower() for part in combo.split("+") if part.strip()]
+    modifiers = sorted({MODIFIERS[part] for part in parts if part in MODIFIERS})
+    keys = [part for part in parts if part not in MODIFIERS]
+    return "+".join(modifiers + keys[-1:])
+
+
+class HotkeyManager(QObject):
+    """
+    Global hotkeys through one keyboard hook and a precompiled dispatch table.
+
+    config["hotkeys"]["bindings"] maps key combos to actions ("focus" a
+    character, "next"/"previous" in the cycle order or in one of the
+    named groups from config["hotkeys"]["groups"]); each profile's hotkey
+    switches to that profile. The table maps each normalized combo
+    straight to its target (next/previous step through a precomputed
+    per-group order, each group with its own cursor) and is rebuilt only
+    when the bindings, profiles, the cycle order or the set of live
+    clients change. Combos are also compiled to scan codes, since key
+    names follow shift ("!" for shift+1), so a key press is a single dict
+    lookup.
+
+    Cursors follow focus changes from any source through _NET_ACTIVE_WINDOW
+    events, so they never need to be resynchronised by listing windows.
+    The next/previous target of every group is kept pre-warmed (see
+    FocusPrewarmer) so a cycle press skips the window id lookups.
+
+    The keyboard thread only looks up the target and requests focus. The
+    border, the last active client and the pre-warmed set are updated on
+    the GUI thread through switched; cursors are shared and take cursor_lock.
+    """
+    switched = pyqtSignal(str, object)  # Window id and its FocusContext (or None) after a hotkey switch
 
-class HotkeyManager:
     def __init__(self, main_window, window_manager):
+        super().__init__()
         self.main_window = main_window
         self.window_manager = window_manager
-        self.current_index = -1  # Track last active character
-        self.shift_pressed = False
-        self.tab_pressed = False
         self.hotkeys_enabled = False
-        
+        self.held_modifiers = set()
+        self.held_keys = set()  # Scan codes of keys held down; ignores auto-repeat
+
+        self.dispatch_table = {}  # combo -> (action, target, eve_only)
+        self.scan_table = {}  # (modifiers, scan code) -> combo
+        self.cycle_orders = {}  # group -> ((window_id, character name), ...) in cycle order
+        self.cycle_positions = {}  # group -> {X window id (int): index in the group's order}
+        self.cursors = {}  # group -> index of the last focused member
+        self.cursor_lock = threading.Lock()  # Cursors are stepped on the keyboard thread, synced on the GUI thread
+        self.live_windows = {}  # X window id (int) -> hex id string, for bound clients
+        self.active_window = None  # From the watcher; None until the first event
+        self.hotkey_target = (None, 0.0)  # (window id, monotonic time) of the last hotkey switch
+        self.stats_lock = threading.Lock()
+        self.dispatch_count = 0
+        self.dispatch_total = 0.0
+        self.dispatch_max = 0.0
+        self.prewarmer = FocusPrewarmer(main_window.x11_interface, window_manager, main_window.config)
+        self.switched.connect(self.on_switched, Qt.QueuedConnection)
+
+        self.rebuild_dispatch_table()
+        window_manager.registry_changed.connect(self.rebuild_dispatch_table)
+        window_manager.profiles.profile_switched.connect(lambda _: self.rebuild_dispatch_table())
+        window_manager.profiles.profiles_changed.connect(self.rebuild_dispatch_table)
+        main_window.hotkeys_tab.bindings_changed.connect(self.rebuild_dispatch_table)
+
+        self.active_window_watcher = main_window.x11_interface.create_active_window_watcher()
+        if self.active_window_watcher is not None:
+            self.active_window_watcher.activated.connect(self.on_active_window)
+            self.active_window_watcher.start()
+
         logging.info("Initializing HotkeyManager with keyboard library...")
-        
+
         try:
-            # Setup keyboard hooks
-            keyboard.on_press_key('shift', self.on_shift_press)
-            keyboard.on_release_key('shift', self.on_shift_release)
-            keyboard.on_press_key('tab', self.on_tab_press)
-            keyboard.on_release_key('tab', self.on_tab_release)
-            
+            # A single hook feeds the dispatch table
+            keyboard.hook(self.on_key_event)
+
             self.hotkeys_enabled = True
-            logging.info("Keyboard hooks registered for Tab and Shift+Tab.")
-            
+            logging.info(f"Keyboard hook registered for {len(self.dispatch_table)} bindings.")
+
         except ImportError as e:
             if "You must be root" in str(e):
                 logging.warning("⚠️  Hotkeys disabled: The keyboard library requires root privileges on Linux.")
@@ -36,7 +108,7 @@ class HotkeyManager:
                 logging.warning("   The application will continue to work without hotkey support.")
             else:
                 logging.warning(f"⚠️  Hotkeys disabled: Failed to initialize keyboard library: {e}")
-                
+
         except Exception as e:
             logging.warning(f"⚠️  Hotkeys disabled: Unexpected error initializing keyboard hooks: {e}")
             logging.warning("   The application will continue to work without hotkey support.")
@@ -44,188 +116,262 @@ class HotkeyManager:
     def is_hotkeys_enabled(self):
         """Return whether hotkeys are currently enabled."""
         return self.hotkeys_enabled
-    
+
     def get_hotkey_status(self):
         """Return a human-readable status of hotkey functionality."""
         if self.hotkeys_enabled:
-            return "✅ Hotkeys enabled (Tab/Shift+Tab to cycle characters)"
+            return f"✅ Hotkeys enabled ({len(self.dispatch_table)} bindings)"
         else:
             return "❌ Hotkeys disabled (requires root privileges or input group access)"
 
-    def on_shift_press(self, e):
-        """Track shift key press state"""
-        if not self.hotkeys_enabled:
+    # ---------------- dispatch table -----------------------------------
+    def rebuild_dispatch_table(self):
+        """Compile bindings against the live clients; runs on the GUI thread."""
+        hotkeys_config = self.main_window.config.get("hotkeys", {})
+        character_list = list(hotkeys_config.get("character_list", {}).keys())
+        live = {name: preview.window_id
+                for name, preview in self.window_manager.previews_by_character.items()
+                if preview.parked_at is None}
+
+        groups = {MAIN_GROUP: character_list}
+        groups.update(hotkeys_config.get("groups", {}))
+        cycle_orders = {group: tuple((live[name], name) for name in members if name in live)
+                        for group, members in groups.items()}
+        table = {}
+        for binding in hotkeys_config.get("bindings", []):
+            combo = normalize_combo(binding.get("key", ""))
+            action = binding.get("action")
+            if not combo or action not in HOTKEY_ACTIONS:
+                continue
+            target = binding.get("group", MAIN_GROUP)  # next/previous step through this group
+            if action == "focus":
+                target = live.get(binding.get("target", ""))
+                if target is None:
+                    continue  # Character not logged in; nothing to bind yet
+            elif target not in cycle_orders:
+                logging.warning(f"Hotkey {combo} refers to unknown group {target}")
+                continue
+            table[combo] = (action, target, binding.get("eve_only", False))
+        for name, profile in self.main_window.config.get("profiles", {}).items():
+            combo = normalize_combo(profile.get("hotkey", ""))
+            if not combo:
+                continue
+            if combo in table:
+                logging.warning(f"Hotkey {combo} of profile {name} is already bound")
+                continue
+            table[combo] = ("profile", name, False)
+
+        scan_table = {}
+        for combo in table:
+            *modifiers, key = combo.split("+")
+            for code in self.scan_codes(key):
+                scan_table["+".join(modifiers), code] = combo
+
+        # Swap in whole objects; the keyboard thread only ever reads these references
+        cycle_positions = {group: {int(window_id, 16): index for index, (window_id, _) in enumerate(order)}
+                           for group, order in cycle_orders.items()}
+        with self.cursor_lock:
+            self.cycle_orders = cycle_orders
+            self.cycle_positions = cycle_positions
+            self.cursors = {group: self.cursors.get(group, -1) for group in cycle_orders}
+        self.live_windows = {int(window_id, 16): window_id for window_id in live.values()}
+        self.dispatch_table = table
+        self.scan_table = scan_table
+        if self.window_manager.last_active_window_id is not None:
+            self.update_current_index(self.window_manager.last_active_window_id)
+        else:
+            self.prewarm()  # Drops contexts of windows that are gone
+        logging.debug(f"Rebuilt hotkey table: {len(table)} bindings, {len(cycle_orders)} cycle groups")
+
+    @staticmethod
+    def scan_codes(key):
+        """Scan codes of an unshifted key name; empty if the keyboard layout does not know it."""
+        if key.startswith("num "):
+            return ()  # Keypad keys are matched by name, as is_keypad tells them apart
+        try:
+            return keyboard.key_to_scan_codes(key)
+        except (ValueError, ImportError, OSError) as e:
+            logging.debug(f"No scan code for hotkey key {key}, matching it by name: {e}")
+            return ()
+
+    def on_key_event(self, event):
+        """Keyboard thread: track modifiers and look the combo up in the table."""
+        name_current_thread("keyboard hook")
+        name = (event.name or "").lower()
+        modifier = MODIFIERS.get(name)
+        # Names follow the modifiers (shift+1 is "!" down but "1" up), scan codes do not
+        key_code = event.scan_code
+        if event.event_type == keyboard.KEY_UP:
+            if modifier:
+                self.held_modifiers.discard(modifier)
+            self.held_keys.discard(key_code)
             return
-        self.shift_pressed = True
-        
-    def on_shift_release(self, e):
-        """Track shift key release state"""
-        if not self.hotkeys_enabled:
+        if modifier:
+            self.held_modifiers.add(modifier)
             return
-        self.shift_pressed = False
-        
-    def on_tab_press(self, e):
-        """Handle tab key press - only process once per press"""
-        if not self.hotkeys_enabled:
+        if key_code in self.held_keys:
             return
-        if not self.tab_pressed and self.is_eve_window_active():
-            self.tab_pressed = True
-            logging.debug("Tab key detected!")
-            
-            if self.shift_pressed:
-                logging.debug("Shift + Tab detected - cycling backward")
-                self.cycle_characters(reverse=True)
-            else:
-                logging.debug("Tab key pressed - cycling forward")
-                self.cycle_characters(reverse=False)
-    
-    def on_tab_release(self, e):
-        """Reset tab pressed state on release"""
-        if not self.hotkeys_enabled:
+        self.held_keys.add(key_code)
+
+        modifiers = sorted(self.held_modifiers)
+        if getattr(event, "is_keypad", False):
+            combo = "+".join(modifiers + [f"num {name}"])
+        else:
+            combo = self.scan_table.get(("+".join(modifiers), key_code))
+            if combo is None:
+                combo = "+".join(modifiers + [name])  # Keys without a scan code mapping
+        self.dispatch_combo(combo, event)
+
+    def dispatch_combo(self, combo, event=None):
+        """Run the binding of a normalized combo, if any (keyboard thread, or a session replay)."""
+        entry = self.dispatch_table.get(combo)
+        if entry is None:
+            return
+
+        self.window_manager.recorder.record("key", combo=combo)
+        action, target, eve_only = entry
+        self.window_manager.resource_monitor.apply_input_policy()
+        if eve_only and not self.is_eve_window_active():
             return
-        self.tab_pressed = False
+        if action == "focus":
+            self.activate(target, event)
+        elif action == "profile":
+            self.window_manager.profiles.switch_requested.emit(target)  # Applied on the GUI thread
+        else:
+            self.cycle_characters(reverse=action == "previous", event=event, group=target)
+
+    def activate(self, window_id, event=None):
+        if event is not None:
+            latency = time.time() - event.time
+            self.record_dispatch(latency)
+            now = time.perf_counter_ns()
+            tracer.record("key event to dispatch", "focus", now - int(latency * 1e9), now)
+        with tracer.span("activate", "focus", window=window_id):
+            context = self.prewarmer.take(window_id)
+            self.sync_cursors(window_id)  # Other groups follow right away, not on the focus event
+            kwin_uuid = context.kwin_uuid if context is not None else None
+            self.hotkey_target = (window_id, time.monotonic())
+            if self.focus_window(window_id, kwin_uuid) != kwin_uuid and context is not None:
+                # The pre-resolved UUID was stale; the next pre-warm resolves it again
+                self.prewarmer.discard(window_id)
+        self.switched.emit(window_id, context)
+
+    def on_switched(self, window_id, context):
+        """GUI thread: move the border and pre-warm the new neighbours after a hotkey switch."""
+        self.window_manager.set_last_active_client(window_id, context)
+        self.prewarm()
+
+    def record_dispatch(self, latency):
+        with self.stats_lock:
+            self.dispatch_count += 1
+            self.dispatch_total += latency
+            self.dispatch_max = max(self.dispatch_max, latency)
 
+    def get_dispatch_stats(self):
+        """(dispatches, average ms, max ms) from key event to focus request."""
+        with self.stats_lock:
+            if not self.dispatch_count:
+                return 0, 0.0, 0.0
+            return (self.dispatch_count, self.dispatch_total / self.dispatch_count * 1000,
+                    self.dispatch_max * 1000)
+
+    # ---------------- focus --------------------------------------------
     def is_eve_window_active(self):
         """Check if an EVE window is currently active and in focus."""
+        if self.active_window is not None and self.active_window_watcher is not None \
+                and self.active_window_watcher.isRunning():
+            # Known from the watcher; no round trip to xdotool
+            return self.active_window in self.live_windows
         try:
-            result = subprocess.run(['xdotool', 'getactivewindow', 'getwindowname'], 
-                                     capture_output=True, text=True)
-            active_window_name = result.stdout.strip()
+            active_window_name = self.main_window.x11_interface.active_window_name()
             logging.debug(f"Active window name: {active_window_name}")
             return "EVE - " in active_window_name
         except Exception as e:
             logging.error(f"Error checking active window: {e}")
             return False
 
-    def cycle_characters(self, reverse=False):
-        """Cycle through the list of characters, respecting the order in config."""
-        logging.debug("Cycling characters...")
-
-        try:
-            # Get character names from config in user-defined order with safe access
-            hotkeys_config = self.main_window.config.get("hotkeys", {})
-            character_list = list(hotkeys_config.get("character_list", {}).keys())
-            logging.debug(f"Character list from config: {character_list}")
-
-            if not character_list:
-                logging.warning("No characters configured in hotkeys. Please configure characters in the Hotkeys tab.")
-                return
-
-            # Get all open EVE windows
-            open_windows = self.list_windows()
-            eve_windows = [line for line in open_windows if "EVE - " in line]
-            logging.debug(f"Open EVE Windows: {eve_windows}")
-
-            # Create a dictionary of window_title -> window_id for easier lookup
-            window_dict = {}
-            for window in eve_windows:
-                parts = window.split(None, 3)
-                if len(parts) < 4:
-                    continue
-                window_id = parts[0]
-                window_title = parts[3].replace("EVE - ", "")
-                window_dict[window_title] = window_id
-
-            # Create ordered list of open windows based on character_list order
-            ordered_windows = []
-            for char_name in character_list:
-                if char_name in window_dict:
-                    ordered_windows.append((window_dict[char_name], char_name))
-
-            if not ordered_windows:
-                logging.warning("No matching character windows open.")
-                return
-
-            # Cycle through windows in correct order
-            if reverse:
-                self.current_index = (self.current_index - 1) % len(ordered_windows)
-            else:
-                self.current_index = (self.current_index + 1) % len(ordered_windows)
-
-            next_window_id, next_character_name = ordered_windows[self.current_index]
+    def cycle_characters(self, reverse=False, event=None, group=MAIN_GROUP):
+        """Step a group's cursor through its precompiled order, respecting the order in config."""
+        step = -1 if reverse else 1
+        with self.cursor_lock:
+            cycle_order = self.cycle_orders.get(group)
+            if cycle_order:
+                index = (self.cursors.get(group, -1) + step) % len(cycle_order)
+                self.cursors[group] = index
+        if not cycle_order:
+            logging.warning(f"No matching character windows open for cycle group '{group or 'main'}'.")
+            return
+        next_window_id, next_character_name = cycle_order[index]
 
-            logging.info(f"Switching to: {next_character_name} (Window ID: {next_window_id})")
-            self.window_manager.set_last_active_client(next_window_id)
-            self.focus_window(next_window_id)
-            
-        except Exception as e:
-            logging.error(f"Error cycling characters: {e}")
-            logging.error(f"Config structure: {self.main_window.config.keys()}")
+        logging.info("Switching client", extra=log_fields(window=next_window_id, character=next_character_name,
+                                                          stage="cycle"))
+        self.activate(next_window_id, event)
 
     def list_windows(self):
-        """List all open windows using `wmctrl`."""
-        try:
-            result = subprocess.run(['wmctrl', '-l'], capture_output=True, text=True)
-            return result.stdout.splitlines()
-        except Exception as e:
-            logging.error(f"Error listing windows: {e}")
-            return []
+        """List all open windows using `wmctrl` (via the shared tool helper)."""
+        return self.main_window.x11_interface.list_windows()
 
-    def focus_window(self, window_id):
-        """Bring a window to the front using the X11Interface for proper mouse detection."""
-        logging.debug(f"🖥️ Attempting to bring window {window_id} to the front...")
+    def focus_window(self, window_id, kwin_uuid=None):
+        """Bring a window to the front using the X11Interface for proper mouse detection; returns the KWin UUID used."""
+        logging.debug("Bringing window to front", extra=log_fields(window=window_id, stage="focus"))
         try:
             # Use the main window's X11Interface which includes mouse jiggle for EVE
             if hasattr(self.main_window, 'x11_interface'):
-                self.main_window.x11_interface.focus_and_raise_window(window_id)
-                logging.info(f"Window {window_id} successfully brought to front with mouse trigger.")
+                used_uuid = self.main_window.x11_interface.focus_and_raise_window(window_id, kwin_uuid)
+                logging.info("Window brought to front", extra=log_fields(window=window_id, stage="focus"))
+                return used_uuid
             else:
                 # Fallback to wmctrl if X11Interface not available
-                subprocess.run(['wmctrl', '-i', '-a', window_id])
-                logging.info(f"Window {window_id} successfully brought to front (fallback).")
+                subprocess.run(['wmctrl', '-i', '-a', window_id])  # No helper without X11Interface
+                logging.info("Window brought to front", extra=log_fields(window=window_id, stage="focus (wmctrl)"))
         except Exception as e:
-            logging.error(f"Error bringing window {window_id} to front: {e}")
+            logging.error("Error bringing window to front", extra=log_fields(window=window_id, stage="focus", error=e))
+        return None
 
     def update_current_index(self, window_id):
-        """
-        Update the current index based on the active window,
-        respecting the order in the character list.
-        """
-        try:
-            # Get ordered character list from config with safe access
-            hotkeys_config = self.main_window.config.get("hotkeys", {})
-            character_list = list(hotkeys_config.get("character_list", {}).keys())
-            
-            # Get open windows
-            open_windows = self.list_windows()
-            eve_windows = [line for line in open_windows if "EVE - " in line]
-            
-            # Match window_id to character name
-            target_char_name = None
-            for window in eve_windows:
-                parts = window.split(None, 3)
-                if len(parts) < 4:
-                    continue
-                win_id = parts[0]
-                if win_id == window_id:
-                    target_char_name = parts[3].replace("EVE - ", "")
-                    break
-            
-            if not target_char_name:
-                return
-            
-            # Create ordered list of open windows
-            ordered_windows = []
-            window_dict = {}
-            for window in eve_windows:
-                parts = window.split(None, 3)
-                if len(parts) < 4:
+        """Sync every group cursor with a focused window and pre-warm the new neighbours."""
+        self.sync_cursors(window_id)
+        self.prewarm()
+
+    def sync_cursors(self, window_id):
+        """Sync every group cursor with a focused window (hex id string or int)."""
+        if isinstance(window_id, str):
+            window_id = int(window_id, 16)
+        with self.cursor_lock:
+            for group, positions in self.cycle_positions.items():
+                index = positions.get(window_id)
+                if index is not None:
+                    self.cursors[group] = index
+
+    def prewarm(self):
+        """GUI thread: pre-warm the next and previous target of every group from its cursor."""
+        targets = []
+        with self.cursor_lock:
+            for group, order in self.cycle_orders.items():
+                if not order:
                     continue
-                win_id = parts[0]
-                char_name = parts[3].replace("EVE - ", "")
-                window_dict[char_name] = win_id
-            
-            for char_name in character_list:
-                if char_name in window_dict:
-                    ordered_windows.append((window_dict[char_name], char_name))
-            
-            # Find index of target window in ordered list
-            for index, (win_id, char_name) in enumerate(ordered_windows):
-                if char_name == target_char_name:
-                    self.current_index = index
-                    logging.debug(f"Updated current index to {index} ({char_name})")
-                    break
-                    
-        except Exception as e:
-            logging.error(f"Error updating current index: {e}")
-            logging.error(f"Config structure: {self.main_window.config.keys()}")
\ No newline at end of file
+                cursor = self.cursors.get(group, -1)
+                targets.append(order[(cursor + 1) % len(order)])
+                targets.append(order[(cursor - 1) % len(order)])
+        self.prewarmer.update(targets)
+
+    def on_active_window(self, window_id):
+        """GUI thread: the active window changed, by whatever means."""
+        self.active_window = window_id
+        wid_hex = self.live_windows.get(window_id)
+        target, switched_at = self.hotkey_target
+        if wid_hex is not None and wid_hex == target and time.monotonic() - switched_at < HOTKEY_FOCUS_DELAY:
+            # Caused by our own switch; a replay of the key combo reproduces it
+            self.hotkey_target = (None, 0.0)
+            self.window_manager.recorder.record("focus", id=hex(window_id), hotkey=True)
+        else:
+            self.window_manager.recorder.record("focus", id=hex(window_id))
+        self.update_current_index(window_id)
+        if wid_hex is not None and wid_hex != self.window_manager.last_active_window_id:
+            # Focus changed outside the app (e.g. the WM); keep the border in step
+            self.window_manager.set_last_active_client(wid_hex)
+
+    def close(self):
+        if self.active_window_watcher is not None:
+            self.active_window_watcher.stop()
+        self.prewarmer.close()
@@ -0,0 +1,365 @@
+import math
+from collections import defaultdict
+from PyQt5.QtWidgets import QWidget, QApplication
+from PyQt5.QtCore import Qt, QTimer, QPoint
+from PyQt5.QtGui import QPainter, QColor
+from utils.config import save_config
+import logging
+
+SNAP_DISTANCE = 20
+CELL_SIZE = 256  # Grid bucket size of the spatial index, in pixels
+ARRANGE_MODES = ["grid", "row", "column", "edge"]
+CASCADE_STEP = 20  # Offset between thumbnails that fit on no screen
+
+
+def _fill_area(mode, sizes, area, spacing):
+    """Positions for as many of sizes (in order) as fit into one screen area."""
+    x0, y0, width, height = area
+    positions = []
+    if mode == "grid":
+        # Uniform cells, as square as the area allows
+        cell_w = max(w for w, _ in sizes) + spacing
+        cell_h = max(h for _, h in sizes) + spacing
+        columns = max(1, min(width // cell_w, math.ceil(math.sqrt(len(sizes)))))
+        rows = max(1, height // cell_h)
+        for i in range(min(len(sizes), columns * rows)):
+            positions.append((x0 + (i % columns) * cell_w, y0 + (i // columns) * cell_h))
+        return positions
+
+    # row/edge flow left to right (edge from the bottom up), column flows top to bottom
+    main = cross = line = 0
+    for w, h in sizes:
+        if mode == "column":
+            if main + h > height and main > 0:
+                cross, main, line = cross + line + spacing, 0, 0
+            if cross + w > width and positions:
+                break
+            positions.append((x0 + cross, y0 + main))
+            main, line = main + h + spacing, max(line, w)
+        else:
+            if main + w > width and main > 0:
+                cross, main, line = cross + line + spacing, 0, 0
+            if cross + h > height and positions:
+                break
+            y = y0 + cross if mode == "row" else y0 + height - cross - h
+            positions.append((x0 + main, y))
+            main, line = main + w + spacing, max(line, h)
+    return positions
+
+
+def arrange_positions(mode, sizes, areas, spacing=0):
+    """
+    Lay out thumbnails of the given (w, h) sizes over the screen areas.
+
+    Screens are filled in order; anything that fits on none of them is
+    cascaded from the first screen's corner. Returns one (x, y) per size.
+    """
+    positions = []
+    remaining = list(sizes)
+    for area in areas:
+        if not remaining:
+            break
+        placed = _fill_area(mode, remaining, area, spacing)
+        positions.extend(placed)
+        remaining = remaining[len(placed):]
+
+    x0, y0 = areas[0][:2] if areas else (0, 0)
+    for i in range(len(remaining)):
+        positions.append((x0 + i * CASCADE_STEP, y0 + i * CASCADE_STEP))
+    return positions
+
+
+class SpatialIndex:
+    """Uniform grid of buckets mapping screen cells to the rectangles that touch them."""
+
+    def __init__(self, cell=CELL_SIZE):
+        self.cell = cell
+        self.cells = defaultdict(set)
+        self.rects = {}  # key -> (x, y, w, h)
+
+    def _cells_for(self, x, y, w, h):
+        c = self.cell
+        for cx in range(x // c, (x + max(w, 1) - 1) // c + 1):
+            for cy in range(y // c, (y + max(h, 1) - 1) // c + 1):
+                yield cx, cy
+
+    def insert(self, key, rect):
+        if self.rects.get(key) == rect:
+            return
+        self.remove(key)
+        self.rects[key] = rect
+        for cell in self._cells_for(*rect):
+            self.cells[cell].add(key)
+
+    def remove(self, key):
+        rect = self.rects.pop(key, None)
+        if rect is None:
+            return
+        for cell in self._cells_for(*rect):
+            bucket = self.cells.get(cell)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self.cells[cell]
+
+    def query(self, x, y, w, h):
+        """Keys of all rectangles sharing a cell with the given area."""
+        found = set()
+        for cell in self._cells_for(x, y, w, h):
+            found |= self.cells.get(cell, set())
+        return found
+
+
+class GuideLine(QWidget):
+    """A one-pixel alignment guide shown while dragging"""
+
+    def __init__(self, color):
+        super().__init__()
+        self.color = QColor(color)
+        self.setWindowFlags(
+            Qt.FramelessWindowHint |
+            Qt.WindowStaysOnTopHint |
+            Qt.Tool |
+            Qt.X11BypassWindowManagerHint
+        )
+        self.setAttribute(Qt.WA_ShowWithoutActivating)
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.hide()
+
+    def paintEvent(self, event):
+        QPainter(self).fillRect(self.rect(), self.color)
+
+    def show_at(self, x, y, w, h):
+        self.setGeometry(x, y, max(w, 1), max(h, 1))
+        if not self.isVisible():
+            self.show()
+        self.raise_()
+
+
+class LayoutEngine:
+    """
+    Keeps preview rectangles (and screen areas) in a spatial index and
+    drives dragging: mouse motion is coalesced to one move per display
+    refresh, alignment guides show where the preview will snap, and the
+    snap itself is a single move on release.
+    """
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.index = SpatialIndex()
+        self.screen_count = 0
+        self.drag_target = None
+        self.drag_offset = QPoint()
+        self.pending_pos = None
+
+        self.flush_timer = QTimer()
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.timeout.connect(self.flush_drag)
+
+        color = manager.config["settings"].get("active_border_color", "#47f73e")
+        self.vertical_guide = GuideLine(color)
+        self.horizontal_guide = GuideLine(color)
+
+        self.update_screens()
+        app = QApplication.instance()
+        if app is not None:
+            app.screenAdded.connect(lambda _: self.update_screens())
+            app.screenRemoved.connect(lambda _: self.update_screens())
+
+    # ---------------- index --------------------------------------------
+    def update_screens(self):
+        """Index the available area of every screen so previews snap to its edges."""
+        for i in range(self.screen_count):
+            self.index.remove(("screen", i))
+        screens = QApplication.screens()
+        for i, screen in enumerate(screens):
+            geom = screen.availableGeometry()
+            self.index.insert(("screen", i), (geom.x(), geom.y(), geom.width(), geom.height()))
+        self.screen_count = len(screens)
+
+    def update_preview(self, preview):
+        """Called from the preview's move/resize events."""
+        geom = preview.frameGeometry()
+        self.index.insert(preview, (geom.x(), geom.y(), geom.width(), geom.height()))
+
+    def remove_preview(self, preview):
+        if self.drag_target is preview:
+            self.cancel_drag()
+        self.index.remove(preview)
+
+    # ---------------- snapping -----------------------------------------
+    def snap(self, preview, x, y):
+        """
+        Best snapped position for a preview placed at (x, y).
+
+        Returns (x, y, vertical_guide, horizontal_guide) where each guide is
+        an (x, y, w, h) line rect or None if that axis does not snap.
+        """
+        geom = preview.frameGeometry()
+        w, h = geom.width(), geom.height()
+        best_x = best_y = None  # (distance, new coordinate, guide)
+        nearby = self.index.query(x - SNAP_DISTANCE, y - SNAP_DISTANCE, w + 2 * SNAP_DISTANCE, h + 2 * SNAP_DISTANCE)
+
+        for key in nearby:
+            if key is preview:
+                continue
+            ox, oy, ow, oh = self.index.rects[key]
+            if isinstance(key, tuple):
+                # Screen edges: stay inside the available area
+                x_targets = [(ox, ox), (ox + ow - w, ox + ow - 1)]
+                y_targets = [(oy, oy), (oy + oh - h, oy + oh - 1)]
+            else:
+                # Another preview: butt against it or align with its edges
+                x_targets = [(ox - w, ox), (ox + ow, ox + ow), (ox, ox), (ox + ow - w, ox + ow - 1)]
+                y_targets = [(oy - h, oy), (oy + oh, oy + oh), (oy, oy), (oy + oh - h, oy + oh - 1)]
+
+            for target, line in x_targets:
+                distance = abs(target - x)
+                if distance < SNAP_DISTANCE and (best_x is None or distance < best_x[0]):
+                    top, bottom = min(y, oy), max(y + h, oy + oh)
+                    best_x = (distance, target, (line, top, 1, bottom - top))
+            for target, line in y_targets:
+                distance = abs(target - y)
+                if distance < SNAP_DISTANCE and (best_y is None or distance < best_y[0]):
+                    left, right = min(x, ox), max(x + w, ox + ow)
+                    best_y = (distance, target, (left, line, right - left, 1))
+
+        new_x, guide_x = (best_x[1], best_x[2]) if best_x else (x, None)
+        new_y, guide_y = (best_y[1], best_y[2]) if best_y else (y, None)
+        return new_x, new_y, guide_x, guide_y
+
+    def snap_preview(self, preview):
+        """Snap a preview in place with a single move."""
+        x, y, _, _ = self.snap(preview, preview.x(), preview.y())
+        if (x, y) != (preview.x(), preview.y()):
+            preview.move(x, y)
+        logging.debug(f"Snapped window {preview.window_id} to {x}, {y}")
+
+    # ---------------- arranging ----------------------------------------
+    def screen_areas(self):
+        """Available area of every screen, left to right."""
+        areas = [self.index.rects[("screen", i)] for i in range(self.screen_count)]
+        return sorted(areas, key=lambda area: (area[0], area[1]))
+
+    def arrangement_order(self, previews):
+        """Cycle order first, then any other characters by name."""
+        order = list(self.manager.config.get("hotkeys", {}).get("character_list", {}).keys())
+        rank = {name: i for i, name in enumerate(order)}
+        return sorted(previews, key=lambda p: (rank.get(p.get_character_name(), len(rank)), p.get_character_name()))
+
+    def arrange(self, mode=None):
+        """Place every preview at once and persist all positions with one config write."""
+        settings = self.manager.config["settings"].get("layout", {})
+        mode = mode or settings.get("mode", "grid")
+        previews = self.arrangement_order(self.manager.previews)
+        if not previews:
+            return
+
+        sizes = []
+        for preview in previews:
+            geom = preview.frameGeometry()
+            sizes.append((geom.width(), geom.height()))
+        positions = arrange_positions(mode, sizes, self.screen_areas(), settings.get("spacing", 0))
+
+        self.cancel_drag()
+        positions_config = self.manager.config["thumbnail_position"]
+        for preview, (x, y) in zip(previews, positions):
+            preview.move(x, y)
+            positions_config[preview.get_character_name()] = [x, y]
+        if self.manager.last_active_window_id is not None:
+            self.manager.active_border.update_position()
+        save_config(self.manager.config)
+        logging.info(f"Arranged {len(previews)} previews ({mode})")
+
+    def free_position(self, width, height, exclude=None):
+        """First slot of the current arrangement mode not covered by another preview."""
+        settings = self.manager.config["settings"].get("layout", {})
+        mode = settings.get("mode", "grid")
+        spacing = settings.get("spacing", 0)
+        areas = self.screen_areas()
+        capacity = sum((w // (width + spacing) + 1) * (h // (height + spacing) + 1) for _, _, w, h in areas)
+        slots = arrange_positions(mode, [(width, height)] * min(capacity, 1000), areas, spacing)
+
+        for x, y in slots:
+            occupied = False
+            for key in self.index.query(x, y, width, height):
+                if isinstance(key, tuple) or key is exclude:
+                    continue
+                ox, oy, ow, oh = self.index.rects[key]
+                if x < ox + ow and ox < x + width and y < oy + oh and oy < y + height:
+                    occupied = True
+                    break
+            if not occupied:
+                return [x, y]
+        return list(slots[0]) if slots else [0, 0]
+
+    # ---------------- dragging -----------------------------------------
+    def _frame_interval(self):
+        screen = QApplication.primaryScreen()
+        rate = screen.refreshRate() if screen is not None else 60.0
+        return max(1, int(1000 / (rate or 60.0)))
+
+    def begin_drag(self, preview, global_pos):
+        self.manager.recorder.record("drag", phase="begin", character=preview.get_character_name(),
+                                     x=global_pos.x(), y=global_pos.y())
+        self.drag_target = preview
+        self.drag_offset = global_pos - preview.pos()
+        self.pending_pos = None
+        preview.dragging = True
+
+    def drag_to(self, global_pos):
+        """Record the latest pointer position; the move happens on the next frame tick."""
+        if self.drag_target is None:
+            return
+        self.manager.recorder.record("drag", phase="move", x=global_pos.x(), y=global_pos.y())
+        self.pending_pos = global_pos - self.drag_offset
+        if not self.flush_timer.isActive():
+            self.flush_timer.start(self._frame_interval())
+
+    def flush_drag(self):
+        preview = self.drag_target
+        if preview is None or self.pending_pos is None:
+            return
+        pos, self.pending_pos = self.pending_pos, None
+        preview.move(pos)
+        self._follow_border(preview)
+        self._show_guides(*self.snap(preview, pos.x(), pos.y())[2:])
+
+    def end_drag(self):
+        """Apply the last motion, snap once and persist the position."""
+        preview = self.drag_target
+        if preview is None:
+            return
+        self.manager.recorder.record("drag", phase="end")
+        self.flush_timer.stop()
+        if self.pending_pos is not None:
+            pos = self.pending_pos
+        else:
+            pos = preview.pos()
+        x, y, _, _ = self.snap(preview, pos.x(), pos.y())
+        self.drag_target = None
+        self.pending_pos = None
+        preview.dragging = False
+        self._show_guides(None, None)
+        preview.move(x, y)
+        self._follow_border(preview)
+        preview.save_position()
+
+    def cancel_drag(self):
+        self.flush_timer.stop()
+        if self.drag_target is not None:
+            self.drag_target.dragging = False
+        self.drag_target = None
+        self.pending_pos = None
+        self._show_guides(None, None)
+
+    def _follow_border(self, preview):
+        if self.manager.get_last_active_client() == preview.window_id:
+            self.manager.active_border.update_position()
+
+    def _show_guides(self, vertical, horizontal):
+        for guide, rect in ((self.vertical_guide, vertical), (self.horizontal_guide, horizontal)):
+            if rect is None:
+                guide.hide()
+            else:
+                guide.show_at(*rect)
@@ -0,0 +1,170 @@
+import atexit
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from utils.config import CONFIG_FOLDER
+
+LOG_FOLDER = os.path.join(CONFIG_FOLDER, "logs")
+LOG_LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR"]
+FIELD_ORDER = ("window", "character", "stage", "duration_ms")  # Printed first, in this order
+
+_listener = None
+
+
+def log_fields(**fields):
+    """
+    extra= for a structured record: logging.debug("Captured", extra=log_fields(window=..., duration_ms=...)).
+
+    Keep the message constant and put the variable parts here; they are
+    only turned into text on the log writer thread.
+    """
+    return {"fields": fields}
+
+
+class StructuredFormatter(logging.Formatter):
+    """The usual "time - LEVEL - message" line, followed by key=value fields."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s - %(levelname)s - %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            keys = [key for key in FIELD_ORDER if key in fields] + sorted(fields.keys() - set(FIELD_ORDER))
+            line += " " + " ".join(f"{key}={format_value(fields[key])}" for key in keys)
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            line += f" ({suppressed} similar lines suppressed)"
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for grepping with jq."""
+
+    def format(self, record):
+        entry = {"time": round(record.created, 3), "level": record.levelname, "thread": record.threadName,
+                 "site": f"{record.module}:{record.lineno}", "message": record.getMessage()}
+        entry.update(getattr(record, "fields", None) or {})
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def format_value(value):
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    text = str(value)
+    return f'"{text}"' if " " in text else text
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets at most per_site records from one call site (file and line) through
+    per window_s seconds. The first record of the next window carries the
+    number dropped, so a flood shows up as one line every few seconds.
+    """
+
+    def __init__(self, per_site=20, window_s=10.0):
+        super().__init__()
+        self.per_site = per_site
+        self.window = window_s
+        self.lock = threading.Lock()
+        self.sites = {}  # (path, line) -> [window start, records passed, records dropped]
+
+    def filter(self, record):
+        if self.per_site <= 0:
+            return True
+        now = time.monotonic()
+        key = (record.pathname, record.lineno)
+        with self.lock:
+            site = self.sites.get(key)
+            if site is None or now - site[0] >= self.window:
+                record.suppressed = site[2] if site else 0
+                self.sites[key] = [now, 1, 0]
+                return True
+            if site[1] < self.per_site:
+                site[1] += 1
+                return True
+            site[2] += 1
+            return False
+
+
+class NamedQueueListener(QueueListener):
+    """QueueListener whose thread is named "log writer", for the profiler's per-thread CPU table."""
+
+    def start(self):
+        self._thread = threading.Thread(target=self._monitor, name="log writer", daemon=True)
+        self._thread.start()
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Hands the record to the writer thread as is. The stock QueueHandler
+    formats the message on the calling thread so it can be pickled, which
+    is the cost this is meant to move off the capture and input threads.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def setup_logging(config):
+    """
+    Route all logging through a queue to one "log writer" thread, which
+    formats and writes to stderr (and a JSON lines file if enabled).
+    Callers only pay for the level check, the rate limit and a queue put.
+    """
+    global _listener
+    settings = config["settings"].get("logging", {})
+    handlers = []
+    console = logging.StreamHandler(sys.stderr)
+    console.setFormatter(StructuredFormatter())
+    handlers.append(console)
+    if settings.get("json_file", False):
+        os.makedirs(LOG_FOLDER, exist_ok=True)
+        json_handler = RotatingFileHandler(os.path.join(LOG_FOLDER, "eve-l-preview.jsonl"),
+                                           maxBytes=5 * 1024 * 1024, backupCount=3)
+        json_handler.setFormatter(JsonFormatter())
+        handlers.append(json_handler)
+
+    stop_logging()
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    rate_limit = settings.get("rate_limit", {})
+    queue_handler.addFilter(RateLimitFilter(rate_limit.get("per_site", 20), rate_limit.get("window_s", 10)))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    set_level(settings.get("level", "INFO"))
+
+    _listener = NamedQueueListener(log_queue, *handlers)
+    _listener.start()
+    return _listener
+
+
+@atexit.register
+def stop_logging():
+    """Write out what is still queued and end the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def set_level(level_name):
+    """Change the level at runtime (e.g. "DEBUG" while chasing a problem)."""
+    level = getattr(logging, str(level_name).upper(), None)
+    if not isinstance(level, int):
+        logging.warning(f"Unknown log level {level_name!r}, using INFO")
+        level = logging.INFO
+    logging.getLogger().setLevel(level)
@@ -0,0 +1,103 @@
+import shutil
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+
+class FocusContext:
+    """Everything needed to switch to one client, resolved ahead of time."""
+
+    def __init__(self, window_id, character_name, preview):
+        self.window_id = window_id
+        self.character_name = character_name
+        self.preview = preview
+        self.geometry = preview.frameGeometry()  # Where the active border goes
+        self.kwin_uuid = None
+        self.resolved = False
+
+
+class FocusPrewarmer:
+    """
+    Keeps the likely next focus targets (the next/previous entry of every
+    cycle group) resolved: KWin UUID looked up in the background, preview
+    and border geometry at hand, and their thumbnails captured a little
+    faster so they are fresh when the switch happens.
+    """
+
+    def __init__(self, x11_interface, window_manager, config):
+        self.x11_interface = x11_interface
+        self.window_manager = window_manager
+        settings = config["settings"].get("prewarm", {})
+        self.enabled = settings.get("enabled", True)
+        self.capture_boost = settings.get("capture_boost", 0.7)
+        # Without kdotool the focus path is plain wmctrl; there is nothing to look up
+        self.resolve_kwin = shutil.which("kdotool") is not None
+
+        self.lock = threading.Lock()
+        self.contexts = {}  # window_id -> FocusContext
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prewarm")
+        self.hits = 0
+        self.misses = 0
+
+    def update(self, targets):
+        """Make targets, an iterable of (window_id, character name), the pre-warmed set."""
+        if not self.enabled:
+            return
+        targets = dict(targets)
+        with self.lock:
+            dropped = [context for window_id, context in self.contexts.items() if window_id not in targets]
+            for context in dropped:
+                del self.contexts[context.window_id]
+            added = []
+            for window_id, character_name in targets.items():
+                if window_id in self.contexts:
+                    continue
+                preview = self.window_manager.previews_by_character.get(character_name)
+                if preview is None or preview.window_id != window_id:
+                    continue
+                context = FocusContext(window_id, character_name, preview)
+                self.contexts[window_id] = context
+                added.append(context)
+
+        for context in dropped:
+            context.preview.update_thread.set_boost(1.0)
+        for context in added:
+            context.preview.update_thread.set_boost(self.capture_boost)
+            self.executor.submit(self._resolve, context)
+
+    def _resolve(self, context):
+        if self.resolve_kwin:
+            context.kwin_uuid = self.x11_interface.get_kwin_window_id(context.window_id)
+        context.resolved = True
+        logging.debug(f"Pre-warmed focus context for {context.character_name}: kwin={context.kwin_uuid}")
+
+    def take(self, window_id):
+        """The resolved context for a window that is about to be focused, or None."""
+        with self.lock:
+            context = self.contexts.get(window_id)
+            if (context is None or not context.resolved or context.preview.parked_at is not None
+                    or context.preview.window_id != window_id):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return context
+
+    def refresh_geometry(self, preview):
+        """Keep the border target in step when a pre-warmed preview moves or resizes."""
+        with self.lock:
+            context = self.contexts.get(preview.window_id)
+            if context is not None and context.preview is preview:
+                context.geometry = preview.frameGeometry()
+
+    def discard(self, window_id):
+        """Forget a context whose data turned out to be stale."""
+        with self.lock:
+            self.contexts.pop(window_id, None)
+
+    def get_status(self):
+        with self.lock:
+            names = [context.character_name for context in self.contexts.values()]
+            return names, self.hits, self.misses
+
+    def close(self):
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,152 @@
+import os
+import sys
+import threading
+import time
+import logging
+from collections import Counter
+from PyQt5.QtCore import QObject, pyqtSignal
+from utils.config import CONFIG_FOLDER
+
+PROFILE_FOLDER = os.path.join(CONFIG_FOLDER, "profiling")
+THREAD_ROLES = {}  # Python thread ident -> (role, native id), filled by the threads themselves
+
+
+def name_current_thread(role):
+    """
+    Label the calling thread in profiles (e.g. "capture", "keyboard hook").
+
+    QThreads and the keyboard library's threads are not started through
+    threading, so they have no useful name of their own. This is one dict
+    store, cheap enough for hot paths.
+    """
+    THREAD_ROLES[threading.get_ident()] = (role, threading.get_native_id())
+
+
+def thread_names():
+    """Python thread ident -> (name, native id) for every thread that can be named."""
+    names = {thread.ident: (thread.name, thread.native_id) for thread in threading.enumerate()}
+    names[threading.main_thread().ident] = ("gui", threading.main_thread().native_id)
+    live = sys._current_frames()
+    for ident in list(THREAD_ROLES):
+        if ident not in live:
+            THREAD_ROLES.pop(ident, None)  # Disposed capture threads; idents get reused
+    names.update(THREAD_ROLES)
+    return names
+
+
+def frame_label(code):
+    """module.Class.function, so flame graphs name our functions (x11_interface.X11Interface.capture_window)."""
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}.{getattr(code, 'co_qualname', code.co_name)}".replace(";", ":")
+
+
+def read_thread_ticks():
+    """native thread id -> (comm, utime + stime in clock ticks) from /proc."""
+    ticks = {}
+    try:
+        tids = os.listdir("/proc/self/task")
+    except OSError:
+        return ticks
+    for tid in tids:
+        try:
+            with open(f"/proc/self/task/{tid}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue  # Thread ended while listing
+        # comm is in parentheses and may contain spaces; the fields after it are fixed
+        comm = stat[stat.index("(") + 1:stat.rindex(")")]
+        fields = stat[stat.rindex(")") + 2:].split()
+        ticks[int(tid)] = (comm, int(fields[11]) + int(fields[12]))
+    return ticks
+
+
+class SamplingProfiler(QObject):
+    """
+    Samples the Python stacks of all threads (GUI, capture, keyboard hook,
+    helpers) for a while and writes collapsed stacks plus a per-thread CPU
+    summary to CONFIG_FOLDER/profiling/.
+
+    Nothing runs while no session is active. During a session one daemon
+    thread wakes every interval_ms and reads sys._current_frames(), so the
+    app keeps running at close to full speed in a live fleet.
+    The .folded file feeds flamegraph.pl, speedscope or inferno directly.
+    """
+    finished = pyqtSignal(str)  # Path of the written profile, emitted from the sampling thread
+
+    def __init__(self, config):
+        super().__init__()
+        settings = config["settings"].get("profiler", {})
+        self.interval = settings.get("interval_ms", 10) / 1000
+        self.max_depth = settings.get("max_depth", 64)
+        self.thread = None
+        self.stop_event = threading.Event()
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, seconds):
+        """Begin a session of at most seconds; returns False if one is already running."""
+        if self.is_running():
+            return False
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, args=(seconds,), name="profiler", daemon=True)
+        self.thread.start()
+        logging.info(f"Profiling all threads for {seconds} s")
+        return True
+
+    def stop(self):
+        """End the session early; the profile is still written."""
+        self.stop_event.set()
+
+    def _run(self, seconds):
+        own = threading.get_ident()
+        stacks = Counter()
+        samples = 0
+        ticks_before = read_thread_ticks()
+        started = time.monotonic()
+        deadline = started + seconds
+        while not self.stop_event.is_set() and time.monotonic() < deadline:
+            names = thread_names()
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                labels = []
+                while frame is not None and len(labels) < self.max_depth:
+                    labels.append(frame_label(frame.f_code))
+                    frame = frame.f_back
+                name = names.get(ident, (f"thread-{ident}", None))[0]
+                labels.append(name.replace(";", ":"))
+                stacks[";".join(reversed(labels))] += 1
+            samples += 1
+            self.stop_event.wait(self.interval)
+        elapsed = time.monotonic() - started
+        ticks_after = read_thread_ticks()
+
+        try:
+            path = self._write(stacks, samples, elapsed, ticks_before, ticks_after, thread_names())
+        except OSError as e:
+            logging.error(f"Could not write profile: {e}")
+            return
+        logging.info(f"Profile written to {path} ({samples} samples over {elapsed:.1f} s)")
+        self.finished.emit(path)
+
+    def _write(self, stacks, samples, elapsed, ticks_before, ticks_after, names):
+        os.makedirs(PROFILE_FOLDER, exist_ok=True)
+        base = os.path.join(PROFILE_FOLDER, time.strftime("profile-%Y%m%d-%H%M%S"))
+        with open(base + ".folded", "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        by_native_id = {native_id: name for name, native_id in names.values() if native_id is not None}
+        clock_ticks = os.sysconf("SC_CLK_TCK")
+        rows = []
+        for tid, (comm, ticks) in ticks_after.items():
+            used = (ticks - ticks_before.get(tid, (comm, 0))[1]) / clock_ticks
+            rows.append((used, by_native_id.get(tid, comm), tid))
+        rows.sort(reverse=True)
+        with open(base + ".cpu.txt", "w") as f:
+            f.write(f"{samples} samples over {elapsed:.1f} s, {self.interval * 1000:g} ms interval\n")
+            f.write(f"{'CPU s':>8} {'% of 1 CPU':>10}  thread\n")
+            for used, name, tid in rows:
+                f.write(f"{used:8.2f} {used / max(elapsed, 1e-6) * 100:10.1f}  {name} ({tid})\n")
+        return base + ".folded"
@@ -0,0 +1,99 @@
+import copy
+import time
+import logging
+from PyQt5.QtCore import QObject, pyqtSignal
+from utils.config import save_config, REFRESH_RATE
+
+
+class ProfileManager(QObject):
+    """
+    Named fleet setups stored under config["profiles"].
+
+    A profile holds thumbnail positions, the cycle order, alert ROIs and
+    capture settings. Switching applies them to the live previews in
+    place (moves and new capture intervals); no preview or capture thread
+    is recreated. A profile's hotkey is dispatched by HotkeyManager's table.
+    """
+
+    switch_requested = pyqtSignal(str)  # Emitted from the keyboard thread, handled on the GUI thread
+    profile_switched = pyqtSignal(str)
+    profiles_changed = pyqtSignal()
+
+    def __init__(self, config, window_manager):
+        super().__init__()
+        self.config = config
+        self.window_manager = window_manager
+        self.switch_requested.connect(self.switch)
+
+    def get_profiles(self):
+        return self.config.setdefault("profiles", {})
+
+    def get_active_profile(self):
+        return self.config.get("active_profile", "")
+
+    def snapshot(self):
+        """The current setup in profile form."""
+        settings = self.config["settings"]
+        return {
+            "thumbnail_position": copy.deepcopy(self.config["thumbnail_position"]),
+            "character_list": copy.deepcopy(self.config.get("hotkeys", {}).get("character_list", {})),
+            "groups": copy.deepcopy(self.config.get("hotkeys", {}).get("groups", {})),
+            "rois": copy.deepcopy(self.config.get("alerts", {}).get("rois", {})),
+            "thumbnail_scaling": settings["thumbnail_scaling"],
+            "capture_interval": settings.get("capture_interval", REFRESH_RATE),
+            "capture_intervals": copy.deepcopy(settings.get("capture_intervals", {})),
+        }
+
+    def save_profile(self, name, hotkey=""):
+        """Store the current setup under name (overwriting it) and make it active."""
+        profile = self.snapshot()
+        profile["hotkey"] = hotkey
+        self.get_profiles()[name] = profile
+        self.config["active_profile"] = name
+        save_config(self.config)
+        self.profiles_changed.emit()
+        logging.info(f"Saved profile {name}")
+
+    def delete_profile(self, name):
+        if self.get_profiles().pop(name, None) is None:
+            return
+        if self.get_active_profile() == name:
+            self.config["active_profile"] = ""
+        save_config(self.config)
+        self.profiles_changed.emit()
+
+    def switch(self, name):
+        """Apply a profile to the config and the live previews."""
+        profile = self.get_profiles().get(name)
+        if profile is None:
+            logging.warning(f"Unknown profile: {name}")
+            return
+
+        start = time.perf_counter()
+        settings = self.config["settings"]
+        # Positions of characters the profile does not know about are kept
+        self.config["thumbnail_position"].update(copy.deepcopy(profile.get("thumbnail_position", {})))
+        self.config.setdefault("hotkeys", {})["character_list"] = copy.deepcopy(profile.get("character_list", {}))
+        self.config["hotkeys"]["groups"] = copy.deepcopy(profile.get("groups", {}))
+        self.config.setdefault("alerts", {})["rois"] = copy.deepcopy(profile.get("rois", {}))
+        settings["thumbnail_scaling"] = profile.get("thumbnail_scaling", settings["thumbnail_scaling"])
+        settings["capture_interval"] = profile.get("capture_interval", REFRESH_RATE)
+        settings["capture_intervals"] = copy.deepcopy(profile.get("capture_intervals", {}))
+        self.config["active_profile"] = name
+
+        # Hot-apply: analyzers and capture scaling read the config on their next frame
+        manager = self.window_manager
+        manager.layout.cancel_drag()
+        for preview in manager.previews:
+            position = self.config["thumbnail_position"].get(preview.get_character_name())
+            if position is not None and (preview.x(), preview.y()) != tuple(position):
+                preview.move(position[0], position[1])
+            preview.apply_capture_interval()
+        if manager.last_active_window_id is not None:
+            manager.active_border.update_position()
+        if manager.hotkey_manager is not None and manager.last_active_window_id is not None:
+            manager.hotkey_manager.update_current_index(manager.last_active_window_id)
+
+        save_config(self.config)
+        self.profile_switched.emit(name)
+        logging.info(f"Switched to profile {name} in {(time.perf_counter() - start) * 1000:.1f} ms")
@@ -0,0 +1,167 @@
+import os
+import threading
+import time
+import logging
+from PyQt5.QtCore import QObject, QTimer
+
+EVE_PROCESS_MARKER = b"exefile.exe"  # EVE client binary under Wine/Proton
+PROCESS_RESCAN_INTERVAL = 15  # samples between /proc scans for new clients
+
+
+def apply_thread_policy(nice=None, sched_idle=False, cpus=None, tid=None):
+    """
+    Apply nice, SCHED_IDLE and CPU affinity to an OS thread (default: the caller).
+
+    On Linux all three are per-thread attributes and are inherited by
+    processes forked from that thread, so maim/wmctrl children started by a
+    capture thread run under the same policy. Returns the applied settings.
+    """
+    if tid is None:
+        tid = threading.get_native_id()
+    applied = []
+
+    if sched_idle and hasattr(os, "SCHED_IDLE"):
+        try:
+            os.sched_setscheduler(tid, os.SCHED_IDLE, os.sched_param(0))
+            applied.append("SCHED_IDLE")
+        except OSError as e:
+            logging.debug(f"SCHED_IDLE not applied to thread {tid}: {e}")
+
+    if nice is not None:
+        try:
+            os.setpriority(os.PRIO_PROCESS, tid, nice)
+            applied.append(f"nice {nice}")
+        except OSError as e:
+            logging.debug(f"nice {nice} not applied to thread {tid}: {e}")
+
+    if cpus:
+        try:
+            os.sched_setaffinity(tid, set(cpus))
+            applied.append(f"cpus {sorted(cpus)}")
+        except (OSError, ValueError) as e:
+            logging.debug(f"Affinity {cpus} not applied to thread {tid}: {e}")
+
+    return applied
+
+
+class ResourceMonitor(QObject):
+    """
+    Applies scheduling policy to capture and input threads, and watches system
+    load and EVE client CPU to back capture off when the game needs the CPU.
+    """
+
+    def __init__(self, config):
+        super().__init__()
+        self.config = config
+        self.settings = config["settings"].get("resource_control", {})
+        self.enabled = self.settings.get("enabled", True)
+
+        self.backoff = 1.0  # multiplier applied to every capture interval
+        self.load_per_cpu = 0.0
+        self.eve_cpu_percent = 0.0
+        self.capture_policy = []
+        self.input_policy = []
+        self.input_threads = set()
+
+        self.eve_pids = []
+        self.eve_ticks = {}
+        self.samples = 0
+        self.last_sample = time.monotonic()
+        self.clock_ticks = os.sysconf("SC_CLK_TCK")
+        self.cpu_count = os.cpu_count() or 1
+
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.sample)
+        if self.enabled:
+            self.timer.start(self.settings.get("sample_interval", 2000))
+
+    def apply_capture_policy(self):
+        """Lower the priority of the calling capture thread."""
+        if not self.enabled:
+            return
+        self.capture_policy = apply_thread_policy(
+            nice=self.settings.get("capture_nice", 10),
+            sched_idle=self.settings.get("capture_sched_idle", False),
+            cpus=self.settings.get("capture_cpus", []),
+        )
+
+    def apply_input_policy(self):
+        """
+        Raise the priority of the calling keyboard hook thread, once per thread.
+
+        Threads and processes it creates inherit this, so anything started
+        from it that is not input work must set its own priority.
+        """
+        if not self.enabled:
+            return
+        tid = threading.get_native_id()
+        if tid in self.input_threads:
+            return
+        self.input_threads.add(tid)
+        # Negative nice needs CAP_SYS_NICE; the app usually runs as root for hotkeys
+        self.input_policy = apply_thread_policy(
+            nice=self.settings.get("input_nice", -5),
+            cpus=self.settings.get("input_cpus", []),
+        )
+
+    def get_capture_interval(self, interval):
+        """Scale a capture interval by the current backoff."""
+        return int(interval * self.backoff)
+
+    def _find_eve_pids(self):
+        pids = []
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/cmdline", "rb") as f:
+                    if EVE_PROCESS_MARKER in f.read():
+                        pids.append(int(entry))
+            except OSError:
+                continue
+        return pids
+
+    def _read_ticks(self, pid):
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            # Fields after the parenthesised command name; utime and stime are 14 and 15
+            fields = f.read().rsplit(b")", 1)[1].split()
+        return int(fields[11]) + int(fields[12])
+
+    def sample(self):
+        """Update load figures and adjust the capture backoff."""
+        now = time.monotonic()
+        elapsed = max(now - self.last_sample, 1e-3)
+        self.last_sample = now
+
+        try:
+            self.load_per_cpu = os.getloadavg()[0] / self.cpu_count
+        except OSError:
+            self.load_per_cpu = 0.0
+
+        if self.samples % PROCESS_RESCAN_INTERVAL == 0:
+            self.eve_pids = self._find_eve_pids()
+        self.samples += 1
+
+        total_ticks = 0
+        ticks = {}
+        for pid in self.eve_pids:
+            try:
+                ticks[pid] = self._read_ticks(pid)
+            except (OSError, IndexError, ValueError):
+                continue
+            total_ticks += ticks[pid] - self.eve_ticks.get(pid, ticks[pid])
+        self.eve_ticks = ticks
+        # Percent of the whole machine, so 100 means every core is busy with EVE
+        self.eve_cpu_percent = 100.0 * total_ticks / self.clock_ticks / elapsed / self.cpu_count
+
+        overloaded = (self.load_per_cpu > self.settings.get("load_threshold", 0.9) or
+                      self.eve_cpu_percent > self.settings.get("eve_cpu_threshold", 70.0))
+        previous = self.backoff
+        if overloaded:
+            self.backoff = min(self.backoff * 2, self.settings.get("max_backoff", 4.0))
+        else:
+            self.backoff = max(self.backoff / 2, 1.0)
+
+        if self.backoff != previous:
+            logging.info(f"Capture backoff {previous:.1f}x -> {self.backoff:.1f}x "
+                         f"(load/cpu {self.load_per_cpu:.2f}, EVE CPU {self.eve_cpu_percent:.1f}%)")
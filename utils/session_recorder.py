@@ -0,0 +1,116 @@
+import gzip
+import json
+import os
+import threading
+import time
+import logging
+from utils.config import CONFIG_FOLDER
+
+RECORDING_FOLDER = os.path.join(CONFIG_FOLDER, "recordings")
+RECORDING_VERSION = 1
+
+
+def read_recording(path):
+    """(header, [event, ...]) of a recording; events are dicts with "t" (seconds) and "type"."""
+    with gzip.open(path, "rt") as f:
+        header = json.loads(f.readline())
+        if header.get("version") != RECORDING_VERSION:
+            raise ValueError(f"{path}: recording version {header.get('version')}, expected {RECORDING_VERSION}")
+        return header, [json.loads(line) for line in f]
+
+
+class SessionRecorder:
+    """
+    Records what drives WindowManager and HotkeyManager in a real session,
+    as gzip-compressed JSON lines, for tools/replay_session.py:
+
+        window_opened {id, title}, window_closed {id}, title {id, title}
+        focus {id, hotkey: true if one of our hotkey switches caused it}, key {combo}, frame {character, w, h, rects, area}
+        drag {phase: begin/move/end, character, x, y}
+
+    Only windows titled "EVE..." are recorded, and only key combos that
+    match a binding (never typed text). record() is a flag check while
+    no recording runs; it is called from the GUI, keyboard and capture
+    threads, so writes go through a lock.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.lock = threading.Lock()
+        self.file = None
+        self.path = None
+        self.started = 0.0
+        self.events = 0
+        self.windows = {}  # window id -> title, as last listed
+
+    @property
+    def recording(self):
+        return self.file is not None
+
+    def start(self):
+        """Open a new recording in RECORDING_FOLDER; returns its path."""
+        os.makedirs(RECORDING_FOLDER, exist_ok=True)
+        path = os.path.join(RECORDING_FOLDER, time.strftime("session-%Y%m%d-%H%M%S.jsonl.gz"))
+        settings = self.config["settings"]
+        header = {
+            "version": RECORDING_VERSION,
+            "started": time.time(),
+            "hotkeys": self.config.get("hotkeys", {}),
+            "settings": {key: settings.get(key) for key in ("thumbnail_scaling", "capture_interval",
+                                                            "capture_intervals", "preview_pool")},
+        }
+        with self.lock:
+            if self.file is not None:
+                return self.path
+            self.file = gzip.open(path, "wt", compresslevel=6)
+            self.file.write(json.dumps(header) + "\n")
+            self.path = path
+            self.started = time.monotonic()
+            self.events = 0
+            self.windows = {}  # The next listing records every open client as opened
+        logging.info(f"Recording session to {path}")
+        return path
+
+    def stop(self):
+        with self.lock:
+            if self.file is None:
+                return None
+            self.file.close()
+            self.file = None
+        logging.info(f"Session recording {self.path} finished ({self.events} events)")
+        return self.path
+
+    def record(self, event_type, **fields):
+        if self.file is None:
+            return
+        fields["type"] = event_type
+        with self.lock:
+            if self.file is None:
+                return
+            fields["t"] = round(time.monotonic() - self.started, 4)
+            self.file.write(json.dumps(fields, separators=(",", ":")) + "\n")
+            self.events += 1
+
+    # ---------------- hooks --------------------------------------------
+    def windows_listed(self, windows):
+        """GUI thread: the (window id, title) pairs of one wmctrl listing."""
+        if self.file is None:
+            return
+        listed = {hex(int(window_id, 16)): title for window_id, title in windows if title.startswith("EVE")}
+        for window_id, title in listed.items():
+            previous = self.windows.get(window_id)
+            if previous is None:
+                self.record("window_opened", id=window_id, title=title)
+            elif previous != title:
+                self.record("title", id=window_id, title=title)
+        for window_id in self.windows.keys() - listed.keys():
+            self.record("window_closed", id=window_id)
+        self.windows = listed
+
+    def publish(self, character_name, image, dirty):
+        """Frame sink: metadata of every changed frame, no pixels."""
+        if self.file is None:
+            return
+        rects = dirty if dirty is not None else [(0, 0, image.width(), image.height())]
+        self.record("frame", character=character_name, w=image.width(), h=image.height(), rects=len(rects),
+                    area=sum(w * h for _, _, w, h in rects))
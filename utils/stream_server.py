@@ -0,0 +1,324 @@
+import base64
+import hashlib
+import hmac
+import socket
+import struct
+import threading
+import time
+import zlib
+import logging
+from urllib.parse import urlparse, parse_qs
+from PyQt5.QtGui import QImage
+
+# Wire format (version 1), all little endian, every message prefixed by its length (uint32):
+#   HELLO  type=0: uint8 version
+#   FRAME  type=1: uint16 name length, name (utf-8), uint16 width, uint16 height, uint16 rect count,
+#                  then per rect: uint16 x, y, w, h, uint32 payload length, zlib(RGB888 rows)
+# A frame with a single rect covering the whole image replaces the client's canvas; otherwise
+# the rects are patched into the canvas of that character. Over WebSocket each message is one
+# binary frame (without the length prefix).
+PROTOCOL_VERSION = 1
+MSG_HELLO, MSG_FRAME = 0, 1
+LENGTH = struct.Struct("<I")
+FRAME_HEADER = struct.Struct("<BH")
+FRAME_SIZE = struct.Struct("<HHH")
+RECT_HEADER = struct.Struct("<HHHHI")
+WEBSOCKET_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+SEND_TIMEOUT = 10.0  # A viewer that takes longer than this to accept data is dropped
+
+
+def encode_rect(image, rect):
+    """zlib-compressed RGB888 rows of one rect of an RGB32 image."""
+    x, y, w, h = rect
+    part = image.copy(x, y, w, h).convertToFormat(QImage.Format_RGB888)
+    bits = part.constBits()
+    bits.setsize(part.sizeInBytes())
+    data = bytes(bits)
+    stride = part.bytesPerLine()
+    if stride != w * 3:  # Scanlines are padded to 4 bytes
+        data = b"".join(data[row * stride:row * stride + w * 3] for row in range(h))
+    return zlib.compress(data, 1)
+
+
+def encode_frame(name, width, height, rects):
+    """Build a FRAME message body from [(rect, payload)]."""
+    name = name.encode()
+    parts = [FRAME_HEADER.pack(MSG_FRAME, len(name)), name, FRAME_SIZE.pack(width, height, len(rects))]
+    for (x, y, w, h), payload in rects:
+        parts.append(RECT_HEADER.pack(x, y, w, h, len(payload)))
+        parts.append(payload)
+    return b"".join(parts)
+
+
+def decode_frame(body):
+    """Parse a FRAME body into (name, width, height, [(x, y, w, h, RGB888 bytes)])."""
+    _, name_length = FRAME_HEADER.unpack_from(body)
+    offset = FRAME_HEADER.size
+    name = body[offset:offset + name_length].decode()
+    offset += name_length
+    width, height, count = FRAME_SIZE.unpack_from(body, offset)
+    offset += FRAME_SIZE.size
+    rects = []
+    for _ in range(count):
+        x, y, w, h, length = RECT_HEADER.unpack_from(body, offset)
+        offset += RECT_HEADER.size
+        rects.append((x, y, w, h, zlib.decompress(body[offset:offset + length])))
+        offset += length
+    return name, width, height, rects
+
+
+def union_rects(pending, dirty, width, height):
+    """Merge newly dirty rects into what a client still has to receive; None means everything."""
+    if pending is None or dirty is None:
+        return None
+    merged = set(pending)
+    merged.update(dirty)
+    # Past a quarter of the image, one full rect compresses better than many small ones
+    if sum(w * h for _, _, w, h in merged) * 4 > width * height:
+        return None
+    return sorted(merged)
+
+
+class Frame:
+    """The latest thumbnail of one character, with its rect encodings shared by all viewers."""
+
+    def __init__(self, image, seq):
+        self.image = image
+        self.seq = seq
+        self.encoded = {}  # rect -> payload
+
+    def encode(self, rect):
+        payload = self.encoded.get(rect)
+        if payload is None:
+            payload = self.encoded[rect] = encode_rect(self.image, rect)
+        return payload
+
+
+class StreamClient:
+    """One viewer: what it still needs per character, and a token bucket for its bandwidth."""
+
+    def __init__(self, server, sock, address, websocket):
+        self.server = server
+        self.sock = sock
+        self.address = address
+        self.websocket = websocket
+        self.pending = {}  # character -> accumulated dirty rects, or None for a full frame
+        self.sizes = {}  # character -> (width, height) the viewer has
+        self.wake = threading.Condition(server.lock)
+        self.closed = False
+        self.rate = server.max_kbps * 1000 / 8  # Bytes per second; 0 is unlimited
+        self.allowance = self.rate
+        self.last_refill = time.monotonic()
+        self.sent_bytes = 0
+        self.dropped_frames = 0
+
+    def queue(self, character, dirty, width, height):
+        """Called with the server lock held."""
+        if character in self.pending:
+            self.dropped_frames += 1  # The previous frame was never sent; it is superseded
+        if self.sizes.get(character) != (width, height):
+            dirty = None
+        self.pending[character] = union_rects(self.pending.get(character, []), dirty, width, height)
+        self.wake.notify()
+
+    def _throttle(self, nbytes):
+        if not self.rate:
+            return
+        now = time.monotonic()
+        self.allowance = min(self.rate, self.allowance + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+        self.allowance -= nbytes
+        if self.allowance < 0:
+            # Frames published meanwhile merge into pending, so a slow link just sees fewer of them
+            time.sleep(-self.allowance / self.rate)
+
+    def send(self, body):
+        if self.websocket:
+            length = len(body)
+            if length < 126:
+                header = struct.pack("!BB", 0x82, length)
+            elif length < 65536:
+                header = struct.pack("!BBH", 0x82, 126, length)
+            else:
+                header = struct.pack("!BBQ", 0x82, 127, length)
+        else:
+            header = LENGTH.pack(len(body))
+        self._throttle(len(header) + len(body))
+        self.sock.sendall(header + body)
+        self.sent_bytes += len(header) + len(body)
+
+    def run(self):
+        try:
+            self.send(bytes([MSG_HELLO, PROTOCOL_VERSION]))
+            while True:
+                with self.server.lock:
+                    while not self.pending and not self.closed:
+                        self.wake.wait()
+                    if self.closed:
+                        return
+                    character, dirty = self.pending.popitem()
+                    frame = self.server.frames.get(character)
+                    if frame is None:
+                        continue
+                    width, height = frame.image.width(), frame.image.height()
+                    self.sizes[character] = (width, height)
+                rects = [(0, 0, width, height)] if dirty is None else dirty
+                self.send(encode_frame(character, width, height, [(rect, frame.encode(rect)) for rect in rects]))
+        except OSError as e:
+            logging.info(f"Stream viewer {self.address} disconnected: {e}")
+        finally:
+            self.server.remove_client(self)
+
+    def close(self):
+        with self.server.lock:
+            self.closed = True
+            self.wake.notify()
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class StreamServer:
+    """
+    Streams the thumbnails the capture threads already produce to remote viewers.
+
+    UpdateThreads publish each changed frame with its dirty rects (as used
+    for local repaints); nothing is captured on behalf of a viewer. Each
+    viewer gets the tiles that changed since the last frame it received,
+    zlib-compressed, over plain TCP or WebSocket, paced by a per-viewer
+    bandwidth cap. While a viewer is behind, new frames replace the unsent
+    ones and their dirty areas are merged, so slow viewers skip frames
+    instead of building a backlog.
+    """
+
+    def __init__(self, config):
+        settings = config["settings"].get("stream", {})
+        self.enabled = settings.get("enabled", False)
+        self.host = settings.get("host", "127.0.0.1")
+        self.port = settings.get("port", 8765)
+        self.token = settings.get("token", "")
+        self.max_kbps = settings.get("max_kbps", 2000)
+        self.max_clients = settings.get("max_clients", 4)
+
+        self.lock = threading.Lock()
+        self.frames = {}  # character -> Frame
+        self.clients = []
+        self.seq = 0
+        self.listener = None
+        if self.enabled:
+            self.start()
+
+    def start(self):
+        try:
+            self.listener = socket.create_server((self.host, self.port), reuse_port=False)
+        except OSError as e:
+            logging.error(f"Thumbnail stream disabled: cannot listen on {self.host}:{self.port}: {e}")
+            self.enabled = False
+            return
+        if not self.token and self.host not in ("127.0.0.1", "localhost", "::1"):
+            logging.warning("Thumbnail stream is reachable from the network without a token")
+        threading.Thread(target=self._accept, name="stream-accept", daemon=True).start()
+        logging.info(f"Streaming thumbnails on {self.host}:{self.port}")
+
+    # ---------------- frames from the capture threads ------------------
+    def publish(self, character_name, image, dirty):
+        """Capture thread: a changed frame; dirty is a rect list or None for a full change."""
+        if not self.enabled:
+            return
+        with self.lock:
+            self.seq += 1
+            self.frames[character_name] = Frame(image, self.seq)
+            for client in self.clients:
+                client.queue(character_name, dirty, image.width(), image.height())
+
+    # ---------------- connections --------------------------------------
+    def _accept(self):
+        while self.listener is not None:
+            try:
+                sock, address = self.listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handshake, args=(sock, address), name="stream-client", daemon=True).start()
+
+    def _handshake(self, sock, address):
+        """Authenticate and detect WebSocket; plain TCP viewers send a uint16-prefixed token first."""
+        sock.settimeout(SEND_TIMEOUT)
+        try:
+            start = sock.recv(4, socket.MSG_PEEK)
+            if start == b"GET ":
+                websocket, token = True, self._websocket_handshake(sock)
+            else:
+                length = struct.unpack("<H", self._read(sock, 2))[0]
+                websocket, token = False, self._read(sock, length).decode(errors="replace")
+        except (OSError, ValueError, struct.error) as e:
+            logging.debug(f"Stream handshake with {address} failed: {e}")
+            sock.close()
+            return
+        if self.token and not hmac.compare_digest(token.encode(), self.token.encode()):
+            logging.warning(f"Stream viewer {address} rejected: bad token")
+            sock.close()
+            return
+
+        with self.lock:
+            if len(self.clients) >= self.max_clients:
+                logging.warning(f"Stream viewer {address} rejected: {self.max_clients} viewers already")
+                sock.close()
+                return
+            client = StreamClient(self, sock, address, websocket)
+            self.clients.append(client)
+            for character, frame in self.frames.items():  # Start with full frames of everyone
+                client.queue(character, None, frame.image.width(), frame.image.height())
+        logging.info(f"Stream viewer {address} connected ({'WebSocket' if websocket else 'TCP'})")
+        client.run()
+
+    @staticmethod
+    def _read(sock, size):
+        data = b""
+        while len(data) < size:
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("closed during handshake")
+            data += chunk
+        return data
+
+    def _websocket_handshake(self, sock):
+        """Answer the HTTP upgrade; the token comes as ?token= in the request path."""
+        request = b""
+        while b"\r\n\r\n" not in request:
+            chunk = sock.recv(4096)
+            if not chunk or len(request) > 16384:
+                raise ConnectionError("incomplete upgrade request")
+            request += chunk
+        lines = request.decode(errors="replace").split("\r\n")
+        path = lines[0].split(" ")[1] if len(lines[0].split(" ")) > 1 else "/"
+        headers = {key.strip().lower(): value.strip() for key, _, value in
+                   (line.partition(":") for line in lines[1:] if ":" in line)}
+        key = headers.get("sec-websocket-key")
+        if key is None:
+            raise ValueError("not a WebSocket upgrade")
+        accept = base64.b64encode(hashlib.sha1(key.encode() + WEBSOCKET_GUID).digest()).decode()
+        sock.sendall(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+        return parse_qs(urlparse(path).query).get("token", [""])[0]
+
+    def remove_client(self, client):
+        with self.lock:
+            if client in self.clients:
+                self.clients.remove(client)
+        try:
+            client.sock.close()
+        except OSError:
+            pass
+
+    def get_stats(self):
+        """[(address, bytes sent, frames dropped)] of the connected viewers."""
+        with self.lock:
+            return [(client.address, client.sent_bytes, client.dropped_frames) for client in self.clients]
+
+    def close(self):
+        listener, self.listener = self.listener, None
+        if listener is not None:
+            listener.close()
+        for client in list(self.clients):
+            client.close()
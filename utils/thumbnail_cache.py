@@ -0,0 +1,152 @@
+import mmap
+import os
+import struct
+import threading
+import time
+import logging
+from PyQt5.QtGui import QImage
+from utils.config import CONFIG_FOLDER
+
+CACHE_FILE = os.path.join(CONFIG_FOLDER, "thumbnail_cache.bin")
+CACHE_MAGIC = b"EVLC"
+CACHE_VERSION = 1
+
+# File header: magic, version, slot count, slot size
+HEADER = struct.Struct("<4sIII")
+# Slot header: character name, last seen (epoch), width, height, bytes per line
+NAME_BYTES = 64
+SLOT_HEADER = struct.Struct(f"<{NAME_BYTES}sdIII")
+
+
+class ThumbnailCache:
+    """
+    Fixed-size memory-mapped store holding the last thumbnail of each character.
+
+    The file is split into equally sized slots so a write is a single memcpy
+    into the mapping; the kernel flushes dirty pages on its own schedule.
+    When every slot is taken the character seen longest ago is evicted.
+    """
+
+    def __init__(self, config):
+        cache_settings = config["settings"].get("thumbnail_cache", {})
+        self.enabled = cache_settings.get("enabled", True)
+        self.max_entries = cache_settings.get("max_entries", 32)
+        self.slot_size = cache_settings.get("slot_size", 128 * 1024)
+        self.write_interval = cache_settings.get("write_interval", 10)
+
+        self.lock = threading.Lock()
+        self.slots = {}  # character name -> [slot index, last seen]
+        self.last_write = {}  # character name -> monotonic time of last store
+        self.file = None
+        self.mm = None
+
+        if self.enabled:
+            try:
+                self._open()
+            except (OSError, ValueError) as e:
+                logging.warning(f"Thumbnail cache disabled: could not open {CACHE_FILE}: {e}")
+                self.enabled = False
+
+    def _open(self):
+        """Map the cache file, re-initialising it if the layout changed."""
+        file_size = HEADER.size + self.max_entries * self.slot_size
+        mode = "r+b" if os.path.exists(CACHE_FILE) else "w+b"
+        self.file = open(CACHE_FILE, mode)
+
+        header = self.file.read(HEADER.size)
+        expected = HEADER.pack(CACHE_MAGIC, CACHE_VERSION, self.max_entries, self.slot_size)
+        if header != expected or os.path.getsize(CACHE_FILE) != file_size:
+            logging.debug(f"Initialising thumbnail cache at {CACHE_FILE}")
+            self.file.seek(0)
+            self.file.truncate(0)  # drop stale slots from an older layout
+            self.file.truncate(file_size)
+            self.file.write(expected)
+            self.file.flush()
+
+        self.mm = mmap.mmap(self.file.fileno(), file_size)
+
+        for index in range(self.max_entries):
+            raw_name, last_seen, width, height, _ = SLOT_HEADER.unpack_from(self.mm, self._slot_offset(index))
+            name = raw_name.rstrip(b"\0").decode("utf-8", "replace")
+            if name and width and height:
+                self.slots[name] = [index, last_seen]
+
+        logging.debug(f"Thumbnail cache loaded with {len(self.slots)} entries")
+
+    def _slot_offset(self, index):
+        return HEADER.size + index * self.slot_size
+
+    def _claim_slot(self, character_name):
+        """Return the slot index for a character, evicting the oldest if full."""
+        if character_name in self.slots:
+            return self.slots[character_name][0]
+
+        used = {index for index, _ in self.slots.values()}
+        for index in range(self.max_entries):
+            if index not in used:
+                return index
+
+        oldest = min(self.slots, key=lambda name: self.slots[name][1])
+        logging.debug(f"Evicting {oldest} from thumbnail cache")
+        return self.slots.pop(oldest)[0]
+
+    def store(self, character_name, image):
+        """Write a thumbnail for a character, at most once per write interval."""
+        if not self.enabled or image is None or image.isNull():
+            return
+
+        now = time.monotonic()
+        if now - self.last_write.get(character_name, -self.write_interval) < self.write_interval:
+            return
+
+        if image.format() != QImage.Format_RGB32:
+            image = image.convertToFormat(QImage.Format_RGB32)
+
+        nbytes = image.sizeInBytes()
+        if nbytes > self.slot_size - SLOT_HEADER.size:
+            logging.debug(f"Thumbnail for {character_name} too large to cache ({nbytes} bytes)")
+            return
+
+        data = image.constBits().asstring(nbytes)
+        name = character_name.encode("utf-8")[:NAME_BYTES]
+
+        with self.lock:
+            if not self.enabled:
+                return
+            index = self._claim_slot(character_name)
+            offset = self._slot_offset(index)
+            last_seen = time.time()
+            self.mm[offset + SLOT_HEADER.size:offset + SLOT_HEADER.size + nbytes] = data
+            SLOT_HEADER.pack_into(self.mm, offset, name, last_seen,
+                                  image.width(), image.height(), image.bytesPerLine())
+            self.slots[character_name] = [index, last_seen]
+            self.last_write[character_name] = now
+
+    def load(self, character_name):
+        """Return the cached thumbnail for a character as a QImage, or None."""
+        if not self.enabled:
+            return None
+
+        with self.lock:
+            slot = self.slots.get(character_name)
+            if slot is None:
+                return None
+            offset = self._slot_offset(slot[0])
+            _, _, width, height, bytes_per_line = SLOT_HEADER.unpack_from(self.mm, offset)
+            start = offset + SLOT_HEADER.size
+            data = self.mm[start:start + bytes_per_line * height]
+
+        # copy() detaches the image from the temporary bytes buffer
+        return QImage(data, width, height, bytes_per_line, QImage.Format_RGB32).copy()
+
+    def close(self):
+        """Flush the mapping to disk and release it."""
+        with self.lock:
+            if self.mm is not None:
+                self.mm.flush()
+                self.mm.close()
+                self.mm = None
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+            self.enabled = False
@@ -0,0 +1,68 @@
+try:
+    import numpy as np
+except ImportError:  # Falls back to comparing raw row bytes per tile
+    np = None
+
+TILE_SIZE = 16
+
+
+def _merge_row(changed, ty, tile, width, tile_height):
+    """Turn a row of changed-tile flags into (x, y, w, h) runs."""
+    rects = []
+    start = None
+    for index, is_changed in enumerate(list(changed) + [False]):
+        if is_changed and start is None:
+            start = index
+        elif not is_changed and start is not None:
+            x = start * tile
+            rects.append((x, ty, min(index * tile, width) - x, tile_height))
+            start = None
+    return rects
+
+
+def dirty_rects(previous, current, tile=TILE_SIZE):
+    """
+    Compare two same-sized RGB32 QImages tile by tile.
+
+    Returns a list of (x, y, w, h) rectangles covering the changed tiles,
+    with horizontally adjacent tiles merged, or None if the frames cannot be
+    compared (first frame, size or format change) and everything is dirty.
+    """
+    if (previous is None or current.depth() != 32 or previous.size() != current.size() or
+            previous.format() != current.format() or previous.bytesPerLine() != current.bytesPerLine()):
+        return None
+
+    width, height, stride = current.width(), current.height(), current.bytesPerLine()
+    nbytes = current.sizeInBytes()
+    prev_bits, cur_bits = previous.constBits(), current.constBits()
+    prev_bits.setsize(nbytes)
+    cur_bits.setsize(nbytes)
+
+    rects = []
+    if np is not None:
+        prev_px = np.frombuffer(prev_bits, dtype=np.uint32).reshape(height, stride // 4)[:, :width]
+        cur_px = np.frombuffer(cur_bits, dtype=np.uint32).reshape(height, stride // 4)[:, :width]
+        column_starts = np.arange(0, width, tile)
+        for ty in range(0, height, tile):
+            changed_columns = np.any(prev_px[ty:ty + tile] != cur_px[ty:ty + tile], axis=0)
+            changed = np.logical_or.reduceat(changed_columns, column_starts)
+            if changed.any():
+                rects.extend(_merge_row(changed, ty, tile, width, min(tile, height - ty)))
+        return rects
+
+    prev_bytes, cur_bytes = prev_bits.asstring(nbytes), cur_bits.asstring(nbytes)
+    tiles_across = (width + tile - 1) // tile
+    for ty in range(0, height, tile):
+        changed = [False] * tiles_across
+        for y in range(ty, min(ty + tile, height)):
+            row = y * stride
+            for tx in range(tiles_across):
+                if changed[tx]:
+                    continue
+                start = row + tx * tile * 4
+                end = row + min((tx + 1) * tile, width) * 4
+                if prev_bytes[start:end] != cur_bytes[start:end]:
+                    changed[tx] = True
+        if any(changed):
+            rects.extend(_merge_row(changed, ty, tile, width, min(tile, height - ty)))
+    return rects
@@ -0,0 +1,186 @@
+import base64
+import itertools
+import json
+import os
+import subprocess
+import sys
+import threading
+import logging
+from concurrent.futures import Future, TimeoutError as ResponseTimeout
+from utils.tool_helper import execute
+from utils.log_setup import log_fields
+
+HELPER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tool_helper.py")
+RESPONSE_GRACE = 5.0  # seconds on top of a request's own timeout
+DEFAULT_TIMEOUT = 10.0  # seconds for a request that does not set its own
+
+
+class HelperExited(subprocess.SubprocessError):
+    """The helper died with the request in flight; the tool may already have run."""
+
+
+def reap(process):
+    """Close a finished (or dying) child's pipes and collect its exit status."""
+    for stream in (process.stdin, process.stdout):
+        if stream is not None:
+            try:
+                stream.close()
+            except OSError:
+                pass
+    try:
+        process.wait(1)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+class ToolBroker:
+    """
+    Client for the resident tool helper (see tool_helper.py).
+
+    run() mirrors subprocess.run(capture_output=True) so call sites stay the
+    same. Requests are written to the helper's stdin without waiting for
+    earlier ones; a reader thread matches responses to futures by id. If the
+    helper cannot be started, calls fall back to a direct subprocess.run.
+
+    The helper is started lazily by the first caller and inherits that
+    thread's scheduling policy unless on_start adjusts it, so keep separate
+    brokers for capture and input work. env (e.g. another DISPLAY) applies to
+    the helper and everything it runs.
+    """
+
+    def __init__(self, enabled=True, name="tools", on_start=None, env=None):
+        self.enabled = enabled
+        self.name = name
+        self.on_start = on_start  # called with the helper pid, e.g. to set its priority
+        self.env = env
+        self.process = None
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.pending = {}  # request id -> Future
+        self.ids = itertools.count(1)
+
+    def _ensure_started(self):
+        """Start the helper if needed; return False if it is unavailable."""
+        if self.process is not None and self.process.poll() is None:
+            return True
+        try:
+            # -s skips user site-packages, -u keeps the pipes unbuffered
+            self.process = subprocess.Popen(
+                [sys.executable, "-s", "-u", HELPER_SCRIPT],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                text=True, bufsize=1, env=self.env,
+            )
+        except OSError as e:
+            logging.warning(f"Tool helper '{self.name}' could not start, using direct subprocess calls: {e}")
+            self.enabled = False
+            return False
+
+        if self.on_start is not None:
+            self.on_start(self.process.pid)
+
+        reader = threading.Thread(target=self._read_responses, args=(self.process,),
+                                  name=f"{self.name}-reader", daemon=True)
+        reader.start()
+        logging.debug(f"Started tool helper '{self.name}' (pid {self.process.pid})")
+        return True
+
+    def _read_responses(self, process):
+        for line in process.stdout:
+            try:
+                response = json.loads(line)
+            except ValueError:
+                continue
+            with self.lock:
+                future = self.pending.pop(response.get("id"), None)
+            if future is not None:
+                future.set_result(response)
+
+        # Helper exited - fail whatever is still outstanding
+        with self.lock:
+            if self.process is process:
+                self.process = None
+            pending, self.pending = self.pending, {}
+        for future in pending.values():
+            future.set_exception(HelperExited(f"tool helper '{self.name}' exited"))
+        reap(process)
+
+    def submit(self, argv, timeout=None, binary=False):
+        """Queue a tool invocation and return a Future with the raw response."""
+        future = Future()
+        with self.lock:
+            if not self.enabled or not self._ensure_started():
+                # Fork-per-call, as run() does, on a short-lived thread so callers still get a Future
+                request = {"id": None, "argv": argv, "timeout": timeout, "binary": binary}
+                threading.Thread(target=lambda: future.set_result(execute(request, self.env)),
+                                 name=f"{self.name}-direct", daemon=True).start()
+                return future
+            process = self.process
+            request_id = next(self.ids)
+            self.pending[request_id] = future
+
+        line = json.dumps({"id": request_id, "argv": argv, "timeout": timeout, "binary": binary}) + "\n"
+        # Writes are serialised separately so the reader thread never waits on a full pipe
+        with self.write_lock:
+            try:
+                process.stdin.write(line)
+            except (BrokenPipeError, OSError, ValueError) as e:
+                with self.lock:
+                    self.pending.pop(request_id, None)
+                future.set_exception(BrokenPipeError(str(e)))
+        return future
+
+    def _forget(self, future):
+        """Drop a request nobody waits for any more; its late response is ignored."""
+        with self.lock:
+            for request_id, pending in list(self.pending.items()):
+                if pending is future:
+                    del self.pending[request_id]
+
+    def run(self, argv, timeout=None, binary=False):
+        """
+        Run a tool and return a CompletedProcess, like subprocess.run.
+
+        Raises subprocess.TimeoutExpired after timeout (DEFAULT_TIMEOUT if
+        None), and HelperExited if the helper died mid-request. Only a
+        request that never reached the helper is re-run directly, so an
+        activation or jiggle never fires twice.
+        """
+        if timeout is None:
+            timeout = DEFAULT_TIMEOUT
+        if self.enabled:
+            future = self.submit(argv, timeout, binary)
+            try:
+                response = future.result(timeout + RESPONSE_GRACE)
+            except ResponseTimeout:
+                self._forget(future)
+                raise subprocess.TimeoutExpired(argv, timeout)
+            except BrokenPipeError as e:  # The write failed; the helper never saw the request
+                logging.debug("Tool helper failed, running the tool directly",
+                              extra=log_fields(stage=self.name, tool=argv[0], error=e))
+            else:
+                error = response.get("error")
+                if error == "not_found":
+                    raise FileNotFoundError(response.get("message", argv[0]))
+                if error == "timeout":
+                    raise subprocess.TimeoutExpired(argv, timeout)
+                if error is None:
+                    stdout = response["stdout"]
+                    if binary:
+                        stdout = base64.b64decode(stdout)
+                    return subprocess.CompletedProcess(argv, response["returncode"], stdout, response["stderr"])
+                logging.debug("Tool helper could not run the tool",
+                              extra=log_fields(stage=self.name, tool=argv[0], error=response.get("message")))
+
+        return subprocess.run(argv, capture_output=True, text=not binary, timeout=timeout, env=self.env)
+
+    def close(self):
+        """Close the helper's stdin so it exits once running requests finish (the reader reaps it)."""
+        with self.lock:
+            if self.process is not None and self.process.poll() is None:
+                try:
+                    self.process.stdin.close()
+                except OSError:
+                    pass
+            self.process = None
+
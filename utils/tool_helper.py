@@ -0,0 +1,63 @@
+"""
+Resident helper process that runs external tools (wmctrl, kdotool, xdotool,
+maim, ...) for EVE-L Preview.
+
+It is started once with a bare interpreter and never imports Qt, so each
+fork/exec happens from a small process instead of the large GUI one.
+Requests and responses are JSON lines; responses may arrive out of order and
+are matched to requests by their "id".
+"""
+import base64
+import json
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_WORKERS = 4
+
+write_lock = threading.Lock()
+
+
+def respond(response):
+    with write_lock:
+        sys.stdout.write(json.dumps(response) + "\n")
+        sys.stdout.flush()
+
+
+def execute(request, env=None):
+    """Run one request and return its response; also used in-process when the helper is disabled."""
+    response = {"id": request["id"]}
+    try:
+        result = subprocess.run(request["argv"], capture_output=True, timeout=request.get("timeout"), env=env)
+        response["returncode"] = result.returncode
+        if request.get("binary"):
+            response["stdout"] = base64.b64encode(result.stdout).decode("ascii")
+        else:
+            response["stdout"] = result.stdout.decode("utf-8", "replace")
+        response["stderr"] = result.stderr.decode("utf-8", "replace")
+    except FileNotFoundError as e:
+        response["error"] = "not_found"
+        response["message"] = str(e)
+    except subprocess.TimeoutExpired:
+        response["error"] = "timeout"
+    except Exception as e:
+        response["error"] = "failed"
+        response["message"] = str(e)
+    return response
+
+
+def run_request(request):
+    respond(execute(request))
+
+
+def main():
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        # Exits when the parent closes stdin (or dies)
+        for line in sys.stdin:
+            if line.strip():
+                pool.submit(run_request, json.loads(line))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import json
+import os
+import threading
+import time
+import logging
+from collections import deque
+from contextlib import nullcontext
+from utils.config import CONFIG_FOLDER
+from utils.profiler import thread_names
+
+TRACE_FOLDER = os.path.join(CONFIG_FOLDER, "traces")
+NULL_SPAN = nullcontext()
+
+
+class Span:
+    __slots__ = ("tracer", "name", "category", "args", "start")
+
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.record(self.name, self.category, self.start, time.perf_counter_ns(), self.args)
+
+
+class Tracer:
+    """
+    Spans of the capture, delivery, paint and focus pipeline in a ring buffer.
+
+    Recording a span is two clock reads and a deque append (atomic under
+    the GIL, so no lock on the hot path); the oldest events fall out once
+    the buffer is full. export() writes Chrome trace-event JSON that
+    Perfetto (ui.perfetto.dev) and chrome://tracing open directly.
+    """
+
+    def __init__(self, capacity=50000):
+        self.enabled = False
+        self.events = deque(maxlen=capacity)  # (name, category, start ns, duration ns, native tid, args)
+
+    def configure(self, config):
+        settings = config["settings"].get("tracing", {})
+        self.enabled = settings.get("enabled", True)
+        capacity = settings.get("buffer_events", 50000)
+        if capacity != self.events.maxlen:
+            self.events = deque(self.events, maxlen=capacity)
+
+    def span(self, name, category="app", **args):
+        """Context manager timing the block; costs one shared no-op while tracing is off."""
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, category, args or None)
+
+    def record(self, name, category, start_ns, end_ns, args=None):
+        """Add a span from explicit perf_counter_ns timestamps (e.g. taken on another thread)."""
+        if self.enabled:
+            self.events.append((name, category, start_ns, end_ns - start_ns, threading.get_native_id(), args))
+
+    def export(self, path, last_seconds=None):
+        """Write the buffered spans (only those ending in the last N seconds, if given) as Chrome trace JSON."""
+        now = time.perf_counter_ns()
+        cutoff = now - int(last_seconds * 1e9) if last_seconds else 0
+        pid = os.getpid()
+        # Map perf_counter onto the wall clock so traces from two sessions line up by time of day
+        offset_us = time.time() * 1e6 - now / 1000
+        trace = []
+        tids = set()
+        for name, category, start, duration, tid, args in list(self.events):
+            if start + duration < cutoff:
+                continue
+            event = {"name": name, "cat": category, "ph": "X", "pid": pid, "tid": tid,
+                     "ts": start / 1000 + offset_us, "dur": duration / 1000}
+            if args:
+                event["args"] = {key: value if isinstance(value, (int, float, bool)) else str(value)
+                                 for key, value in args.items()}
+            trace.append(event)
+            tids.add(tid)
+        names = {native_id: name for name, native_id in thread_names().values() if native_id is not None}
+        for tid in tids:
+            trace.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                          "args": {"name": names.get(tid, f"thread {tid}")}})
+        trace.append({"name": "process_name", "ph": "M", "pid": pid, "args": {"name": "EVE-L Preview"}})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f)
+        return len(trace)
+
+    def save_recent(self, seconds=30):
+        """Export the last seconds into TRACE_FOLDER; returns the file path."""
+        os.makedirs(TRACE_FOLDER, exist_ok=True)
+        path = os.path.join(TRACE_FOLDER, time.strftime("trace-%Y%m%d-%H%M%S.json"))
+        count = self.export(path, seconds)
+        logging.info(f"Trace of the last {seconds} s written to {path} ({count} events)")
+        return path
+
+
+tracer = Tracer()  # Process-wide; configured from main
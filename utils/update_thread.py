@@ -1,45 +1,190 @@
 from PyQt5.QtCore import QThread, pyqtSignal, Qt
-from PyQt5.QtGui import QPixmap
+from PyQt5.QtGui import QImage
+from PyQt5 import sip
 from Xlib.error import BadDrawable
+from utils.capture_backends import WindowHidden
+from utils.frame_analysis import FrameAnalyzer
+from utils.profiler import name_current_thread
+from utils.tracing import tracer
+from utils.log_setup import log_fields
+from utils.tile_diff import dirty_rects
 import logging
+import threading
+import time
 
 class UpdateThread(QThread):
-    updated = pyqtSignal(QPixmap, int, int)
+    # Frames travel as QImages; only the GUI thread may create pixmaps
+    updated = pyqtSignal(QImage, int, int, object, object)  # dirty rects (None: full repaint), emit time (ns)
+    zoomed = pyqtSignal(QImage)
+    alerted = pyqtSignal(list)  # ROI names in alert; empty list when they clear
     error_occurred = pyqtSignal()
 
-    def __init__(self, x11_interface, window_id, window_title, interval=1000):
+    def __init__(self, x11_interface, window_id, window_title, interval=1000, thumbnail_cache=None, character_name=None,
+                 resource_monitor=None, frame_sinks=()):
         super().__init__()
         self.x11_interface = x11_interface
         self.window_id = window_id
         self.window_title = window_title
         self.interval = interval
+        self.thumbnail_cache = thumbnail_cache
+        self.character_name = character_name
+        self.resource_monitor = resource_monitor
+        self.frame_sinks = frame_sinks  # Get every changed thumbnail (stream server, frame export)
+        self.zoom_scale = None  # Percent scale while hovered, None otherwise
+        self.zoom_interval = interval
+        self.boost = 1.0  # Interval factor while this client is a likely next focus target
+        self.wake = threading.Event()
+        self.analyzer = FrameAnalyzer(x11_interface.config, character_name)
+        self.active_alerts = []
+        self.previous_image = None
+        self.frame_memory = x11_interface.frame_memory
+        self.paused = False  # Parked: no captures until rebound
+        self.stopped = False
+        self.generation = 0  # Bumped on rebind so frames of the old window are dropped
+
+    def set_zoom(self, scale, interval=None):
+        """Capture at a larger scale and faster rate (scale=None to stop) and wake the thread."""
+        self.zoom_scale = scale
+        if interval is not None:
+            self.zoom_interval = interval
+        self.wake.set()
+
+    def pause(self):
+        """Stop capturing (the preview is parked) but keep the thread alive."""
+        self.paused = True
+        self.wake.set()
+
+    def rebind(self, window_id, window_title, character_name):
+        """Point the thread at a (new) client window and resume capturing."""
+        self.generation += 1
+        self.window_id = window_id
+        self.window_title = window_title
+        if character_name != self.character_name:
+            self.character_name = character_name
+            self.analyzer = FrameAnalyzer(self.x11_interface.config, character_name)
+            self.active_alerts = []
+        self.previous_image = None  # Next frame is a full repaint
+        self.paused = False
+        self.wake.set()
+
+    def stop(self):
+        """End the thread for good; used when a parked preview is disposed of."""
+        self.stopped = True
+        self.wake.set()
+
+    def delete_when_finished(self):
+        """Let Qt delete this thread once run() returns; for a disposed preview whose capture is still running."""
+        sip.transferto(self, None)
+        self.finished.connect(self.deleteLater)
+
+    def set_interval(self, interval):
+        """Change the normal capture interval and apply it right away."""
+        if interval != self.interval:
+            self.interval = interval
+            self.wake.set()
+
+    def set_boost(self, factor):
+        """Scale the normal capture interval (below 1.0 captures faster); 1.0 ends the boost."""
+        if factor != self.boost:
+            self.boost = factor
+            self.wake.set()
+
+    def sleep_interval(self):
+        """Milliseconds until the next capture."""
+        if self.zoom_scale is not None:
+            return self.zoom_interval
+        interval = int(self.interval * self.boost)
+        if self.resource_monitor is not None:
+            return self.resource_monitor.get_capture_interval(interval)
+        return interval
 
     def run(self):
-        while True:
-            try:
-                # Only log if debug level is enabled to reduce overhead
-                if logging.getLogger().isEnabledFor(logging.DEBUG):
-                    logging.debug(f"Updating preview for window: {self.window_id}")
-                
-                image, original_width, original_height = self.x11_interface.capture_window(int(self.window_id, 16))
-                
-                # Skip if image capture failed
-                if image is None:
-                    logging.warning(f"Skipping update: Window {self.window_id} capture failed.")
-                    self.error_occurred.emit()
-                    break
-
-                # Convert to pixmap without drawing character name
-                pixmap = QPixmap.fromImage(image)
-
-                self.updated.emit(pixmap, original_width, original_height)
-
-            except BadDrawable:
-                logging.error(f"BadDrawable error for window {self.window_id}. Stopping thread.")
+        name_current_thread("capture")
+        # Capture must never compete with the game clients; maim children inherit this
+        if self.resource_monitor is not None:
+            self.resource_monitor.apply_capture_policy()
+
+        while not self.stopped:
+            if self.paused:
+                self.wake.wait()
+                self.wake.clear()
+                continue
+
+            if self.capture_step():
+                self.wake.wait(self.sleep_interval() / 1000)
+                self.wake.clear()
+
+        # Per-thread X connections and shm segments would otherwise outlive the thread
+        self.x11_interface.release_capture_thread()
+
+    def capture_step(self):
+        """One capture and everything done with the frame; False if the next step should not wait."""
+        generation = self.generation
+        try:
+            logging.debug("Updating preview", extra=log_fields(window=self.window_id, character=self.character_name,
+                                                               stage="capture"))
+            
+            zoom_scale = self.zoom_scale
+            with tracer.span("capture", "capture", window=self.window_id, character=self.character_name):
+                image, original_width, original_height = self.x11_interface.capture_window(
+                    int(self.window_id, 16), zoom_scale)
+            
+            # Skip if image capture failed
+            if image is None:
+                logging.warning("Pausing updates: capture failed",
+                                extra=log_fields(window=self.window_id, character=self.character_name))
+                self.paused = True
                 self.error_occurred.emit()
-                break
+                return False
+
+            if generation != self.generation:
+                return False  # Rebound while capturing; this frame belongs to the old window
+
+            if zoom_scale is not None:
+                self.zoomed.emit(image)
+                # Derive the normal thumbnail from the zoomed frame instead of capturing twice
+                with tracer.span("rescale", "capture"):
+                    image = self.x11_interface.rescale(image, zoom_scale)
+                original_width, original_height = image.width(), image.height()
+
+            # Only signal the GUI when the set of alerts changes
+            try:
+                with tracer.span("analyze", "capture"):
+                    alerts = self.analyzer.analyze(image)
+            except Exception as e:  # Never let alerts cost the frame itself
+                logging.error(f"Alert analysis failed for {self.window_id}: {e}")
+                alerts = self.active_alerts
+            if alerts != self.active_alerts:
+                self.active_alerts = alerts
+                self.alerted.emit(alerts)
+
+            # Keep the on-disk cache warm for the next start (rate limited inside)
+            if self.thumbnail_cache is not None and self.character_name:
+                self.thumbnail_cache.store(self.character_name, image)
+
+            # Only the tiles that changed since the last frame get repainted
+            dirty = dirty_rects(self.previous_image, image)
+            self.previous_image = image
+            if dirty != []:
+                with tracer.span("publish", "capture", sinks=len(self.frame_sinks)):
+                    for sink in self.frame_sinks:
+                        sink.publish(self.character_name, image, dirty)
+                # Store in the compact format configured for this character
+                stored = self.frame_memory.to_storage(image, self.character_name)
+                # The slot traces the delivery from this timestamp to its own start
+                self.updated.emit(stored, original_width, original_height, dirty, time.perf_counter_ns())
+
+        except BadDrawable:
+            logging.error(f"BadDrawable error for window {self.window_id}. Pausing until rebound.")
+            self.paused = True
+            self.error_occurred.emit()
+            return False
+
+        except WindowHidden:
+            pass  # Keep showing the last frame until the window is on screen again
+
+        except Exception as e:
+            logging.error(f"Error updating preview for {self.window_id}: {e}")
+        return True
 
-            except Exception as e:
-                logging.error(f"Error updating preview for {self.window_id}: {e}")
 
-            self.msleep(self.interval)
@@ -0,0 +1,558 @@
+import os
+import mmap
+import json
+import array
+import socket
+import struct
+import select
+import threading
+import logging
+from PyQt5.QtGui import QImage
+from PyQt5 import sip
+from utils.capture_backends import scale_image, WindowGone, WindowHidden, BackendUnavailable
+
+# Event signatures of the interfaces we use: opcode -> (name, argument types)
+# i int, u uint, s string, o object, n new_id, a array
+EVENTS = {
+    "wl_display": {0: ("error", "ous"), 1: ("delete_id", "u")},
+    "wl_registry": {0: ("global", "usu"), 1: ("global_remove", "u")},
+    "wl_callback": {0: ("done", "u")},
+    "wl_shm": {0: ("format", "u")},
+    "wl_buffer": {0: ("release", "")},
+    "wl_output": {0: ("geometry", "iiiiissi"), 1: ("mode", "uiii"), 2: ("done", ""), 3: ("scale", "i"),
+                  4: ("name", "s"), 5: ("description", "s")},
+    "wl_seat": {0: ("capabilities", "u"), 1: ("name", "s")},
+    "zwlr_screencopy_frame_v1": {0: ("buffer", "uuuu"), 1: ("flags", "u"), 2: ("ready", "uuu"),
+                                 3: ("failed", ""), 4: ("damage", "uuuu"), 5: ("linux_dmabuf", "uuu"),
+                                 6: ("buffer_done", "")},
+    "zwlr_foreign_toplevel_manager_v1": {0: ("toplevel", "n"), 1: ("finished", "")},
+    "zwlr_foreign_toplevel_handle_v1": {0: ("title", "s"), 1: ("app_id", "s"), 2: ("output_enter", "o"),
+                                        3: ("output_leave", "o"), 4: ("state", "a"), 5: ("done", ""),
+                                        6: ("closed", ""), 7: ("parent", "o")},
+}
+NEW_ID_INTERFACES = {("zwlr_foreign_toplevel_manager_v1", "toplevel"): "zwlr_foreign_toplevel_handle_v1"}
+BIND_VERSIONS = {  # Highest version we speak
+    "wl_shm": 1, "wl_output": 4, "wl_seat": 1,
+    "zwlr_screencopy_manager_v1": 3, "zwlr_foreign_toplevel_manager_v1": 3,
+}
+TOPLEVEL_ACTIVATED = 2  # zwlr_foreign_toplevel_handle_v1.state value
+SCREENCOPY_Y_INVERT = 1
+SHM_FORMATS = {0: QImage.Format_ARGB32, 1: QImage.Format_RGB32}  # argb8888 / xrgb8888, little endian
+MAX_BUFFERS = 8  # Cached shm buffers, one per distinct capture size
+ROUND_TRIP_TIMEOUT = 2.0  # Seconds to wait for the compositor before giving up on a request
+
+
+def _pad(length):
+    return (length + 3) & ~3
+
+
+class WaylandError(Exception):
+    """A protocol error or a lost connection."""
+
+
+class WaylandObject:
+    """A proxy for one protocol object; events call on_<name> methods."""
+
+    def __init__(self, connection, object_id, interface):
+        self.connection = connection
+        self.id = object_id
+        self.interface = interface
+
+    def request(self, opcode, *args, fd=None):
+        self.connection.send(self.id, opcode, args, fd)
+
+
+class WaylandConnection:
+    """
+    Minimal client side of the Wayland wire protocol over the compositor's
+    unix socket: message framing, object ids and fd passing. Not thread
+    safe; WaylandClient serializes all access.
+    """
+
+    def __init__(self):
+        runtime_dir = os.environ.get("XDG_RUNTIME_DIR", "")
+        name = os.environ.get("WAYLAND_DISPLAY", "wayland-0")
+        path = name if os.path.isabs(name) else os.path.join(runtime_dir, name)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.sock.connect(path)
+        except OSError as e:
+            self.sock.close()
+            raise BackendUnavailable(f"cannot connect to Wayland display {path}: {e}")
+        self.objects = {}
+        self.free_ids = []
+        self.next_id = 2
+        self.inbuf = b""
+        self.display = self.register(WaylandObject(self, 1, "wl_display"))
+        self.display.on_error = self._on_error
+        self.display.on_delete_id = self._on_delete_id
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def register(self, obj):
+        self.objects[obj.id] = obj
+        return obj
+
+    def new_object(self, cls, interface, *args):
+        object_id = self.free_ids.pop() if self.free_ids else self.next_id
+        if object_id == self.next_id:
+            self.next_id += 1
+        return self.register(cls(self, object_id, interface, *args))
+
+    def _on_error(self, obj, code, message):
+        interface = obj.interface if obj is not None else "unknown object"
+        raise WaylandError(f"protocol error on {interface} (code {code}): {message}")
+
+    def _on_delete_id(self, object_id):
+        self.objects.pop(object_id, None)
+        if object_id < 0xff000000:
+            self.free_ids.append(object_id)
+
+    def send(self, object_id, opcode, args, fd=None):
+        payload = b""
+        for arg in args:
+            if isinstance(arg, str):
+                data = arg.encode() + b"\0"
+                payload += struct.pack("<I", len(data)) + data + b"\0" * (_pad(len(data)) - len(data))
+            elif isinstance(arg, WaylandObject):
+                payload += struct.pack("<I", arg.id)
+            elif arg < 0:
+                payload += struct.pack("<i", arg)
+            else:
+                payload += struct.pack("<I", arg)
+        header = struct.pack("<II", object_id, (8 + len(payload)) << 16 | opcode)
+        ancillary = [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array("i", [fd]))] if fd is not None else []
+        self.sock.sendmsg([header + payload], ancillary)
+
+    def sync(self):
+        """Round trip: dispatch until the compositor has handled everything sent so far."""
+        callback = self.new_object(WaylandObject, "wl_callback")
+        done = []
+        callback.on_done = lambda serial: done.append(serial)
+        self.display.request(0, callback)
+        while not done:
+            if not self.read_events(timeout=ROUND_TRIP_TIMEOUT):
+                raise WaylandError("compositor did not answer a sync request")
+
+    def read_events(self, timeout=None):
+        """Block until data arrives (or timeout seconds pass), then dispatch complete messages."""
+        if timeout is not None and not select.select([self.sock], [], [], timeout)[0]:
+            return False
+        data = self.sock.recv(65536)
+        if not data:
+            raise WaylandError("compositor closed the connection")
+        self.inbuf += data
+        self.dispatch_pending()
+        return True
+
+    def dispatch_pending(self):
+        while len(self.inbuf) >= 8:
+            object_id, word = struct.unpack_from("<II", self.inbuf)
+            size, opcode = word >> 16, word & 0xffff
+            if len(self.inbuf) < size:
+                return
+            body, self.inbuf = self.inbuf[8:size], self.inbuf[size:]
+            obj = self.objects.get(object_id)
+            if obj is None:
+                continue  # Event for an object we already destroyed
+            name, signature = EVENTS.get(obj.interface, {}).get(opcode, (None, ""))
+            if name is None:
+                continue
+            args = self._unpack(signature, body)
+            args = [self.objects.get(arg) if kind == "o" else arg for kind, arg in zip(signature, args)]
+            if signature == "n":
+                interface = NEW_ID_INTERFACES[(obj.interface, name)]
+                args = [self.register(WaylandObject(self, args[0], interface))]
+            handler = getattr(obj, f"on_{name}", None)
+            if handler is not None:
+                handler(*args)
+
+    @staticmethod
+    def _unpack(signature, body):
+        args, offset = [], 0
+        for kind in signature:
+            if kind == "i":
+                args.append(struct.unpack_from("<i", body, offset)[0])
+                offset += 4
+            elif kind in "uon":
+                args.append(struct.unpack_from("<I", body, offset)[0])
+                offset += 4
+            else:  # s, a
+                length = struct.unpack_from("<I", body, offset)[0]
+                data = body[offset + 4:offset + 4 + length]
+                args.append(data[:-1].decode(errors="replace") if kind == "s" and length else
+                            "" if kind == "s" else data)
+                offset += 4 + _pad(length)
+        return args
+
+    def close(self):
+        self.sock.close()
+
+
+class Output(WaylandObject):
+    def __init__(self, connection, object_id, interface):
+        super().__init__(connection, object_id, interface)
+        self.name = None
+        self.scale = 1
+        self.mode_size = (0, 0)
+
+    def on_name(self, name):
+        self.name = name
+
+    def on_scale(self, scale):
+        self.scale = scale
+
+    def on_mode(self, flags, width, height, refresh):
+        if flags & 1:  # Current mode
+            self.mode_size = (width, height)
+
+
+class Toplevel:
+    """State of one foreign-toplevel handle, applied atomically on its done event."""
+
+    def __init__(self, handle, window_id):
+        self.handle = handle
+        self.window_id = window_id  # Our own id; handle ids are reused by the compositor
+        self.title = ""
+        self.app_id = ""
+        self.outputs = []
+        self.activated = False
+        self.closed = False
+
+
+class SwayIPC:
+    """Window geometry from sway's IPC socket; foreign-toplevel does not carry positions."""
+
+    MAGIC = b"i3-ipc"
+    GET_TREE, SUBSCRIBE, GET_OUTPUTS = 4, 2, 3
+
+    def __init__(self, path):
+        self.path = path
+        self.sock = self._connect()
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(self.path)
+        return sock
+
+    @classmethod
+    def send(cls, sock, message_type, payload=b""):
+        sock.sendall(cls.MAGIC + struct.pack("<II", len(payload), message_type) + payload)
+
+    @classmethod
+    def receive(cls, sock):
+        header = cls._read(sock, 14)
+        length, message_type = struct.unpack("<II", header[6:])
+        return message_type, json.loads(cls._read(sock, length))
+
+    @staticmethod
+    def _read(sock, size):
+        data = b""
+        while len(data) < size:
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                raise WaylandError("sway IPC connection closed")
+            data += chunk
+        return data
+
+    def query(self, message_type):
+        self.send(self.sock, message_type)
+        return self.receive(self.sock)[1]
+
+    def subscribe(self, events):
+        """A second connection that receives the given events; read it with receive()."""
+        sock = self._connect()
+        self.send(sock, self.SUBSCRIBE, json.dumps(events).encode())
+        self.receive(sock)
+        return sock
+
+    def window_rects(self):
+        """{title: (output name, x, y, width, height, visible)} with output-local logical coordinates."""
+        rects = {}
+
+        def walk(node, output):
+            if node.get("type") == "output":
+                output = node
+            if node.get("pid") and node.get("name") and output is not None:
+                rect, inner = node["rect"], node["window_rect"]
+                rects.setdefault(node["name"], (
+                    output["name"], rect["x"] + inner["x"] - output["rect"]["x"],
+                    rect["y"] + inner["y"] - output["rect"]["y"], inner["width"], inner["height"],
+                    bool(node.get("visible", True))))
+            for child in node.get("nodes", []) + node.get("floating_nodes", []):
+                walk(child, output)
+
+        walk(self.query(self.GET_TREE), None)
+        return rects
+
+    def close(self):
+        self.sock.close()
+
+
+class WaylandClient(threading.Thread):
+    """
+    One persistent Wayland connection shared by every capture thread.
+
+    Toplevels are tracked from wlr-foreign-toplevel events as they happen
+    (no polling); captures use wlr-screencopy capture_output_region on the
+    window's area into a reused shm buffer. A background thread dispatches
+    events while nobody is capturing; captures dispatch their own events
+    under the same lock.
+    """
+
+    POLL_TIMEOUT = 0.5
+
+    def __init__(self):
+        super().__init__(name="wayland", daemon=True)
+        self.lock = threading.RLock()  # The connection; captures hold it for a whole round trip
+        self.toplevel_lock = threading.Lock()  # Just the toplevel snapshot, so listing never waits on a capture
+        self.stopped = False
+        self.connection = WaylandConnection()
+        self.globals = {}  # interface -> (name, version) of its first global
+        self.output_globals = []  # (name, version) of every wl_output
+        self.outputs = []
+        self.toplevels = {}  # window id -> Toplevel
+        self.handles = {}  # handle object id -> Toplevel
+        self.next_window_id = 1
+        self.buffers = {}  # (width, height, stride, format) -> (buffer, mmap, fd)
+        self.geometry = {}
+        self.geometry_dirty = True
+
+        registry = self.connection.new_object(WaylandObject, "wl_registry")
+        registry.on_global = self._on_global
+        self.connection.display.request(1, registry)
+        self.connection.sync()
+
+        missing = [name for name in ("wl_shm", "zwlr_screencopy_manager_v1", "zwlr_foreign_toplevel_manager_v1")
+                   if name not in self.globals]
+        if missing:
+            self.connection.close()
+            raise BackendUnavailable(f"compositor lacks {', '.join(missing)}")
+
+        self.shm = self._bind(registry, "wl_shm")
+        self.screencopy = self._bind(registry, "zwlr_screencopy_manager_v1")
+        self.screencopy_version = self.screencopy.version
+        self.seat = self._bind(registry, "wl_seat") if "wl_seat" in self.globals else None
+        for name, version in self.output_globals:
+            self.outputs.append(self._bind(registry, "wl_output", cls=Output, name=name, version=version))
+        manager = self._bind(registry, "zwlr_foreign_toplevel_manager_v1")
+        manager.on_toplevel = self._on_toplevel
+        self.connection.sync()
+        self.connection.sync()  # Toplevel events sent in reply to the bind
+
+        swaysock = os.environ.get("SWAYSOCK")
+        self.sway = None
+        self.sway_events = None
+        if swaysock:
+            try:
+                self.sway = SwayIPC(swaysock)
+                self.sway_events = self.sway.subscribe(["window", "output", "workspace"])
+            except (OSError, WaylandError) as e:
+                logging.warning(f"sway IPC unavailable, capturing whole outputs: {e}")
+                self.sway = None
+        logging.info(f"Wayland connection up: {len(self.outputs)} outputs, {len(self.toplevels)} toplevels, "
+                     f"screencopy v{self.screencopy_version}, geometry from {'sway IPC' if self.sway else 'outputs'}")
+
+    def _on_global(self, name, interface, version):
+        if interface == "wl_output":
+            self.output_globals.append((name, version))
+        self.globals.setdefault(interface, (name, version))
+
+    def _bind(self, registry, interface, cls=WaylandObject, name=None, version=None):
+        global_name, global_version = self.globals[interface]
+        name = global_name if name is None else name
+        version = min(global_version if version is None else version, BIND_VERSIONS[interface])
+        obj = self.connection.new_object(cls, interface)
+        obj.version = version
+        registry.request(0, name, interface, version, obj)
+        return obj
+
+    # ---------------- toplevel tracking --------------------------------
+    def _on_toplevel(self, handle):
+        toplevel = Toplevel(handle, self.next_window_id)
+        self.next_window_id += 1
+        pending = {"title": None, "app_id": None, "state": None}
+
+        def on_title(title):
+            pending["title"] = title
+
+        def on_app_id(app_id):
+            pending["app_id"] = app_id
+
+        def on_state(data):
+            pending["state"] = TOPLEVEL_ACTIVATED in struct.unpack(f"<{len(data) // 4}I", data)
+
+        def on_done():
+            with self.toplevel_lock:
+                if pending["title"] is not None:
+                    toplevel.title = pending["title"]
+                if pending["app_id"] is not None:
+                    toplevel.app_id = pending["app_id"]
+                if pending["state"] is not None:
+                    toplevel.activated = pending["state"]
+                self.toplevels[toplevel.window_id] = toplevel
+            if pending["title"] is not None:
+                self.geometry_dirty = True
+            pending.update(title=None, app_id=None, state=None)
+
+        def on_closed():
+            with self.toplevel_lock:
+                toplevel.closed = True
+                self.toplevels.pop(toplevel.window_id, None)
+            self.handles.pop(handle.id, None)
+            handle.request(7)  # destroy
+
+        handle.on_title, handle.on_app_id, handle.on_state = on_title, on_app_id, on_state
+        handle.on_done, handle.on_closed = on_done, on_closed
+        handle.on_output_enter = lambda output: toplevel.outputs.append(output)
+        handle.on_output_leave = lambda output: output in toplevel.outputs and toplevel.outputs.remove(output)
+        self.handles[handle.id] = toplevel
+
+    def list_toplevels(self):
+        with self.toplevel_lock:
+            return [(toplevel.window_id, toplevel.title) for toplevel in self.toplevels.values()]
+
+    def active_toplevel(self):
+        with self.toplevel_lock:
+            return next((toplevel for toplevel in self.toplevels.values() if toplevel.activated), None)
+
+    def activate(self, window_id):
+        with self.toplevel_lock:
+            toplevel = self.toplevels.get(window_id)
+        if toplevel is None or self.seat is None:
+            return False
+        with self.lock:
+            toplevel.handle.request(4, self.seat)  # activate(seat)
+            return True
+
+    # ---------------- capture ------------------------------------------
+    def _region(self, toplevel):
+        """(wl_output, x, y, width, height) to capture for a toplevel."""
+        if self.sway is not None:
+            if self.geometry_dirty:
+                self.geometry = self.sway.window_rects()
+                self.geometry_dirty = False
+            rect = self.geometry.get(toplevel.title)
+            if rect is not None and not rect[5]:
+                # Covered, or on a workspace that is not shown: the region holds someone else's pixels
+                raise WindowHidden(f"toplevel {toplevel.window_id} is not visible")
+            if rect is not None:
+                output = next((output for output in self.outputs if output.name == rect[0]), None)
+                if output is not None and rect[3] > 0 and rect[4] > 0:
+                    return (output,) + rect[1:5]
+        # No geometry: the whole output the window is on
+        output = toplevel.outputs[0] if toplevel.outputs else (self.outputs[0] if self.outputs else None)
+        if output is None:
+            return None
+        width, height = output.mode_size
+        return output, 0, 0, width // output.scale, height // output.scale
+
+    def _buffer(self, width, height, stride, shm_format):
+        key = (width, height, stride, shm_format)
+        entry = self.buffers.get(key)
+        if entry is not None:
+            return entry
+        if len(self.buffers) >= MAX_BUFFERS:
+            old_buffer, old_map, old_fd = self.buffers.pop(next(iter(self.buffers)))
+            old_buffer.request(0)  # destroy
+            old_map.close()
+            os.close(old_fd)
+        size = stride * height
+        fd = os.memfd_create("eve-l-preview-screencopy", os.MFD_CLOEXEC)
+        os.ftruncate(fd, size)
+        data = mmap.mmap(fd, size)
+        pool = self.connection.new_object(WaylandObject, "wl_shm_pool")
+        self.shm.request(0, pool, size, fd=fd)  # create_pool(id, fd, size)
+        buffer = self.connection.new_object(WaylandObject, "wl_buffer")
+        pool.request(0, buffer, 0, width, height, stride, shm_format)  # create_buffer
+        pool.request(1)  # The buffer keeps the memory alive
+        entry = self.buffers[key] = (buffer, data, fd)
+        return entry
+
+    def capture(self, window_id, scale=None):
+        """Screencopy a toplevel's area; returns (image, width, height) like the X11 backends."""
+        with self.toplevel_lock:
+            toplevel = self.toplevels.get(window_id)
+        if toplevel is None:
+            raise WindowGone(f"no toplevel {window_id}")
+        with self.lock:
+            region = self._region(toplevel)
+            if region is None:
+                return None
+            output, x, y, width, height = region
+
+            frame = self.connection.new_object(WaylandObject, "zwlr_screencopy_frame_v1")
+            state = {"buffer": None, "ready": False, "failed": False, "flags": 0, "buffer_done": False}
+
+            def on_buffer(shm_format, w, h, stride):
+                if state["buffer"] is None and shm_format in SHM_FORMATS:
+                    state["buffer"] = (w, h, stride, shm_format)
+
+            frame.on_buffer = on_buffer
+            frame.on_flags = lambda flags: state.update(flags=flags)
+            frame.on_buffer_done = lambda: state.update(buffer_done=True)
+            frame.on_ready = lambda *_: state.update(ready=True)
+            frame.on_failed = lambda: state.update(failed=True)
+            self.screencopy.request(1, frame, 0, output, x, y, width, height)  # capture_output_region
+
+            # v3 lists every buffer type first; older versions copy on the first shm buffer event
+            self._wait(lambda: state["failed"] or (state["buffer_done"] if self.screencopy_version >= 3
+                                                   else state["buffer"] is not None))
+            if state["failed"] or state["buffer"] is None:
+                frame.request(1)  # destroy
+                return None
+            buffer, data, _ = self._buffer(*state["buffer"])
+            frame.request(0, buffer)  # copy
+            self._wait(lambda: state["ready"] or state["failed"])
+            frame.request(1)
+            if state["failed"]:
+                return None
+
+            w, h, stride, shm_format = state["buffer"]
+            image = QImage(sip.voidptr(data), w, h, stride, SHM_FORMATS[shm_format])
+            if state["flags"] & SCREENCOPY_Y_INVERT:
+                image = image.mirrored(False, True)
+            # scale_image copies out of the shm buffer before it is reused
+            return scale_image(image, scale), w, h
+
+    def _wait(self, condition):
+        """Dispatch events until condition() holds; called with the lock held."""
+        while not condition():
+            if not self.connection.read_events(timeout=ROUND_TRIP_TIMEOUT):
+                raise WaylandError("screencopy timed out")
+
+    # ---------------- event loop ---------------------------------------
+    def run(self):
+        while not self.stopped:
+            sources = [self.connection.sock] + ([self.sway_events] if self.sway_events else [])
+            try:
+                readable = select.select(sources, [], [], self.POLL_TIMEOUT)[0]
+            except (OSError, ValueError):
+                break
+            try:
+                if self.sway_events in readable:
+                    SwayIPC.receive(self.sway_events)
+                    self.geometry_dirty = True  # Re-read the tree on the next capture
+                if self.connection.sock in readable:
+                    with self.lock:
+                        # A capture may have consumed the data meanwhile; don't block on an empty socket
+                        self.connection.read_events(timeout=0)
+            except (OSError, WaylandError) as e:
+                if not self.stopped:
+                    logging.error(f"Wayland connection lost: {e}")
+                break
+
+    def close(self):
+        self.stopped = True
+        self.join(self.POLL_TIMEOUT * 2)
+        with self.lock:
+            for buffer, data, fd in self.buffers.values():
+                data.close()
+                os.close(fd)
+            self.buffers = {}
+            self.connection.close()
+        if self.sway is not None:
+            self.sway.close()
+        if self.sway_events is not None:
+            self.sway_events.close()
@@ -0,0 +1,70 @@
+import time
+import logging
+from utils.capture_backends import CaptureBackend
+from utils.wayland_client import WaylandClient
+from utils.x11_interface import X11Interface
+
+
+class ScreencopyBackend(CaptureBackend):
+    """wlr-screencopy region capture through the shared Wayland connection."""
+    name = "wlr-screencopy"
+
+    def __init__(self, client):
+        self.client = client
+
+    def grab(self, win_id, scale=None):
+        return self.client.capture(win_id, scale)
+
+
+class WaylandInterface(X11Interface):
+    """
+    The X11Interface API on a wlroots compositor (sway, Hyprland, ...):
+
+    * Toplevels come from wlr-foreign-toplevel events, not from wmctrl
+    * Frames come from wlr-screencopy over one persistent connection
+    * Focus goes through the toplevel's activate request
+
+    Window ids are our own small integers, listed in wmctrl format so the
+    rest of the app does not care which interface it talks to.
+    """
+
+    def _load_backends(self):
+        self.client = WaylandClient()
+        self.client.start()
+        self.backends = [ScreencopyBackend(self.client)]
+
+    def session_key(self):
+        return "wayland"
+
+    def calibrate(self, window_id=None):
+        return None  # Only one backend
+
+    def list_windows(self):
+        start = time.perf_counter()
+        try:
+            return [f"{hex(window_id)} 0 wayland {title}" for window_id, title in self.client.list_toplevels()]
+        finally:
+            self._record_call("list_windows", start)
+
+    def get_kwin_window_id(self, x11_window_id):
+        return None
+
+    def focus_and_raise_window(self, window_id, kwin_uuid=None):
+        start = time.perf_counter()
+        try:
+            win_id = int(window_id, 16) if isinstance(window_id, str) else window_id
+            if not self.client.activate(win_id):
+                logging.debug(f"Could not activate toplevel {hex(win_id)}")
+        finally:
+            self._record_call("focus_and_raise_window", start)
+
+    def create_active_window_watcher(self):
+        return None  # Focus state is read from the toplevel list when needed
+
+    def active_window_name(self):
+        toplevel = self.client.active_toplevel()
+        return toplevel.title if toplevel is not None else ""
+
+    def close(self):
+        self.client.close()
+        super().close()
@@ -1,6 +1,7 @@
 from PyQt5.QtWidgets import QWidget
-from PyQt5.QtCore import Qt, QPoint
+from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QPainter, QColor
+from utils.tracing import tracer
 
 class BorderWindow(QWidget):
     """A transparent window that draws an inside border on top of the preview"""
@@ -28,24 +29,25 @@ class BorderWindow(QWidget):
         self.border_width = 3
         self.hide()
     
-    def follow(self, window):
-        """Set the window to follow and show border"""
+    def follow(self, window, geometry=None):
+        """Set the window to follow and show border (geometry: the window's, if already known)"""
         if window is None:
             self.hide()
             return
             
-        self.target_window = window
-        self.update_position()
-        self.show()
-        self.raise_()  # Keep border on top of the preview
+        with tracer.span("border follow", "paint"):
+            self.target_window = window
+            self.update_position(geometry)
+            self.show()
+            self.raise_()  # Keep border on top of the preview
     
-    def update_position(self):
+    def update_position(self, geometry=None):
         """Update position and size to exactly match target window"""
         if not self.target_window:
             return
             
         # Position border window to exactly overlap the target window
-        geom = self.target_window.frameGeometry()
+        geom = geometry if geometry is not None else self.target_window.frameGeometry()
         self.setGeometry(
             geom.x(),
             geom.y(),
@@ -66,13 +68,13 @@ class BorderWindow(QWidget):
     def mousePressEvent(self, event):
         """Start dragging when right-clicking on border"""
         if event.button() == Qt.RightButton and self.target_window:
-            # Start dragging on the target window
-            self.target_window.dragging = True
-            self.target_window.drag_position = event.globalPos() - self.target_window.frameGeometry().topLeft()
+            # Drag the target window through its layout engine
+            self.target_window.stop_zoom()
+            self.target_window.manager.layout.begin_drag(self.target_window, event.globalPos())
             event.accept()
         elif event.button() == Qt.LeftButton and self.target_window:
             # Handle left-click to focus window
-            self.target_window.x11_interface.focus_and_raise_window(self.target_window.window_id)
+            self.target_window.manager.focus_client(self.target_window.window_id)
             if self.target_window.manager.get_last_active_client() != self.target_window.window_id:
                 self.target_window.manager.set_last_active_client(self.target_window.window_id)
                 self.target_window.manager.hotkey_manager.update_current_index(self.target_window.window_id)
@@ -80,18 +82,11 @@ class BorderWindow(QWidget):
     def mouseMoveEvent(self, event):
         """Handle dragging movement"""
         if self.target_window and self.target_window.dragging and event.buttons() & Qt.RightButton:
-            new_position = event.globalPos() - self.target_window.drag_position
-            self.target_window.move(new_position)
-            # Update border position to follow the window
-            self.update_position()
+            self.target_window.manager.layout.drag_to(event.globalPos())
             event.accept()
 
     def mouseReleaseEvent(self, event):
-        """Stop dragging and snap"""
+        """Stop dragging, snap and save"""
         if event.button() == Qt.RightButton and self.target_window and self.target_window.dragging:
-            self.target_window.dragging = False
-            # Snap to grid and save position
-            self.target_window.snap_to_grid()
-            self.update_position()  # Update border after snapping
-            self.target_window.save_position()
-            event.accept()
\ No newline at end of file
+            self.target_window.manager.layout.end_drag()
+            event.accept()
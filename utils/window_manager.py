@@ -1,48 +1,162 @@
-from PyQt5.QtCore import QTimer, QObject
-from utils.window_preview import WindowPreview
+from PyQt5.QtCore import QTimer, QObject, pyqtSignal
+from utils.window_preview import WindowPreview, character_name_from_title
 from utils.window_border import BorderWindow
+from utils.thumbnail_cache import ThumbnailCache
+from utils.resource_control import ResourceMonitor
+from utils.zoom_popup import ZoomPopup
+from utils.layout_engine import LayoutEngine
+from utils.config import save_config
+from utils.profiles import ProfileManager
+from utils.stream_server import StreamServer
+from utils.frame_export import FrameExporter
+from utils.session_recorder import SessionRecorder
+from utils.async_loop import get_loop, run_blocking
+from utils.capture_scheduler import CaptureScheduler
 import logging
+import time
 
 class WindowManager(QObject):
+    registry_changed = pyqtSignal()  # A character's client was bound, rebound or parked
+
     def __init__(self, x11_interface, config, hotkey_manager=None):
         super().__init__()
         self.x11_interface = x11_interface
         self.config = config
         self.hotkey_manager = hotkey_manager  # Add hotkey_manager
-        self.previews = []
+        self.previews = []  # Previews bound to a live client, shown on screen
+        self.previews_by_character = {}  # Character name -> preview, bound or parked
+        self.preview_pool = []  # Parked past their TTL, waiting to take on a new character
         self.last_active_window_id = None  # Track active window
+        self.thumbnail_cache = ThumbnailCache(config)
+        self.resource_monitor = ResourceMonitor(config)
+        self.stream_server = StreamServer(config)
+        self.frame_exporter = FrameExporter(config)
+        self.recorder = SessionRecorder(config)  # Records only while a recording is started
+        self.frame_sinks = [sink for sink in (self.stream_server, self.frame_exporter) if sink.enabled]
+        self.frame_sinks.append(self.recorder)
+        # On the asyncio loop, captures are tasks on one bounded pool instead of a thread per preview
+        loop = get_loop()
+        self.capture_scheduler = CaptureScheduler(loop, config, self.resource_monitor) if loop else None
+        self.listing = None  # Window listing running on the loop's executor
         self.timer = QTimer()
-        self.timer.timeout.connect(self.update_previews)
+        self.timer.timeout.connect(self.update_previews if loop is None else self.schedule_update)
         self.timer.start(1000)
         self.active_border = BorderWindow(config)
+        self.zoom_popup = ZoomPopup()
+        self.layout = LayoutEngine(self)
+        self.profiles = ProfileManager(config, self)
+        self.repainted_pixels = 0  # Cumulative area pushed to the compositor
+        self.frame_pixels = 0  # Cumulative area a full-frame swap would have repainted
+        self.config_dirty = False  # Config changes waiting for the end of the update cycle
+
+    def schedule_update(self):
+        """Async mode: list windows off the GUI thread, then update the previews on it."""
+        if self.listing is None or self.listing.done():
+            self.listing = self.capture_scheduler.loop.create_task(self._list_and_update())
 
-    def update_previews(self):
-        window_list = self.x11_interface.list_windows()
+    async def _list_and_update(self):
+        try:
+            window_list = await run_blocking(self.x11_interface.list_windows)
+        except Exception as e:
+            logging.error(f"Error listing windows: {e}")
+            return
+        self.update_previews(window_list)
+
+    def update_previews(self, window_list=None):
+        if window_list is None:
+            window_list = self.x11_interface.list_windows()
         eve_windows = [(line.split()[0], " ".join(line.split()[3:])) for line in window_list if "EVE - " in line]
+        if self.recorder.recording:
+            self.recorder.windows_listed((line.split()[0], " ".join(line.split()[3:])) for line in window_list)
+        live_characters = {window_id: character_name_from_title(title) for window_id, title in eve_windows}
+
+        # Clients that closed, crashed or went back to character select
+        for preview in list(self.previews):
+            if live_characters.get(preview.window_id) != preview.get_character_name():
+                self.park_preview(preview)
 
-        current_ids = {preview.window_id for preview in self.previews}
-        new_windows = [(window_id, window_title) for window_id, window_title in eve_windows if window_id not in current_ids]
-        closed_windows = [preview for preview in self.previews if preview.window_id not in {window_id for window_id, _ in eve_windows}]
+        bound = set()
+        registry_changed = False
+        for window_id, window_title in eve_windows:
+            character_name = live_characters[window_id]
+            if character_name in bound:
+                continue  # Same character twice in the list; keep the first
+            bound.add(character_name)
 
-        for window_id, window_title in new_windows:
-            preview = WindowPreview(self.x11_interface, window_id, window_title, self.previews, self.config, self, self.hotkey_manager)
+            preview = self.previews_by_character.get(character_name)
+            if preview is not None and preview.parked_at is None and preview.window_id == window_id:
+                continue
+            if preview is not None:
+                # Relogged or restarted client: same widget, same thread, new window id
+                preview.rebind(window_id, window_title)
+            elif self.preview_pool:
+                preview = self.preview_pool.pop()
+                preview.rebind(window_id, window_title)
+            else:
+                preview = WindowPreview(self.x11_interface, window_id, window_title, self.previews, self.config, self, self.hotkey_manager)
+            self.previews_by_character[character_name] = preview
+            if preview not in self.previews:
+                self.previews.append(preview)
             preview.show()
-            self.previews.append(preview)
-
-        for preview in closed_windows:
-            # Check if this is the active window before removing it
-            if self.last_active_window_id == preview.window_id:
-                # Hide the border window when active client closes
-                self.active_border.hide()
-                self.last_active_window_id = None
-                
-            self.previews.remove(preview)
-            preview.close()
-
-    def set_last_active_client(self, window_id):
-        """Set the last active client and update border."""
+            registry_changed = True
+
+        self.expire_parked_previews()
+        if registry_changed:
+            self.registry_changed.emit()
+
+        # All new characters of this cycle are persisted with one write
+        if self.config_dirty:
+            self.config_dirty = False
+            save_config(self.config)
+
+    def park_preview(self, preview):
+        """Take a preview off screen but keep it, keyed by character, for a relog."""
+        if preview not in self.previews:
+            return
+        # Check if this is the active window before removing it
+        if self.last_active_window_id == preview.window_id:
+            # Hide the border window when active client closes
+            self.active_border.hide()
+            self.last_active_window_id = None
+
+        self.previews.remove(preview)
+        self.layout.remove_preview(preview)
+        self.x11_interface.frame_memory.forget(int(preview.window_id, 16))
+        preview.park()
+        logging.debug(f"Parked preview of {preview.get_character_name()}")
+        self.registry_changed.emit()
+
+    def expire_parked_previews(self):
+        """Move long-parked previews to the reuse pool, disposing of what the pool cannot hold."""
+        settings = self.config["settings"].get("preview_pool", {})
+        ttl = settings.get("park_ttl", 600)
+        now = time.monotonic()
+        for character_name, preview in list(self.previews_by_character.items()):
+            if preview.parked_at is None or now - preview.parked_at < ttl:
+                continue
+            del self.previews_by_character[character_name]
+            if len(self.preview_pool) < settings.get("pool_size", 4):
+                self.preview_pool.append(preview)
+            else:
+                logging.debug(f"Disposing of parked preview of {character_name}")
+                preview.dispose()
+
+    def mark_config_dirty(self):
+        """Request a config write at the end of the current update cycle."""
+        self.config_dirty = True
+
+    def record_repaint(self, repainted, full):
+        """Account for repainted area; read as a rate by the Telemetry tab."""
+        self.repainted_pixels += repainted
+        self.frame_pixels += full
+
+    def set_last_active_client(self, window_id, context=None):
+        """Set the last active client and update border (context: a pre-warmed FocusContext)."""
         logging.debug(f"Setting last active client: {window_id}")
         self.last_active_window_id = window_id
+        if context is not None:
+            self.active_border.follow(context.preview, context.geometry)
+            return
         
         # Find the preview window matching this ID
         for preview in self.previews:
@@ -56,6 +170,20 @@ class WindowManager(QObject):
         for preview in self.previews:
             preview.update_border()
 
+    def focus_client(self, window_id):
+        """Bring a clicked client to the front; on the loop's executor when running on asyncio."""
+        loop = get_loop()
+        if loop is None:
+            self.x11_interface.focus_and_raise_window(window_id)
+        else:
+            loop.create_task(self._focus_client(window_id))
+
+    async def _focus_client(self, window_id):
+        try:
+            await run_blocking(self.x11_interface.focus_and_raise_window, window_id)
+        except Exception as e:
+            logging.error(f"Error focusing {window_id}: {e}")
+
     def get_last_active_client(self):
         """Returns the last active window ID."""
         return self.last_active_window_id
@@ -1,13 +1,23 @@
-from PyQt5.QtWidgets import QWidget, QLabel, QVBoxLayout
-from PyQt5.QtCore import Qt, QPoint
-from PyQt5.QtGui import QPixmap
+from PyQt5.QtWidgets import QWidget, QLabel, QApplication
+from PyQt5.QtCore import Qt, QRect
+from PyQt5.QtGui import QPainter, QColor, QPen
 from utils.update_thread import UpdateThread
+from utils.capture_scheduler import ScheduledCapture
 from utils.config import save_config, REFRESH_RATE
+from utils.tracing import tracer
 import logging
+import time
+from functools import partial
+
+
+def character_name_from_title(window_title):
+    """Extract character name from an EVE window title."""
+    if " - " in window_title:
+        return window_title.split(" - ")[-1]
+    return "Unknown"
 
-class WindowPreview(QWidget):
-    SNAP_DISTANCE = 20  # Keep snapping enabled
 
+class WindowPreview(QWidget):
     def __init__(self, x11_interface, window_id, window_title, previews, config, manager, hotkey_manager):
         super().__init__()
         self.window_id = window_id
@@ -17,7 +27,8 @@ class WindowPreview(QWidget):
         self.previews = previews
         self.config = config
         self.manager = manager
-        self.label = QLabel(self)
+        self.frame = None  # Current thumbnail (QImage in its storage format), painted in paintEvent
+        self.alert_color = None
 
         # Create a separate label for the character name (overlay)
         self.name_label = QLabel(self)
@@ -34,12 +45,6 @@ class WindowPreview(QWidget):
         
         # Make sure the name label stays on top of the screenshot
         self.name_label.raise_()
-        
-        # Main layout remains for the screenshot
-        layout = QVBoxLayout()
-        layout.addWidget(self.label)
-        layout.setContentsMargins(0, 0, 0, 0)
-        self.setLayout(layout)
 
         self.setWindowFlags(
             Qt.FramelessWindowHint | 
@@ -56,34 +61,196 @@ class WindowPreview(QWidget):
         self.setWindowOpacity(config["settings"]["thumbnail_opacity"] / 100)
         
 
-        self.capture_interval = REFRESH_RATE
-        self.dragging = False
-        self.drag_position = QPoint()
+        self.capture_interval = self.get_capture_interval()
+        self.dragging = False  # Set by the layout engine while a drag is in progress
+        self.stale = False
+        self.last_alert_sound = 0.0
+        self.parked_at = None  # monotonic time when the client went away, None while bound
+
+        # Paint the last frame from the previous session until a live capture arrives
+        self.show_cached_frame()
 
-        self.update_thread = UpdateThread(x11_interface, window_id, window_title, self.capture_interval)
+        # A task on the shared capture pool when running on asyncio, a thread of its own otherwise
+        scheduler = manager.capture_scheduler
+        capture_class = UpdateThread if scheduler is None else partial(ScheduledCapture, scheduler)
+        self.update_thread = capture_class(x11_interface, window_id, window_title, self.capture_interval,
+                                           thumbnail_cache=manager.thumbnail_cache,
+                                           character_name=self.get_character_name(),
+                                           resource_monitor=manager.resource_monitor,
+                                           frame_sinks=manager.frame_sinks)
         self.update_thread.updated.connect(self.set_pixmap)
+        self.update_thread.zoomed.connect(self.set_zoom_pixmap)
+        self.update_thread.alerted.connect(self.handle_alert)
         self.update_thread.error_occurred.connect(self.handle_error)
         self.update_thread.start()
 
         self.load_position()  # Restore position loading
 
-    def set_pixmap(self, pixmap, new_width, new_height):
-        """Update screenshot without redrawing character name"""
-        # Just update the screenshot
-        self.label.setPixmap(pixmap)
+    def show_cached_frame(self):
+        """Show the cached thumbnail for this character, marked as stale."""
+        image = self.manager.thumbnail_cache.load(self.get_character_name())
+        if image is None:
+            return
+
+        logging.debug(f"Showing cached thumbnail for {self.get_character_name()}")
+        self.stale = True
+        self.name_label.setText(f"{self.get_character_name()} (cached)")
+        self.name_label.adjustSize()
+        self.frame = image
+        self.resize_to_frame(image.width(), image.height())
+
+    def resize_to_frame(self, new_width, new_height):
+        """Match the window to the thumbnail size."""
         self.setFixedSize(new_width, new_height)
         
         # Position the name label at the TOP of the window instead of bottom
         self.name_label.setGeometry(0, 0, new_width, self.name_label.height())
         
-        self.adjustSize()
-        
         # If this window is active, update border position
         if self.manager.get_last_active_client() == self.window_id:
             self.manager.active_border.update_position()
 
+    def set_pixmap(self, image, new_width, new_height, dirty=None, emitted_ns=None):
+        """Swap in a new frame and repaint only the tiles that changed (dirty=None repaints all)"""
+        if emitted_ns is not None:
+            tracer.record("deliver", "paint", emitted_ns, time.perf_counter_ns(), {"window": self.window_id})
+        with tracer.span("set_pixmap", "paint", window=self.window_id):
+            self._set_pixmap(image, new_width, new_height, dirty)
+
+    def _set_pixmap(self, image, new_width, new_height, dirty):
+        if self.stale:
+            # First live frame replaces the cached one
+            self.stale = False
+            self.name_label.setText(self.get_character_name())
+            self.name_label.adjustSize()
+            dirty = None
+
+        previous, self.frame = self.frame, image
+        # The replaced frame is pooled only if this was its last reference
+        self.x11_interface.frame_memory.recycle_storage(previous)
+        if self.width() != new_width or self.height() != new_height:
+            self.resize_to_frame(new_width, new_height)
+            dirty = None
+
+        if dirty is None:
+            self.update()
+            repainted = new_width * new_height
+        else:
+            repainted = 0
+            for x, y, w, h in dirty:
+                self.update(QRect(x, y, w, h))
+                repainted += w * h
+        self.manager.record_repaint(repainted, new_width * new_height)
+
+    def paintEvent(self, event):
+        """Draw the current frame (only the exposed region) and the alert border"""
+        if self.frame is None:
+            return
+        with tracer.span("paint", "paint", window=self.window_id):
+            self._paint(event)
+
+    def _paint(self, event):
+        painter = QPainter(self)
+        rect = event.rect()
+        painter.drawImage(rect, self.frame, rect)
+        if self.alert_color:
+            width = self.config.get("alerts", {}).get("border_width", 3)
+            pen = QPen(QColor(self.alert_color))
+            pen.setWidth(width)
+            painter.setPen(pen)
+            painter.drawRect(self.rect().adjusted(width // 2, width // 2, -(width + 1) // 2, -(width + 1) // 2))
+
+    def set_zoom_pixmap(self, image):
+        """Forward a high-resolution frame to the hover popup."""
+        self.manager.zoom_popup.set_pixmap(self, image)
+
+    def enterEvent(self, event):
+        """Start the hover zoom: larger, faster captures for this preview only."""
+        zoom = self.config["settings"].get("hover_zoom", {})
+        if zoom.get("enabled", True) and not self.dragging:
+            self.manager.zoom_popup.show_for(self)
+            self.update_thread.set_zoom(zoom.get("scale", 30.0), zoom.get("interval", 100))
+        super().enterEvent(event)
+
+    def leaveEvent(self, event):
+        """Drop back to the normal capture schedule."""
+        self.stop_zoom()
+        super().leaveEvent(event)
+
+    def stop_zoom(self):
+        if self.update_thread.zoom_scale is not None:
+            self.update_thread.set_zoom(None)
+        self.manager.zoom_popup.dismiss(self)
+
+    def handle_alert(self, alerts):
+        """Highlight the preview while any ROI is in alert and play a sound when one starts."""
+        settings = self.config.get("alerts", {})
+        if not alerts:
+            self.alert_color = None
+            self.update()
+            return
+
+        logging.info(f"Alert on {self.get_character_name()}: {', '.join(alerts)}")
+        self.alert_color = settings.get("border_color", "#ff3030")
+        self.update()
+
+        now = time.monotonic()
+        if now - self.last_alert_sound < settings.get("sound_cooldown", 10):
+            return
+        self.last_alert_sound = now
+        sound = settings.get("sound", "")
+        if sound:
+            # Fire and forget through the tool helper; we never wait for playback
+            self.x11_interface.tools.submit(["paplay", sound])
+        else:
+            QApplication.beep()
+
     def handle_error(self):
-        self.close()
+        # The thread has paused itself; keep the widget for when the client comes back
+        self.manager.park_preview(self)
+
+    def park(self):
+        """Hide and pause capturing until the character's client shows up again."""
+        self.stop_zoom()
+        self.update_thread.pause()
+        self.parked_at = time.monotonic()
+        self.hide()
+
+    def rebind(self, window_id, window_title):
+        """Attach to a client window in place: same widget, same capture thread."""
+        old_name = self.get_character_name()
+        self.window_id = window_id
+        self.window_title = window_title
+        name = self.get_character_name()
+        logging.debug(f"Rebinding preview of {old_name} to {name} ({window_id})")
+
+        if name != old_name:
+            # A pooled widget taking on a new identity
+            self.frame = None
+            self.alert_color = None
+            self.name_label.setText(name)
+            self.name_label.adjustSize()
+            self.show_cached_frame()
+        # Positions may have changed while parked (e.g. a profile switch)
+        self.load_position()
+
+        self.parked_at = None
+        self.update_thread.rebind(window_id, window_title, name)
+        self.apply_capture_interval()
+
+    def dispose(self):
+        """Stop the capture thread and free the widget."""
+        thread = self.update_thread
+        thread.stop()
+        if thread.wait(2000):
+            thread.previous_image = None
+        else:
+            # Still inside a capture: the capture cleans up when it returns, instead
+            # of Python destroying a running QThread (or its state) with this widget
+            thread.delete_when_finished()
+        previous, self.frame = self.frame, None
+        self.x11_interface.frame_memory.recycle_storage(previous)
+        self.deleteLater()
 
     def load_position(self):
         """Load the last known position of this preview from the config."""
@@ -98,12 +265,19 @@ class WindowPreview(QWidget):
             self.config["thumbnail_position"][character_name] = default_pos
             logging.debug(f"New character {character_name} - setting default position: {default_pos}")
             self.move(default_pos[0], default_pos[1])
-            # Save the config immediately to persist the new character
-            save_config(self.config)
+            # Persisted with the rest of this update cycle in a single write
+            self.manager.mark_config_dirty()
 
     def get_default_position(self):
-        """Return a simple fixed default position for new characters."""
-        return [25, 1825]
+        """Return the first free slot of the configured layout for new characters."""
+        if self.frame is not None:
+            width, height = self.width(), self.height()
+        else:
+            # No frame yet: assume a full-screen client at the thumbnail scale
+            screen = QApplication.primaryScreen().geometry()
+            scale = self.config["settings"]["thumbnail_scaling"] / 100.0
+            width, height = int(screen.width() * scale), int(screen.height() * scale)
+        return self.manager.layout.free_position(width, height, exclude=self)
 
     def save_position(self):
         """Save the current position of this preview to the config."""
@@ -112,18 +286,27 @@ class WindowPreview(QWidget):
         save_config(self.config)
         logging.debug(f"Saved position for {character_name}: {self.x()}, {self.y()}")
 
+    def get_capture_interval(self):
+        """Capture interval in ms for this character (per-character override, then the global one)."""
+        settings = self.config["settings"]
+        default = settings.get("capture_interval", REFRESH_RATE)
+        return settings.get("capture_intervals", {}).get(self.get_character_name(), default)
+
+    def apply_capture_interval(self):
+        """Pick up a changed capture interval without restarting the capture thread."""
+        self.capture_interval = self.get_capture_interval()
+        self.update_thread.set_interval(self.capture_interval)
+
     def get_character_name(self):
         """Extract character name from window title."""
-        if " - " in self.window_title:
-            return self.window_title.split(" - ")[-1]
-        return "Unknown"
+        return character_name_from_title(self.window_title)
 
     def mousePressEvent(self, event):
         """Detect left or right-click interactions."""
         if event.button() == Qt.LeftButton:
             logging.debug(f"Left-click on {self.window_id} - bringing to front.")
             # Always bring the clicked window to the front
-            self.x11_interface.focus_and_raise_window(self.window_id)
+            self.manager.focus_client(self.window_id)
             if self.manager.get_last_active_client() != self.window_id:
                 self.manager.set_last_active_client(self.window_id)  # Track clicked clients
                 self.manager.hotkey_manager.update_current_index(self.window_id)  # Update current index
@@ -131,65 +314,37 @@ class WindowPreview(QWidget):
                 logging.debug(f"Window {self.window_id} is already the active window.")
         elif event.button() == Qt.RightButton:
             logging.debug(f"Right-click on {self.window_id} - start dragging.")
-            self.dragging = True
-            self.drag_position = event.globalPos() - self.frameGeometry().topLeft()
+            self.stop_zoom()
+            self.manager.layout.begin_drag(self, event.globalPos())
             event.accept()
 
     def mouseMoveEvent(self, event):
-        """Handle dragging movement."""
+        """Handle dragging movement; the layout engine moves us once per frame."""
         if self.dragging and event.buttons() & Qt.RightButton:
-            logging.debug(f"Dragging window {self.window_id}")
-            new_position = event.globalPos() - self.drag_position
-            self.move(new_position)
-            # Update border position if this window has the active border
-            if self.manager.get_last_active_client() == self.window_id:
-                self.manager.active_border.update_position()
-            # Don't snap during dragging - only snap when released
+            self.manager.layout.drag_to(event.globalPos())
             event.accept()
 
     def mouseReleaseEvent(self, event):
-        """Stop dragging and save new position."""
-        if event.button() == Qt.RightButton:
+        """Stop dragging, snap and save the new position."""
+        if event.button() == Qt.RightButton and self.dragging:
             logging.debug(f"Released drag on {self.window_id} - saving position.")
-            self.dragging = False
-            # Snap to grid only when releasing the mouse
-            self.snap_to_grid()
-            # Update border position if this window has the active border
-            if self.manager.get_last_active_client() == self.window_id:
-                self.manager.active_border.update_position()
-            self.save_position()
+            self.manager.layout.end_drag()
             event.accept()
 
+    def moveEvent(self, event):
+        self.manager.layout.update_preview(self)
+        if self.manager.hotkey_manager is not None:
+            self.manager.hotkey_manager.prewarmer.refresh_geometry(self)
+        super().moveEvent(event)
+
+    def resizeEvent(self, event):
+        self.manager.layout.update_preview(self)
+        if self.manager.hotkey_manager is not None:
+            self.manager.hotkey_manager.prewarmer.refresh_geometry(self)
+        super().resizeEvent(event)
+
     def snap_to_grid(self):
         # Don't snap if we're currently dragging
         if self.dragging:
             return
-            
-        for preview in self.previews:
-            if preview == self:
-                continue
-
-            r1 = self.frameGeometry()
-            r2 = preview.frameGeometry()
-
-            # Check for horizontal snapping
-            if abs(r1.right() - r2.left()) < self.SNAP_DISTANCE:
-                self.move(r2.left() - r1.width(), self.y())
-            elif abs(r1.left() - r2.right()) < self.SNAP_DISTANCE:
-                self.move(r2.right(), self.y())
-            elif abs(r1.left() - r2.left()) < self.SNAP_DISTANCE:
-                self.move(r2.left(), self.y())
-            elif abs(r1.right() - r2.right()) < self.SNAP_DISTANCE:
-                self.move(r2.right() - r1.width(), self.y())
-
-            # Check for vertical snapping
-            if abs(r1.bottom() - r2.top()) < self.SNAP_DISTANCE:
-                self.move(self.x(), r2.top() - r1.height())
-            elif abs(r1.top() - r2.bottom()) < self.SNAP_DISTANCE:
-                self.move(self.x(), r2.bottom())
-            elif abs(r1.top() - r2.top()) < self.SNAP_DISTANCE:
-                self.move(self.x(), r2.top())
-            elif abs(r1.bottom() - r2.bottom()) < self.SNAP_DISTANCE:
-                self.move(self.x(), r2.bottom() - r1.height())
-
-        logging.debug(f"🔵 Snapped window {self.window_id} into position.")
+        self.manager.layout.snap_preview(self)
@@ -1,56 +1,313 @@
-import subprocess, logging, threading, shutil
+import subprocess, logging, threading, shutil, os, resource, statistics, time
 from pathlib import Path
 from PyQt5.QtGui import QImage, QPixmap
 from PyQt5.QtCore import Qt, QByteArray
-
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-)
+from utils.capture_backends import CAPTURE_BACKENDS, BackendUnavailable, WindowHidden, root_window_id
+from utils.config import save_config
+from utils.tool_broker import ToolBroker
+from utils.resource_control import apply_thread_policy
+from utils.frame_memory import FrameMemoryManager
+from utils.active_window import ActiveWindowWatcher
+from utils.async_loop import get_loop
+from utils.tracing import tracer
+from utils.log_setup import log_fields
 
 class X11Interface:
     """
-    * Grab window with maim → stdout (no temp files)
-    * Process with PIL for better quality and borders
+    * Grab windows through a registry of capture backends (maim, XGetImage, XShm, Composite)
+    * Calibrate once per display/session and keep the fastest backend first
+    * Fall back to the next backend when one fails at runtime
     * Scale down immediately to thumbnail size
+    * Run wmctrl/kdotool/xdotool/maim through resident helper processes instead of forking per call
     * Thread-safe with logging for better diagnostics
+
+    One instance talks to one X display: display_name (None is $DISPLAY)
+    applies to the Xlib connections and every tool it runs. DisplaySet
+    combines several, offsetting their window ids by id_base.
     """
 
-    def __init__(self, config):
+    def __init__(self, config, display_name=None, frame_memory=None, id_base=0):
         self.config = config
+        self.display_name = display_name
+        self.id_base = id_base
+        env = dict(os.environ, DISPLAY=display_name) if display_name else None
+
+        broker_settings = config["settings"].get("tool_broker", {})
+        broker_enabled = broker_settings.get("enabled", True)
+        # Separate helpers so maim children get capture priority, window activation gets input
+        # priority and listings and lookups stay at normal priority whichever thread starts them
+        self.tools = ToolBroker(broker_enabled, "tools", on_start=self._apply_normal_policy, env=env)
+        self.focus_tools = ToolBroker(broker_enabled, "focus-tools", on_start=self._apply_input_policy, env=env)
+        self.capture_tools = ToolBroker(broker_enabled, "capture-tools", on_start=self._apply_capture_policy, env=env)
+
+        self.stats_lock = threading.Lock()
+        self.call_stats = {}  # operation -> [calls, total seconds]
+        # Capture scheduler: at most capture_slots grabs in flight on this display
+        self.capture_slots = threading.BoundedSemaphore(
+            config["settings"].get("displays", {}).get("capture_slots", 4))
+        self.capture_stats = [0, 0, 0.0, 0]  # captures, failures, seconds, source pixels
+
+        self.frame_memory = frame_memory if frame_memory is not None else FrameMemoryManager(config)
+
+        self.backend_lock = threading.Lock()
+        self.backends = []
+        self.dropped_backends = []
+        self._load_backends()
+
+    def _apply_capture_policy(self, pid):
+        """Give the capture helper (and the maim processes it forks) capture priority."""
+        settings = self.config["settings"].get("resource_control", {})
+        if settings.get("enabled", True):
+            apply_thread_policy(nice=settings.get("capture_nice", 10),
+                                sched_idle=settings.get("capture_sched_idle", False),
+                                cpus=settings.get("capture_cpus", []), tid=pid)
+
+    def _apply_input_policy(self, pid):
+        """Give the focus helper (and the activations it runs) input priority."""
+        settings = self.config["settings"].get("resource_control", {})
+        if settings.get("enabled", True):
+            apply_thread_policy(nice=settings.get("input_nice", -5), cpus=settings.get("input_cpus", []), tid=pid)
+
+    def _apply_normal_policy(self, pid):
+        """Undo the input priority the helper inherits when the keyboard thread starts it."""
+        if self.config["settings"].get("resource_control", {}).get("enabled", True):
+            apply_thread_policy(nice=0, tid=pid)
+
+    def close(self):
+        """Stop the resident helper processes."""
+        self.tools.close()
+        self.focus_tools.close()
+        self.capture_tools.close()
+
+    # ---------------- call timing --------------------------------------
+    def _record_call(self, operation, start):
+        elapsed = time.perf_counter() - start
+        with self.stats_lock:
+            stats = self.call_stats.setdefault(operation, [0, 0.0])
+            stats[0] += 1
+            stats[1] += elapsed
+            calls, total = stats
+        logging.debug("Timed call", extra=log_fields(stage=operation, duration_ms=elapsed * 1000,
+                                                     avg_ms=total / calls * 1000, calls=calls))
+
+    def get_call_stats(self):
+        """Return {operation: (calls, average ms)} for the timed operations."""
+        with self.stats_lock:
+            return {operation: (calls, total / calls * 1000) for operation, (calls, total) in self.call_stats.items()}
+
+    def _record_capture(self, elapsed, pixels, failed=False):
+        with self.stats_lock:
+            self.capture_stats[0] += 1
+            self.capture_stats[1] += failed
+            self.capture_stats[2] += elapsed
+            self.capture_stats[3] += pixels
+
+    def get_display_stats(self):
+        """[(display label, (captures, failures, capture seconds, source pixels))], cumulative."""
+        with self.stats_lock:
+            return [(self.display_label(), tuple(self.capture_stats))]
+
+    def display_label(self):
+        return self.display_name or os.environ.get("DISPLAY", ":0")
+
+    # ---------------- capture backends ---------------------------------
+    def session_key(self):
+        """Key the calibration result by display and session type."""
+        display = self.display_name or os.environ.get("DISPLAY", "")
+        session_type = os.environ.get("XDG_SESSION_TYPE", "x11")
+        if session_type == "wayland":
+            session_type = "xwayland"
+        return f"{display}|{session_type}"
+
+    def _load_backends(self):
+        """Instantiate available backends and order them by preference."""
+        for name, backend_class in CAPTURE_BACKENDS.items():
+            backend = backend_class()
+            backend.tools = self.capture_tools
+            backend.display_name = self.display_name
+            if backend.is_available():
+                self.backends.append(backend)
+            else:
+                logging.debug(f"Capture backend {name} not available")
+
+        if not self.backends:
+            logging.error("No capture backend available - install maim or python-xlib")
+            return
+
+        choice = self.config["settings"].get("capture_backend", "auto")
+        if choice != "auto":
+            self._promote(choice)
+            return
+
+        calibration = self.config["settings"].get("capture_calibration", {}).get(self.session_key())
+        if calibration:
+            self._promote(calibration["backend"])
+        else:
+            self.calibrate()
+
+        logging.info(f"Capture backends in order: {[backend.name for backend in self.backends]}")
+
+    def _promote(self, name):
+        """Move the named backend to the front of the list."""
+        with self.backend_lock:
+            for backend in self.backends:
+                if backend.name == name:
+                    self.backends.remove(backend)
+                    self.backends.insert(0, backend)
+                    return
+
+    def _drop_backend(self, backend):
+        with self.backend_lock:
+            if backend in self.backends:
+                self.backends.remove(backend)
+                self.dropped_backends.append(backend)  # Threads may still hold its connections
+
+    def release_capture_thread(self):
+        """Close the calling thread's backend connections and shared memory; called as a capture thread ends."""
+        with self.backend_lock:
+            backends = self.backends + self.dropped_backends
+        for backend in backends:
+            try:
+                backend.release_thread()
+            except Exception as e:
+                logging.debug(f"Releasing {backend.name} resources failed: {e}")
+
+    def get_active_backend(self):
+        """Return the name of the backend tried first, or None."""
+        with self.backend_lock:
+            return self.backends[0].name if self.backends else None
+
+    @staticmethod
+    def _cpu_time():
+        """CPU seconds used by this thread plus reaped children (maim)."""
+        thread = resource.getrusage(resource.RUSAGE_THREAD)
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return thread.ru_utime + thread.ru_stime + children.ru_utime + children.ru_stime
+
+    def _calibration_window(self):
+        """Prefer a live EVE window; otherwise measure against the root window."""
+        for line in self.list_windows():
+            if "EVE - " in line:
+                return int(line.split()[0], 16)
+        return root_window_id(self.display_name)
+
+    def calibrate(self, window_id=None):
+        """Time every available backend and persist the fastest for this session."""
+        if window_id is None:
+            window_id = self._calibration_window()
+        if window_id is None:
+            logging.info("Skipping capture calibration: no window to measure")
+            return None
+
+        samples = self.config["settings"].get("capture_calibration_samples", 3)
+        scale = self.config["settings"]["thumbnail_scaling"]
+        results = {}
+        for backend in list(self.backends):
+            try:
+                # Warm-up grab sets up connections and shared memory
+                if backend.grab(window_id, scale) is None:
+                    raise RuntimeError("no image returned")
+                latencies, cpu_times = [], []
+                for _ in range(samples):
+                    start, cpu_start = time.perf_counter(), self._cpu_time()
+                    backend.grab(window_id, scale)
+                    latencies.append(time.perf_counter() - start)
+                    cpu_times.append(self._cpu_time() - cpu_start)
+            except BackendUnavailable as e:
+                logging.info(f"Calibration: {backend.name} unavailable: {e}")
+                self._drop_backend(backend)
+                continue
+            except Exception as e:
+                logging.info(f"Calibration: {backend.name} failed: {e}")
+                continue
+
+            results[backend.name] = {
+                "latency_ms": round(statistics.median(latencies) * 1000, 2),
+                "cpu_ms": round(statistics.median(cpu_times) * 1000, 2),
+            }
+            logging.info(f"Calibration: {backend.name} {results[backend.name]}")
+
+        if not results:
+            return None
+
+        winner = min(results, key=lambda name: results[name]["latency_ms"] + results[name]["cpu_ms"])
+        self._promote(winner)
+        self.config["settings"].setdefault("capture_calibration", {})[self.session_key()] = {
+            "backend": winner,
+            "results": results,
+        }
+        save_config(self.config)
+        logging.info(f"Calibration picked capture backend: {winner}")
+        return winner
+
+    def _grab(self, win_id, scale):
+        """Grab a frame at scale percent, falling back through the backend list."""
+        with self.backend_lock:
+            backends = list(self.backends)
+
+        for backend in backends:
+            try:
+                result = backend.grab(win_id, scale)
+            except BackendUnavailable as e:
+                logging.warning(f"Capture backend {backend.name} dropped: {e}")
+                self._drop_backend(backend)
+                continue
+            except WindowHidden:
+                raise  # No backend would do better; the caller keeps the last frame
+            except Exception as e:  # BadDrawable, BadMatch, WindowGone, WindowUnsupported, ...
+                logging.debug("Capture backend failed",
+                              extra=log_fields(window=hex(win_id), stage=backend.name, error=e))
+                continue
+
+            if result is None:
+                continue
+            if backend is not backends[0]:
+                logging.warning(f"Capture backend {backends[0].name} failed, falling back to {backend.name}")
+                self._promote(backend.name)
+            return result
+
+        return None
 
     # ---------------- capture ------------------------------------------
-    def capture_window(self, window_id):
+    def rescale(self, image, from_scale):
+        """Scale a frame captured at from_scale percent down to the thumbnail scale."""
+        ratio = self.config["settings"]["thumbnail_scaling"] / from_scale
+        w, h = int(image.width() * ratio), int(image.height() * ratio)
+        return image.scaled(w, h, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+    def capture_window(self, window_id, scale=None):
+        """Capture a window scaled to `scale` percent (default: thumbnail_scaling)."""
         # Convert to int if it's a hex string
         win_id = int(window_id, 16) if isinstance(window_id, str) else window_id
         wid_hex = hex(win_id)
         
-        logging.debug(f"Capturing window: {wid_hex}")
-        
+        memory_key = self.id_base | win_id  # Window ids repeat across displays
         try:
-            # Capture directly to stdout - no temp files
-            jpg_data = subprocess.check_output(
-                ["maim", "-i", wid_hex, "-f", "jpg", "-m", "2", "-o"],
-                stderr=subprocess.DEVNULL
-            )
-            
-            # Create QImage directly from bytes
-            qt_img = QImage.fromData(jpg_data, "JPG")
-            if qt_img.isNull():
-                logging.error(f"Failed to create valid image from maim output")
+            if scale is None:
+                scale = self.config["settings"]["thumbnail_scaling"]
+            # Backends scale while the full-resolution data is still in place; the
+            # budget keeps all capture threads from holding such frames at once
+            with self.capture_slots, self.frame_memory.reserve(self.frame_memory.estimate(memory_key)):
+                start = time.perf_counter()
+                with tracer.span("grab and scale", "capture", scale=scale):
+                    result = self._grab(win_id, scale)
+                elapsed = time.perf_counter() - start
+            if result is None:
+                logging.error("All capture backends failed", extra=log_fields(window=wid_hex, stage="capture"))
+                self._record_capture(elapsed, 0, failed=True)
                 return None, 0, 0
+
+            scaled_img, source_w, source_h = result
+            self.frame_memory.record_frame(memory_key, source_w, source_h)
+            self._record_capture(elapsed, source_w * source_h)
+            w, h = scaled_img.width(), scaled_img.height()
             
-            # Scale directly with Qt instead of using PIL
-            scale = self.config["settings"]["thumbnail_scaling"] / 100.0
-            w, h = int(qt_img.width() * scale), int(qt_img.height() * scale)
-            scaled_img = qt_img.scaled(w, h, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-            
-            logging.debug(f"Captured {wid_hex} → {w}×{h} thumbnail")
+            logging.debug("Captured thumbnail", extra=log_fields(window=wid_hex, stage="grab and scale",
+                                                                 duration_ms=elapsed * 1000, width=w, height=h))
             return scaled_img, w, h
-            
-        except subprocess.CalledProcessError as e:
-            logging.error(f"maim process failed: {e}")
-            return None, 0, 0
+
+        except WindowHidden:
+            raise
         except Exception as e:
             logging.error(f"Capture failed: {e}")
             return None, 0, 0
@@ -64,7 +321,7 @@ class X11Interface:
             x11_decimal = int(x11_hex, 16)
             
             # Get window info from wmctrl
-            wmctrl_result = subprocess.run(["wmctrl", "-l", "-p"], capture_output=True, text=True)
+            wmctrl_result = self.tools.run(["wmctrl", "-l", "-p"])
             if wmctrl_result.returncode != 0:
                 return None
                 
@@ -80,103 +337,146 @@ class X11Interface:
                         break
             
             if not x11_pid:
-                logging.debug(f"Could not find X11 window info for {x11_hex}")
+                logging.debug("Could not find X11 window info",
+                              extra=log_fields(window=x11_hex, stage="resolve kwin uuid"))
                 return None
             
             # Search KWin windows and match by PID and name
-            kdotool_result = subprocess.run([
+            kdotool_result = self.tools.run([
                 "kdotool", "search", "--pid", x11_pid, "--name", x11_name
-            ], capture_output=True, text=True)
+            ])
             
             if kdotool_result.returncode == 0 and kdotool_result.stdout.strip():
                 kwin_uuid = kdotool_result.stdout.strip().split('\n')[0]
-                logging.debug(f"Mapped X11 {x11_hex} -> KWin {kwin_uuid}")
+                logging.debug("Mapped X11 window to KWin",
+                              extra=log_fields(window=x11_hex, stage="resolve kwin uuid", kwin_uuid=kwin_uuid))
                 return kwin_uuid
                 
         except Exception as e:
-            logging.debug(f"Failed to map X11 ID {x11_window_id} to KWin UUID: {e}")
+            logging.debug("Failed to map X11 window to KWin UUID",
+                          extra=log_fields(window=x11_window_id, stage="resolve kwin uuid", error=e))
         
         return None
 
-    def focus_and_raise_window(self, window_id):
+    def focus_and_raise_window(self, window_id, kwin_uuid=None):
+        """
+        Activate a window; kwin_uuid, if already known, skips the wmctrl/kdotool lookup.
+
+        Returns the KWin UUID that activated it (None if kdotool was not used),
+        so callers can tell when a pre-resolved one went stale.
+        """
+        start = time.perf_counter()
+        try:
+            with tracer.span("focus_and_raise_window", "focus", window=window_id, prewarmed=bool(kwin_uuid)):
+                return self._focus_and_raise_window(window_id, kwin_uuid)
+        finally:
+            self._record_call("focus_and_raise_window", start)
+
+    def _focus_and_raise_window(self, window_id, kwin_uuid=None):
         # Convert to hex string if it's an int
         win_id = hex(window_id) if isinstance(window_id, int) else window_id
         
         try:
             # Method 1: Try kdotool with KWin UUID mapping
-            kwin_uuid = self.get_kwin_window_id(window_id)
+            result = None
             if kwin_uuid:
-                result = subprocess.run([
-                    "kdotool", "windowactivate", kwin_uuid
-                ], capture_output=True, text=True)
-                
+                with tracer.span("kdotool windowactivate (pre-resolved)", "focus"):
+                    result = self.focus_tools.run(["kdotool", "windowactivate", kwin_uuid])
+                if result.returncode != 0:
+                    # Pre-resolved UUID went stale (window recreated); look it up again
+                    logging.debug("Pre-resolved KWin UUID failed, resolving again",
+                                  extra=log_fields(window=win_id, stage="focus", kwin_uuid=kwin_uuid))
+                    result = None
+            if result is None:
+                with tracer.span("resolve kwin uuid", "focus"):
+                    kwin_uuid = self.get_kwin_window_id(window_id)
+                if kwin_uuid:
+                    with tracer.span("kdotool windowactivate", "focus"):
+                        result = self.focus_tools.run([
+                            "kdotool", "windowactivate", kwin_uuid
+                        ])
+
+            if result is not None:
                 if result.returncode == 0:
                     # Add mouse jiggle for EVE multiboxing workflow
                     self._trigger_mouse_detection()
-                    logging.debug(f"Successfully focused window {win_id} using kdotool")
-                    return
+                    logging.debug("Focused window", extra=log_fields(window=win_id, stage="focus", tool="kdotool"))
+                    return kwin_uuid
                 else:
-                    logging.debug(f"kdotool activation failed: {result.stderr}")
+                    logging.debug("kdotool activation failed",
+                                  extra=log_fields(window=win_id, stage="focus", stderr=result.stderr))
             
         except Exception as e:
-            logging.debug(f"kdotool focus failed: {e}")
+            logging.debug("kdotool focus failed", extra=log_fields(window=win_id, stage="focus", error=e))
         
         try:
             # Method 2: Fallback to wmctrl
-            subprocess.call(["wmctrl", "-i", "-a", win_id])
+            with tracer.span("wmctrl activate", "focus"):
+                self.focus_tools.run(["wmctrl", "-i", "-a", win_id])
             # Add mouse jiggle for EVE multiboxing workflow
             self._trigger_mouse_detection()
-            logging.debug(f"Successfully focused window {win_id} using wmctrl fallback")
+            logging.debug("Focused window", extra=log_fields(window=win_id, stage="focus", tool="wmctrl"))
                     
         except Exception as e:
-            logging.debug(f"Window focus failed: {e}")
+            logging.debug("Window focus failed", extra=log_fields(window=win_id, stage="focus", error=e))
+        return None
 
     def _trigger_mouse_detection(self):
         """Tiny mouse movement to trigger EVE's mouse detection for multiboxing"""
+        with tracer.span("mouse jiggle", "focus"):
+            self._jiggle_mouse()
+
+    def _jiggle_mouse(self):
         logging.debug("Attempting mouse jiggle for EVE multiboxing...")
+
         try:
-            # More visible movement for testing: 5 pixels right, brief pause, then 5 pixels left
-            result1 = subprocess.run(["xdotool", "mousemove_relative", "1", "0"], 
-                         capture_output=True, text=True, timeout=1)
-            
-            # Small delay to make movement visible
-            import time
-            time.sleep(0.05)  # 50ms pause
-            
-            result2 = subprocess.run(["xdotool", "mousemove_relative", "--", "-1", "0"], 
-                         capture_output=True, text=True, timeout=1)
-            
-            if result1.returncode == 0 and result2.returncode == 0:
+            # One xdotool runs the chained move right, 50 ms pause and move back in order
+            result = self.focus_tools.run(["xdotool", "mousemove_relative", "1", "0", "sleep", "0.05",
+                                           "mousemove_relative", "--", "-1", "0"], timeout=1)
+            if result.returncode == 0:
                 logging.debug("Mouse jiggle completed successfully")
             else:
-                logging.debug(f"Mouse jiggle failed: result1={result1.returncode}, result2={result2.returncode}")
-                logging.debug(f"stderr1: {result1.stderr}, stderr2: {result2.stderr}")
+                logging.debug("Mouse jiggle failed",
+                              extra=log_fields(stage="mouse jiggle", returncode=result.returncode, stderr=result.stderr))
                 
         except subprocess.TimeoutExpired:
             logging.debug("xdotool mouse jiggle timed out")
         except FileNotFoundError:
             logging.debug("xdotool not found, trying KDE shortcut fallback")
             try:
-                result = subprocess.run([
+                result = self.focus_tools.run([
                     "qdbus", "org.kde.kglobalaccel", "/component/kwin",
                     "invokeShortcut", "MoveMouseToFocus"
-                ], capture_output=True, text=True, timeout=1)
+                ], timeout=1)
                 if result.returncode == 0:
                     logging.debug("KDE MoveMouseToFocus shortcut executed")
                 else:
-                    logging.debug(f"KDE shortcut failed: {result.stderr}")
+                    logging.debug("KDE shortcut failed", extra=log_fields(stage="mouse jiggle", stderr=result.stderr))
             except Exception as kde_e:
-                logging.debug(f"KDE shortcut also failed: {kde_e}")
+                logging.debug("KDE shortcut also failed", extra=log_fields(stage="mouse jiggle", error=kde_e))
         except Exception as e:
-            logging.debug(f"Mouse detection trigger failed: {e}")
+            logging.debug("Mouse detection trigger failed", extra=log_fields(stage="mouse jiggle", error=e))
             pass
 
+    def create_active_window_watcher(self):
+        """A watcher reporting focus changes as window ids, or None if this display has none."""
+        return ActiveWindowWatcher([(self.display_name, self.id_base)], get_loop())
+
+    def active_window_name(self):
+        """Title of the focused window."""
+        result = self.tools.run(["xdotool", "getactivewindow", "getwindowname"])
+        return result.stdout.strip()
+
     def list_windows(self):
         """List windows using wmctrl (kdotool search doesn't provide same format)"""
+        start = time.perf_counter()
         try:
-            res = subprocess.run(["wmctrl", "-l"], capture_output=True, text=True)
-            logging.debug(f"Listed {len(res.stdout.splitlines())} windows using wmctrl")
-            return res.stdout.splitlines()
+            res = self.tools.run(["wmctrl", "-l"])
+            lines = res.stdout.splitlines()
+            logging.debug("Listed windows", extra=log_fields(stage="list_windows", windows=len(lines)))
+            return lines
         except Exception as e:
             logging.error(f"wmctrl window listing failed: {e}")
             return []
+        finally:
+            self._record_call("list_windows", start)
@@ -0,0 +1,70 @@
+from PyQt5.QtWidgets import QWidget, QLabel, QVBoxLayout, QApplication
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QPixmap
+
+class ZoomPopup(QWidget):
+    """An enlarged live preview shown next to the hovered thumbnail"""
+
+    MARGIN = 4  # Gap between the thumbnail and the popup
+
+    def __init__(self):
+        super().__init__()
+        self.target_window = None
+        self.label = QLabel(self)
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.label)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(layout)
+
+        self.setWindowFlags(
+            Qt.FramelessWindowHint |
+            Qt.WindowStaysOnTopHint |
+            Qt.Tool |
+            Qt.X11BypassWindowManagerHint
+        )
+        self.setAttribute(Qt.WA_ShowWithoutActivating)
+        # Never take the pointer, otherwise the thumbnail would get a leave event
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.hide()
+
+    def show_for(self, window):
+        """Attach to a preview; the popup appears with the first zoomed frame."""
+        self.target_window = window
+
+    def dismiss(self, window):
+        """Hide the popup if it still belongs to this preview."""
+        if self.target_window is window:
+            self.target_window = None
+            self.hide()
+            self.label.clear()  # Let the last zoomed frame go; it is the size of several thumbnails
+
+    def set_pixmap(self, window, image):
+        """Show a zoomed frame (QImage) from the attached preview."""
+        if self.target_window is not window:
+            return
+        pixmap = QPixmap.fromImage(image)
+        self.label.setPixmap(pixmap)
+        self.setFixedSize(pixmap.width(), pixmap.height())
+        self.update_position()
+        if not self.isVisible():
+            self.show()
+            self.raise_()
+
+    def update_position(self):
+        """Place the popup above the preview, or below it if there is no room."""
+        if not self.target_window:
+            return
+
+        geom = self.target_window.frameGeometry()
+        screen = QApplication.screenAt(geom.center()) or QApplication.primaryScreen()
+        bounds = screen.availableGeometry()
+
+        x = geom.x() + (geom.width() - self.width()) // 2
+        y = geom.top() - self.height() - self.MARGIN
+        if y < bounds.top():
+            y = geom.bottom() + self.MARGIN
+
+        x = max(bounds.left(), min(x, bounds.right() - self.width()))
+        y = max(bounds.top(), min(y, bounds.bottom() - self.height()))
+        self.move(x, y)